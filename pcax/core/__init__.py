@@ -18,6 +18,13 @@ __all__ = [
     "tree_extract",
     "tree_inject",
 
+    "FlatStore",
+
+    "LazyModule",
+    "init",
+
+    "Precision",
+
     "static"
 ]
 
@@ -53,6 +60,22 @@ from ._tree import (
 )
 
 
+from ._flat import (
+    FlatStore,
+)
+
+
+from ._lazy import (
+    LazyModule,
+    init,
+)
+
+
+from ._precision import (
+    Precision,
+)
+
+
 from ._static import (
     static,
 )
@@ -0,0 +1,236 @@
+__all__ = ["FlatStore"]
+
+
+from typing import Any, Dict, Sequence, Tuple, Type
+from jaxtyping import PyTree
+import contextlib
+import functools
+import math
+import weakref
+
+import jax
+import jax.numpy as jnp
+import jax.tree_util as jtu
+
+from ._parameter import BaseParam, Param, _BaseParamMeta
+
+
+########################################################################################################################
+#
+# FLAT
+#
+# By default, each parameter stores its own value: passing a model through a transformation requires to flatten (and
+# later update) each of its parameters separately. A FlatStore gathers the values of a group of parameters (for example,
+# all the LayerParams of a model) into one contiguous buffer per dtype, and turns the parameters into views of it.
+# Views behave exactly as the original parameters (they are instances of a subclass of their original class, so masks
+# and 'isinstance' checks are unaffected) but their value is read from, and written to, the buffer. Once flattened, a
+# view is indistinguishable from the original parameter, so within a transformation the model is unchanged.
+#
+# 'pcax.functional.Jit' recognises views and passes the buffers to the compiled function in place of the individual
+# values, so that the whole group is handed off as a single array (per dtype).
+#
+# Writing a view updates the whole buffer. Within '_batched_writes' (used, e.g., by 'tree_inject' when the other
+# transformations write back their outputs) the writes are recorded and applied to each buffer at once on exit, so
+# that updating all the views of a store costs a single copy of its buffer rather than one per view.
+#
+# NOTE: the shape and dtype of a view cannot change. Parameters whose shape may change (such as VodeParams, when the
+# batch size changes or when they are cleared) must be released before doing so (see 'FlatStore.release').
+#
+########################################################################################################################
+
+
+# Utils ################################################################################################################
+
+
+_VIEW_KEYS = ("_flat", "_flat_cache")
+
+# Writes recorded within '_batched_writes', as {id(buffer): (buffer, {offset: value})}, or None outside of it.
+_pending: Dict[int, Tuple[Param, Dict[int, jax.Array]]] | None = None
+
+
+def _splice(buffer: jax.Array, values: Sequence[Tuple[int, jax.Array]]) -> jax.Array:
+    """Returns a copy of the 1D 'buffer' with the (flat) values written at the given offsets, built with a single
+    concatenation. The written slices must not overlap."""
+    _pieces, _end = [], 0
+    for _offset, _v in sorted(values, key=lambda _x: _x[0]):
+        if _offset > _end:
+            _pieces.append(buffer[_end:_offset])
+        _pieces.append(_v)
+        _end = _offset + _v.size
+    if _end < buffer.size:
+        _pieces.append(buffer[_end:])
+
+    return jnp.concatenate(_pieces)
+
+
+def _flush(buffer_id: int | None = None) -> None:
+    """Applies the pending writes to their buffer (or to all buffers, if 'buffer_id' is None)."""
+    for _id in tuple(_pending) if buffer_id is None else (buffer_id,):
+        if (_writes := _pending.pop(_id, None)) is not None:
+            _buffer, _values = _writes
+            _buffer.set(_splice(_buffer.get(), tuple(_values.items())))
+
+
+@contextlib.contextmanager
+def _batched_writes():
+    """Defers the writes to FlatStore views until exit (see above). Nested calls join the outermost one."""
+    global _pending
+
+    if _pending is not None:
+        yield
+        return
+
+    _pending = {}
+    try:
+        yield
+        _flush()
+    finally:
+        _pending = None
+
+
+class _FlatView:
+    """
+    Mixin that turns a parameter into a view of a slice of a FlatStore buffer. The view information is stored in
+    '__dict__["_flat"]' as (store, dtype, offset, shape) and is not part of the aux data, so a flattened view is
+    unflattened as an instance of the original class.
+    """
+
+    __slots__ = ()
+
+    _view_of: Type[BaseParam]
+
+    @property
+    def _value(self) -> jax.Array:
+        _store, _dtype, _offset, _shape = self.__dict__["_flat"]
+        if _pending:
+            _flush(id(_store.buffers[_dtype]))
+        _buffer = _store.buffers[_dtype].get()
+
+        # The slice is cached until the buffer is updated. We hold a weak reference to the buffer so that the cache
+        # does not keep a stale copy of the whole group alive.
+        _cache = self.__dict__.get("_flat_cache", None)
+        if _cache is not None and _cache[0]() is _buffer:
+            return _cache[1]
+
+        _value = _buffer[_offset : _offset + math.prod(_shape)].reshape(_shape)
+        try:
+            self.__dict__["_flat_cache"] = (weakref.ref(_buffer), _value)
+        except TypeError:
+            pass
+
+        return _value
+
+    @_value.setter
+    def _value(self, value: jax.Array) -> None:
+        _store, _dtype, _offset, _shape = self.__dict__["_flat"]
+
+        if getattr(value, "shape", None) != _shape or str(getattr(value, "dtype", None)) != _dtype:
+            raise ValueError(
+                f"Cannot set a value of shape {getattr(value, 'shape', None)} and dtype "
+                f"{getattr(value, 'dtype', None)} to a flat parameter of shape {_shape} and dtype {_dtype}. "
+                "Release its FlatStore first."
+            )
+
+        _buffer = _store.buffers[_dtype]
+        if _pending is not None:
+            _pending.setdefault(id(_buffer), (_buffer, {}))[1][_offset] = value.reshape(-1)
+        else:
+            _buffer.set(_buffer.get().at[_offset : _offset + math.prod(_shape)].set(value.reshape(-1)))
+
+    @staticmethod
+    def _aux_data(param: "_FlatView") -> Tuple[Tuple[str, Any], ...]:
+        return tuple(sorted(_i for _i in param.__dict__.items() if _i[0] not in _VIEW_KEYS))
+
+    @staticmethod
+    def _flatten_parameter(param: "_FlatView") -> Tuple[Any, Tuple[Tuple[str, Any], ...]]:
+        return (param._value,), _FlatView._aux_data(param)
+
+    @staticmethod
+    def _flatten_parameter_with_keys(param: "_FlatView") -> Tuple[Any, Tuple[Tuple[str, Any], ...]]:
+        return ((jax.tree_util.GetAttrKey("value"), param._value),), _FlatView._aux_data(param)
+
+    @staticmethod
+    def _unflatten_parameter(
+        aux_data: Tuple[Tuple[str, Any], ...], children: Any, *, cls: Type["_FlatView"]
+    ) -> BaseParam:
+        return _BaseParamMeta.unflatten_parameter(aux_data, children, cls=cls._view_of)
+
+
+@functools.cache
+def _view_class(cls: Type[Param]) -> Type[_FlatView]:
+    return _BaseParamMeta(f"Flat{cls.__name__}", (_FlatView, cls), {"_view_of": cls, "__module__": cls.__module__})
+
+
+# Core #################################################################################################################
+
+
+class FlatStore:
+    """
+    Contiguous storage for the values of a group of parameters. For example:
+
+    ```python
+    layers = px.FlatStore(pxu.Mask(pxnn.LayerParam)(model))
+
+    # The LayerParams of 'model' are now views of 'layers.buffers["float32"]'
+    ...
+
+    layers.release()  # the LayerParams store their own value again
+    ```
+
+    Only Params whose value is a jax.Array are included; any other parameter in the given pytree is ignored.
+    """
+
+    def __init__(self, params: PyTree):
+        """FlatStore constructor.
+
+        Args:
+            params (PyTree): the parameters to store. Each unique Param whose value is a jax.Array becomes a view of
+                the buffer corresponding to its dtype.
+
+        Raises:
+            ValueError: if any of the parameters already belongs to a FlatStore.
+        """
+        _groups = {}
+        for _p in jtu.tree_leaves(params, is_leaf=lambda x: isinstance(x, BaseParam)):
+            if isinstance(_p, _FlatView):
+                raise ValueError(f"Parameter {repr(_p)} already belongs to a FlatStore.")
+            elif isinstance(_p, Param) and isinstance(_p.get(), jax.Array):
+                _groups.setdefault(str(_p.get().dtype), {})[id(_p)] = _p
+
+        self.buffers = {
+            _dtype: Param(jnp.concatenate([_p.get().reshape(-1) for _p in _params.values()]))
+            for _dtype, _params in _groups.items()
+        }
+        self.params = ()
+
+        for _dtype, _params in _groups.items():
+            _offset = 0
+            for _p in _params.values():
+                _shape = tuple(_p.get().shape)
+
+                _p._flat = (self, _dtype, _offset, _shape)
+                del _p._value
+                _p.__class__ = _view_class(type(_p))
+
+                _offset += math.prod(_shape)
+
+            self.params += tuple(_params.values())
+
+    def release(self) -> None:
+        """Turns the views back into regular parameters, each storing its own value, and empties the store."""
+        for _p in self.params:
+            _value = _p._value
+
+            _p.__class__ = _p._view_of
+            for _k in _VIEW_KEYS:
+                if _k in _p.__dict__:
+                    delattr(_p, _k)
+            _p._value = _value
+
+        self.buffers = {}
+        self.params = ()
+
+    def __repr__(self) -> str:
+        _buffers = ", ".join(f"{_dtype}[{_b.get().size}]" for _dtype, _b in self.buffers.items())
+
+        return f"{self.__class__.__name__}({len(self.params)} params; {_buffers})"
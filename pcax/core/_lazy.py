@@ -0,0 +1,210 @@
+__all__ = [
+    "LazyModule",
+    "init"
+]
+
+
+from typing import Any, Callable
+import functools
+
+import jax
+import equinox as eqx
+
+from ._parameter import DynamicParam
+from ._module import _ModuleIndex
+from ._random import RandomKeyGenerator, RKG
+from ._static import static
+
+
+########################################################################################################################
+#
+# LAZY
+#
+# Some modules need information that is only available once their input is known (e.g., the number of input features
+# of a linear layer) to allocate their parameters. Such modules can be created lazily, in which case their parameters
+# are not allocated at construction. Instead, 'init' traces a function that uses them (usually the model forward pass)
+# with 'jax.eval_shape', which does not perform any computation. During the trace, each lazy module infers the missing
+# information from the abstract value of its input. Then, the parameters of all the lazy modules are materialised at
+# once within a single jitted function, using a different random key for each module (the layers reserve theirs at
+# construction, so that they are initialised as the equivalent eager layers). For example:
+#
+# ```python
+# class Model(pcax.Module):
+#     def __init__(self):
+#         self.l1 = pxnn.Linear(None, 128)  # 'None' input features are inferred at the first call
+#         self.l2 = pxnn.Linear(None, 10)
+#
+#    def __call__(self, x):
+#         return self.l2(jax.nn.relu(self.l1(x)))
+#
+# model = Model()  # no parameters are allocated
+# pcax.init(forward, x, model=model)  # 'forward' is only traced, no computation is performed
+# ```
+#
+# NOTE: the information inferred during the trace must not depend on the value of the inputs, but only on their shape
+# and dtype. Moreover, all the changes made to the parameters during the trace are discarded.
+#
+########################################################################################################################
+
+
+# Utils ################################################################################################################
+
+
+# Whether 'init' is tracing a function, so that lazy modules are allowed to infer their missing information.
+_INITIALISING = False
+
+
+class _Pending:
+    """
+    Placeholder stored (as a static value) in each lazy module. Since static values that do not define an equality
+    operator are compared by identity, every copy of the module created within a transformation refers to the same
+    placeholder, and the information inferred by any of them is available to the original module.
+    """
+
+    __slots__ = ("spec", "value")
+
+    def __init__(self, spec: Any):
+        self.spec = spec
+        self.value = None
+
+
+def _call_with_kwargs(fn: Callable, kwargs: Any, *args: Any) -> Any:
+    # Only the positional arguments are abstracted by 'jax.eval_shape' (so that they can be 'jax.ShapeDtypeStruct's),
+    # while the modules in the keyword arguments are used as they are.
+    return fn(*args, **kwargs)
+
+
+# Core #################################################################################################################
+
+
+class LazyModule:
+    """
+    Mixin for modules that can be created lazily (see 'init'). A lazy module stores its construction arguments in the
+    'lazy' attribute, which is removed once the module is materialised. Subclasses must call '_lazy_resolve' within
+    their first call and implement '_lazy_install' (and '_lazy_build', if they allocate any parameters).
+    """
+
+    __slots__ = ()
+
+    def _lazy_init(self, spec: Any = None) -> None:
+        """Marks the module as lazy.
+
+        Args:
+            spec (Any, optional): static information required to materialise the module (e.g., the constructor of
+                its parameters).
+        """
+        self.lazy = static(_Pending(spec))
+
+    @property
+    def is_lazy(self) -> bool:
+        """Whether the module has not been materialised yet."""
+        return "lazy" in self.__dict__
+
+    def _lazy_resolve(self, value: Any) -> Any:
+        """Records the information inferred from the current call.
+
+        Args:
+            value (Any): the inferred information, which is later passed to '_lazy_build' and '_lazy_install'.
+
+        Raises:
+            ValueError: if the module is not being initialised by 'init'.
+
+        Returns:
+            Any: the given value.
+        """
+        if not _INITIALISING:
+            raise ValueError(
+                f"{self.__class__.__name__} has not been initialised yet: it must be first called within 'pcax.init'."
+            )
+
+        self.lazy.get().value = value
+
+        return value
+
+    def _lazy_build(self, value: Any, key: jax.Array) -> Any:
+        """Allocates the parameters of the module. It must be a pure function as it is run within a jitted function.
+
+        Args:
+            value (Any): the information inferred by '_lazy_resolve'.
+            key (jax.Array): the random key reserved to the module.
+
+        Returns:
+            Any: pytree of the allocated parameters, which is passed to '_lazy_install'.
+        """
+        return None
+
+    def _lazy_install(self, value: Any, built: Any) -> None:
+        """Stores the allocated parameters in the module.
+
+        Args:
+            value (Any): the information inferred by '_lazy_resolve'.
+            built (Any): the output of '_lazy_build'.
+        """
+        raise NotImplementedError()
+
+
+def init(fn: Callable, *args: Any, rkg: RandomKeyGenerator = RKG, **kwargs: Any) -> Any:
+    """Materialises all the lazy modules found in the given arguments by tracing 'fn(*args, **kwargs)' with
+    'jax.eval_shape'. Each lazy module must be called during the trace (i.e., 'fn' must use it). Modules that are not
+    lazy are left unchanged.
+
+    The status of the modules is not changed, so a model with vodes must be traced with status 'STATUS.INIT' (as
+    otherwise their values are not initialised and the vodes return None). For example:
+
+    ```python
+    def init_fn(x, *, model):
+        with pxu.step(model, pxc.STATUS.INIT, clear_params=pxc.VodeParam.Cache):
+            return forward(x, model=model)  # vmapped forward pass
+
+    pcax.init(init_fn, jax.ShapeDtypeStruct(x.shape, x.dtype), model=model)
+    ```
+
+    Args:
+        fn (Callable): function using the lazy modules (usually the model forward pass). It is not executed.
+        *args (Any): positional arguments passed to 'fn'. Arrays can be replaced by 'jax.ShapeDtypeStruct's.
+        rkg (RandomKeyGenerator, optional): random key generator used to initialise the parameters. Defaults to RKG.
+        **kwargs (Any): keyword arguments passed to 'fn'. They must contain all the lazy modules to materialise.
+
+    Raises:
+        ValueError: if any of the lazy modules is not called by 'fn'.
+
+    Returns:
+        Any: the abstract output of 'fn' (i.e., a pytree of 'jax.ShapeDtypeStruct's).
+    """
+    global _INITIALISING
+
+    _index = _ModuleIndex((args, kwargs))
+
+    # Any parameter updated during the trace would hold a tracer, so we restore all of them afterwards.
+    _saved = tuple(
+        (_p, dict(_v) if isinstance(_v := _p.get(), dict) else _v)
+        for _p in _index.params + (rkg.key,)
+        if isinstance(_p, DynamicParam)
+    )
+
+    _initialising, _INITIALISING = _INITIALISING, True
+    try:
+        _out = jax.eval_shape(functools.partial(_call_with_kwargs, fn, kwargs), *args)
+    finally:
+        _INITIALISING = _initialising
+
+        for _p, _v in _saved:
+            _p.set(_v)
+
+    _lazy = tuple(_m for _m in _index.select(LazyModule, params=False) if _m.is_lazy)
+
+    for _m in _lazy:
+        if _m.lazy.get().value is None:
+            raise ValueError(f"Cannot infer the shape of {_m.__class__.__name__}: it was not called by '{fn}'.")
+
+    if len(_lazy):
+        _values = tuple(_m.lazy.get().value for _m in _lazy)
+        _built = eqx.filter_jit(
+            lambda keys: tuple(_m._lazy_build(_v, _k) for _m, _v, _k in zip(_lazy, _values, keys))
+        )(rkg.key.split(len(_lazy)))
+
+        for _m, _v, _b in zip(_lazy, _values, _built):
+            _m._lazy_install(_v, _b)
+            del _m.lazy
+
+    return _out
@@ -6,16 +6,18 @@ __all__ = [
 
 import abc
 import functools
+import itertools
+import operator
 from enum import IntEnum
-from typing import Any, Tuple, Generator, TypeVar, Type
+from types import UnionType
+from typing import Any, Callable, Tuple, Generator, TypeVar, Type
 
 import jax
 import jax.tree_util as jtu
 import equinox as eqx
 
-from ._parameter import DynamicParam
+from ._parameter import BaseParam, DynamicParam
 from ._static import static
-from ._tree import tree_apply
 
 
 T = TypeVar("T")
@@ -40,9 +42,103 @@ T = TypeVar("T")
 # leaves, structure = jtu.tree_flatten(obj)
 # print(leaves)  # (1, 2), structure contains the keys of the attributes "x" and "y"
 # ```
+#
+# Operations such as setting the mode/status of a model or clearing its parameters target all the (sub)modules or
+# parameters of a given type. Each module caches an index of its submodules and parameters (see '_ModuleIndex'), so that
+# such operations are a loop over a precomputed list instead of a recursive walk of the whole pytree.
 ########################################################################################################################
 
 
+# Utils ################################################################################################################
+
+
+# Each time an attribute of a module is set or deleted, the module is stamped with a new value from this counter.
+_STAMPS = itertools.count(1)
+_get_stamp = operator.attrgetter("_stamp")
+
+
+def _items(container: list | dict) -> Tuple[Tuple[Any, ...], Tuple[Any, ...]]:
+    """Returns the keys (empty for lists) and the values of a container."""
+    if isinstance(container, dict):
+        return tuple(container), tuple(container.values())
+
+    return (), tuple(container)
+
+
+def _same_items(a: Tuple[Tuple[Any, ...], Tuple[Any, ...]], b: Tuple[Tuple[Any, ...], Tuple[Any, ...]]) -> bool:
+    # Values are compared by identity, as they can be arrays (or modules, which define no equality).
+    return a[0] == b[0] and len(a[1]) == len(b[1]) and all(map(operator.is_, a[1], b[1]))
+
+
+class _ModuleIndex:
+    """
+    Flat index of all the (unique) modules and parameters of a pytree, in the order in which they are encountered
+    when flattening it. The selections by type are cached.
+
+    The index stores the stamp of each indexed module, and it is invalidated as soon as any of them changes (i.e., when
+    an attribute of any of the modules is set or deleted). Since lists and dicts can also be modified in place (e.g.,
+    'model.layers.append(layer)' or 'model.layers[0] = layer'), the index also stores the items of each of them and
+    it is invalidated if any item is added, removed or replaced.
+    """
+
+    def __init__(self, tree: Any):
+        _modules = {}
+        _containers = {}
+
+        def _is_leaf(x):
+            if isinstance(x, BaseModule):
+                _modules.setdefault(id(x), x)
+            elif isinstance(x, list | dict):
+                _containers.setdefault(id(x), x)
+
+            return isinstance(x, BaseParam)
+
+        _leaves = jtu.tree_leaves(tree, is_leaf=_is_leaf)
+
+        self.modules = tuple(_modules.values())
+        self.stamps = tuple(map(_get_stamp, self.modules))
+        # The items are stored (and not their ids) so that they cannot be garbage collected and their ids reused.
+        self.containers = tuple(_containers.values())
+        self.items = tuple(map(_items, self.containers))
+        self.params = tuple({id(_l): _l for _l in _leaves if isinstance(_l, BaseParam)}.values())
+        self._selections = {}
+
+    def is_valid(self) -> bool:
+        """Whether none of the indexed modules and containers has changed since the index was built."""
+        return tuple(map(_get_stamp, self.modules)) == self.stamps and all(
+            _same_items(_items(_c), _i) for _c, _i in zip(self.containers, self.items)
+        )
+
+    def select(self, filter: Callable[[Any], bool] | Type, *, params: bool) -> Tuple[Any, ...]:
+        """Returns the modules (or parameters, if 'params' is True) matching the given filter function or type."""
+        _nodes = self.params if params else self.modules
+
+        if not isinstance(filter, type | UnionType):
+            return tuple(_x for _x in _nodes if filter(_x))
+
+        if (_r := self._selections.get((filter, params), None)) is None:
+            _r = self._selections[(filter, params)] = tuple(_x for _x in _nodes if isinstance(_x, filter))
+
+        return _r
+
+    @staticmethod
+    def of(tree: Any) -> "_ModuleIndex":
+        """Returns the index of the given pytree, which is cached if the tree is a module."""
+        if not isinstance(tree, BaseModule):
+            return _ModuleIndex(tree)
+
+        try:
+            _index = tree._module_index
+        except AttributeError:
+            _index = None
+
+        if _index is None or not _index.is_valid():
+            _index = _ModuleIndex(tree)
+            object.__setattr__(tree, "_module_index", _index)
+
+        return _index
+
+
 # Core #################################################################################################################
 
 
@@ -82,7 +178,8 @@ class _BaseModuleMeta(abc.ABCMeta):
         aux_data: Tuple[str, ...], children: Tuple[Any, ...], cls: Type['BaseModule']
     ) -> 'BaseModule':
         _module = object.__new__(cls)
-                        
+        object.__setattr__(_module, "_stamp", 0)
+
         _module.__dict__ = dict(zip(
             aux_data,
             children
@@ -96,6 +193,23 @@ class BaseModule(metaclass=_BaseModuleMeta):
     _BaseModule is the base class for all modules in the library.
     """
 
+    # '_stamp' and '_module_index' (see '_ModuleIndex') are stored in slots so that they are not part of the pytree.
+    __slots__ = ("_stamp", "_module_index", "__dict__", "__weakref__")
+
+    def __new__(cls, *args, **kwargs):
+        _module = super().__new__(cls)
+        object.__setattr__(_module, "_stamp", 0)
+
+        return _module
+
+    def __setattr__(self, __name: str, __value: Any) -> None:
+        object.__setattr__(self, __name, __value)
+        object.__setattr__(self, "_stamp", next(_STAMPS))
+
+    def __delattr__(self, __name: str) -> None:
+        object.__delattr__(self, __name)
+        object.__setattr__(self, "_stamp", next(_STAMPS))
+
     def __call__(self):
         raise NotImplementedError
     
@@ -155,7 +269,8 @@ class Module(BaseModule):
         if value is None:
             return self._mode.get()
         else:
-            tree_apply(lambda m: m._mode.set(value), lambda x: isinstance(x, Module), self)
+            for _m in _ModuleIndex.of(self).select(Module, params=False):
+                _m._mode.set(value)
             
             return
         
@@ -18,6 +18,12 @@ import jax
 #
 ########################################################################################################################
 
+# Utils ################################################################################################################
+
+
+_VALUE_KEY = jax.tree_util.GetAttrKey("value")
+
+
 # Core #################################################################################################################
 
 
@@ -30,35 +36,44 @@ class _BaseParamMeta(abc.ABCMeta):
     def __new__(mcs, name, bases, dct):
         _cls = super().__new__(mcs, name, bases, dct)
 
+        # A class can customise how it is (un)flattened by defining the static methods '_flatten_parameter',
+        # '_flatten_parameter_with_keys' and '_unflatten_parameter', with the same signatures of the ones below.
         jax.tree_util.register_pytree_with_keys(
             _cls,
-            flatten_func=_BaseParamMeta.flatten_parameter,
-            flatten_with_keys=_BaseParamMeta.flatten_parameter_with_keys,
-            unflatten_func=functools.partial(_BaseParamMeta.unflatten_parameter, cls=_cls),
+            flatten_func=getattr(_cls, "_flatten_parameter", _BaseParamMeta.flatten_parameter),
+            flatten_with_keys=getattr(_cls, "_flatten_parameter_with_keys", _BaseParamMeta.flatten_parameter_with_keys),
+            unflatten_func=functools.partial(
+                getattr(_cls, "_unflatten_parameter", _BaseParamMeta.unflatten_parameter), cls=_cls
+            ),
         )
 
         return _cls
 
     @staticmethod
-    def flatten_parameter(param: "BaseParam") -> Tuple[Any, Dict[str, Any]]:
-        _aux_data = dict.copy(param.__dict__)
-        del _aux_data["_value"]
+    def aux_data(param: "BaseParam") -> Tuple[Tuple[str, Any], ...]:
+        """Returns the static attributes of a parameter as an immutable tuple of (name, value) pairs, sorted by name."""
+        _dict = param.__dict__
 
-        return (param._value,), _aux_data
+        # Names are unique, so sorting never compares the (possibly unorderable) values.
+        return tuple(sorted(_dict.items())) if _dict else ()
 
     @staticmethod
-    def flatten_parameter_with_keys(param: "BaseParam") -> Tuple[Any, Dict[str, Any]]:
-        _aux_data = dict.copy(param.__dict__)
-        del _aux_data["_value"]
+    def flatten_parameter(param: "BaseParam") -> Tuple[Any, Tuple[Tuple[str, Any], ...]]:
+        return (param._value,), _BaseParamMeta.aux_data(param)
 
-        return ((jax.tree_util.GetAttrKey("value"), param._value),), _aux_data
+    @staticmethod
+    def flatten_parameter_with_keys(param: "BaseParam") -> Tuple[Any, Tuple[Tuple[str, Any], ...]]:
+        return ((_VALUE_KEY, param._value),), _BaseParamMeta.aux_data(param)
 
     @staticmethod
-    def unflatten_parameter(aux_data: Dict[str, Any], children: Any, *, cls: Type["BaseParam"]) -> "BaseParam":
+    def unflatten_parameter(
+        aux_data: Tuple[Tuple[str, Any], ...], children: Any, *, cls: Type["BaseParam"]
+    ) -> "BaseParam":
         _param = object.__new__(cls)
 
-        _param.__dict__ = dict.copy(aux_data)
         _param._value = children[0]
+        if aux_data:
+            _param.__dict__.update(aux_data)
 
         return _param
 
@@ -66,8 +81,14 @@ class _BaseParamMeta(abc.ABCMeta):
 class BaseParam(metaclass=_BaseParamMeta):
     """
     Base abstract class for all parameters. It is used to detect whether an object is a parameter or not.
+
+    The (dynamic) value of a parameter is stored in a dedicated slot, while any other attribute (e.g., 'frozen') is
+    stored in '__dict__' and considered static. Since the value is not part of '__dict__', the aux data of a parameter
+    without static attributes is a shared empty tuple, and (un)flattening it does not require to copy any dictionary.
     """
 
+    __slots__ = ("_value", "__dict__", "__weakref__")
+
     def __init__(self, value: jax.Array | Any | None = None):
         """
         _BaseParam constructor.
@@ -272,6 +293,10 @@ class Param(DynamicParam):
         return self._value.__array__(dtype)
 
     def __getattr__(self, __name):
+        # '_value' is missing only if the parameter is being created (e.g., when unpickling), so we must not recurse.
+        if __name == "_value":
+            raise AttributeError(__name)
+
         return getattr(self._value, __name)
 
     @property
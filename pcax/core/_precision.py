@@ -0,0 +1,133 @@
+__all__ = ["Precision"]
+
+
+from typing import Any
+
+import jax
+import jax.numpy as jnp
+import jax.tree_util as jtu
+
+from ._parameter import DynamicParam
+from ._module import BaseModule, _ModuleIndex
+from ._static import static
+
+
+########################################################################################################################
+#
+# PRECISION
+#
+# A Precision policy specifies the dtypes used to store and to compute with the values of a model, so that it can be
+# run in half precision (bfloat16/float16) while keeping the numerically sensitive parts in float32:
+#
+# - 'param_dtype': dtype used to store the parameters of the model (e.g., the weights of the layers);
+# - 'compute_dtype': dtype the layers cast their weights and inputs to before being called;
+# - 'energy_dtype': dtype of the vode energies, which are cast before being summed over the vode units;
+# - 'energy_scale': constant the vode energies are multiplied by, so that small half precision gradients do not
+#   underflow. An Optim using the same policy divides the gradients by it before updating the parameters.
+#
+# A policy is applied to a model with 'Precision.apply', which stores it in all the modules that support it (i.e., whose
+# class defines a 'precision' attribute, such as 'pcax.nn.Layer' and 'pcax.predictive_coding.Vode') and casts their
+# parameters to 'param_dtype'. An Optim constructed with a policy keeps a float32 (master) copy of the parameters it
+# optimises, which is updated in place of the (lower precision) parameters.
+#
+########################################################################################################################
+
+
+# Utils ################################################################################################################
+
+
+def _cast(x: Any, dtype: jnp.dtype | None) -> Any:
+    """Casts all the floating point arrays in 'x' to 'dtype' (if not None)."""
+    if dtype is None:
+        return x
+
+    return jtu.tree_map(
+        lambda a: a.astype(dtype) if isinstance(a, jax.Array) and jnp.issubdtype(a.dtype, jnp.floating) else a, x
+    )
+
+
+# Core #################################################################################################################
+
+
+class Precision:
+    """Mixed precision policy. Policies with the same dtypes and scale are equal, so that they do not trigger
+    recompilation when stored in a model."""
+
+    def __init__(
+        self,
+        param_dtype: Any = jnp.float32,
+        compute_dtype: Any | None = None,
+        energy_dtype: Any | None = jnp.float32,
+        energy_scale: float = 1.0,
+    ):
+        """Precision constructor.
+
+        Args:
+            param_dtype (Any, optional): dtype used to store the parameters. Defaults to float32.
+            compute_dtype (Any | None, optional): dtype used for the computations of the layers. If None, the layers
+                are called with the dtype of their weights and inputs.
+            energy_dtype (Any | None, optional): dtype of the vode energies. Defaults to float32. If None, the dtype
+                returned by the energy function is used.
+            energy_scale (float, optional): constant the vode energies are multiplied by. Defaults to 1.0.
+        """
+        self.param_dtype = jnp.dtype(param_dtype)
+        self.compute_dtype = jnp.dtype(compute_dtype) if compute_dtype is not None else None
+        self.energy_dtype = jnp.dtype(energy_dtype) if energy_dtype is not None else None
+        self.energy_scale = float(energy_scale)
+
+    def _key(self):
+        return (self.param_dtype, self.compute_dtype, self.energy_dtype, self.energy_scale)
+
+    def _fingerprint(self):
+        return tuple(str(_k) for _k in self._key())
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, Precision) and self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(param_dtype={self.param_dtype}, compute_dtype={self.compute_dtype}, "
+            f"energy_dtype={self.energy_dtype}, energy_scale={self.energy_scale})"
+        )
+
+    def cast_to_param(self, x: Any) -> Any:
+        """Casts the floating point arrays in 'x' to 'param_dtype'."""
+        return _cast(x, self.param_dtype)
+
+    def cast_to_compute(self, x: Any) -> Any:
+        """Casts the floating point arrays in 'x' to 'compute_dtype'."""
+        return _cast(x, self.compute_dtype)
+
+    def scale_energy(self, e: jax.Array) -> jax.Array:
+        """Casts the given (per unit) energy to 'energy_dtype' and multiplies it by 'energy_scale'."""
+        e = _cast(e, self.energy_dtype)
+
+        return e * self.energy_scale if self.energy_scale != 1.0 else e
+
+    def unscale(self, grads: Any) -> Any:
+        """Casts the floating point arrays in 'grads' to float32 and divides them by 'energy_scale'."""
+        grads = _cast(grads, jnp.float32)
+
+        return jtu.tree_map(lambda g: g / self.energy_scale, grads) if self.energy_scale != 1.0 else grads
+
+    def apply(self, module: BaseModule) -> BaseModule:
+        """Stores the policy in all the (sub)modules of 'module' that support it and casts their floating point
+        parameters to 'param_dtype'.
+
+        Args:
+            module (BaseModule): the target module.
+
+        Returns:
+            BaseModule: the given module.
+        """
+        for _m in _ModuleIndex.of(module).select(lambda m: hasattr(type(m), "precision"), params=False):
+            _m.precision = static(self)
+
+            for _p in _ModuleIndex(_m).params:
+                if isinstance(_p, DynamicParam) and isinstance(_v := _p.get(), jax.Array):
+                    _p.set(self.cast_to_param(_v))
+
+        return module
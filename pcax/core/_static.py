@@ -4,9 +4,13 @@ __all__ = [
 ]
 
 
-from typing import Any
+from typing import Any, Tuple
+import enum
+import functools
 
-from ._parameter import BaseParam, get
+import jax.tree_util as jtu
+
+from ._parameter import BaseParam, _BaseParamMeta, get
 
 
 ########################################################################################################################
@@ -41,8 +45,120 @@ from ._parameter import BaseParam, get
 #       return self.f(x, y)  # NOTE: StaticParam overload many methods of the underlying value so that it can be used
 #                            # as if it were the value itself.
 # ```
+#
+# The static attributes of a parameter are part of the structure of any pytree containing it, so JAX compares them
+# every time a jitted function is called. Static values can be large (e.g., the 'Optim.filter' pytree or the rules of a
+# Vode), so StaticParams intern them: equal values are mapped to the same aux data object, whose hash is computed only
+# once, so that comparing two structures only requires comparing pointers.
 ########################################################################################################################
 
+# Utils ################################################################################################################
+
+
+class _UnkeyableValueError(TypeError):
+    """Raised when a static value cannot be safely compared by content."""
+
+    pass
+
+
+_MAX_DEPTH = 64
+
+
+def _static_key(x: Any, _depth: int = 0) -> Any:
+    """Hashable representation of a static value, equal only for values that are equal and of the same type. Objects
+    compared by identity (such as functions) are represented by themselves. Objects that are usually recreated with the
+    same content (such as masks) can define a '_fingerprint' method, whose result is used in their place.
+
+    It is used as the key of all the caches indexed by static values (interned aux data, dispatch tables and masks).
+
+    Raises:
+        _UnkeyableValueError: if 'x' (or any of its children) can be compared only by value but it is not hashable.
+    """
+    if _depth > _MAX_DEPTH:
+        raise _UnkeyableValueError("Static value too deeply nested (or recursive) to be interned.")
+    _k = functools.partial(_static_key, _depth=_depth + 1)
+
+    if x is None or isinstance(x, bool | int | float | complex | str | bytes | enum.Enum):
+        return (type(x), x)
+    elif isinstance(x, list | tuple):
+        return (type(x), tuple(map(_k, x)))
+    elif isinstance(x, dict):
+        # As for dict equality, the order of the items is irrelevant.
+        return (type(x), frozenset((_k(k), _k(v)) for k, v in x.items()))
+    elif isinstance(x, functools.partial):
+        return (type(x), _k(x.func), _k(x.args), _k(x.keywords))
+    elif hasattr(type(x), "_fingerprint"):
+        return (type(x), _k(x._fingerprint()))
+    elif type(x).__eq__ is object.__eq__:
+        return x
+
+    # Pytrees (such as Modules) are represented by their structure and leaves.
+    _leaves, _structure = jtu.tree_flatten(x)
+    if not (len(_leaves) == 1 and _leaves[0] is x):
+        return (_structure, tuple(map(_k, _leaves)))
+
+    try:
+        hash(x)
+    except TypeError:
+        raise _UnkeyableValueError(f"Cannot intern static value of type '{type(x).__qualname__}'.")
+
+    return (type(x), x)
+
+
+class _StaticAux(tuple):
+    """Aux data of a StaticParam, i.e., a tuple of (name, value) pairs with a precomputed key (see '_static_key') and
+    hash. Equal aux data are interned (see '_intern'), so they are usually compared by identity, and they are otherwise
+    compared by their key, consistently with their hash. Aux data containing values that cannot be compared by content
+    are not interned and are not hashable (as a regular tuple containing them would be)."""
+
+    def __new__(cls, items: Tuple[Tuple[str, Any], ...], key: Any | None = None):
+        _aux = super().__new__(cls, items)
+        _aux._key = key
+        _aux._hash = hash(key) if key is not None else None
+
+        return _aux
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, _StaticAux) and self._key is not None and other._key is not None:
+            return self is other or (self._hash == other._hash and self._key == other._key)
+
+        return tuple.__eq__(self, other)
+
+    def __ne__(self, other: Any) -> bool:
+        return not self == other
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            raise TypeError("Unhashable static value.")
+
+        return self._hash
+
+    def __reduce__(self):
+        return _intern, (tuple(self),)
+
+
+_interned = {}
+_MAX_INTERNED = 4096
+
+
+def _intern(items: Tuple[Tuple[str, Any], ...]) -> _StaticAux:
+    """Returns the interned aux data equal to the given (name, value) pairs."""
+    try:
+        _key = tuple((_n, _static_key(_v)) for _n, _v in items)
+        hash(_key)
+    except TypeError:
+        return _StaticAux(items)
+
+    if (_aux := _interned.get(_key, None)) is None:
+        # Interned values are kept alive by the table, so we only store the most recent ones. An evicted aux data is
+        # still valid, it is just not shared with the ones created afterwards.
+        if len(_interned) >= _MAX_INTERNED:
+            del _interned[next(iter(_interned))]
+        _aux = _interned[_key] = _StaticAux(items, _key)
+
+    return _aux
+
+
 # Core #################################################################################################################
 
 
@@ -59,8 +175,47 @@ class StaticParam(BaseParam):
     DEV NOTE: the change can be done by returning parameters instead of value in the transformations, and then update
     the whole original parameter __dict__ instead of only the value. This would allow to keep track of changes to
     static parameters as well (also to update the relevant code that as of now deals only with dynamic parameters).
+
+    The aux data of a StaticParam is interned the first time it is flattened and cached until any of its attributes is
+    set again. NOTE: this means that static values are treated as immutable: changing them in place (e.g., adding a key
+    to a wrapped dictionary) is not detected, 'set' must be used instead.
     """
 
+    __slots__ = ("_static_aux",)
+
+    def __setattr__(self, __name: str, __value: Any) -> None:
+        object.__setattr__(self, __name, __value)
+
+        if __name != "_static_aux":
+            object.__setattr__(self, "_static_aux", None)
+
+    def __delattr__(self, __name: str) -> None:
+        object.__delattr__(self, __name)
+        object.__setattr__(self, "_static_aux", None)
+
+    @staticmethod
+    def _aux_data(param: "StaticParam") -> _StaticAux:
+        if (_aux_data := param._static_aux) is None:
+            _aux_data = _intern(_BaseParamMeta.aux_data(param))
+            object.__setattr__(param, "_static_aux", _aux_data)
+
+        return _aux_data
+
+    @staticmethod
+    def _flatten_parameter(param: "StaticParam") -> Tuple[Any, _StaticAux]:
+        return (param._value,), StaticParam._aux_data(param)
+
+    @staticmethod
+    def _flatten_parameter_with_keys(param: "StaticParam") -> Tuple[Any, _StaticAux]:
+        return ((jtu.GetAttrKey("value"), param._value),), StaticParam._aux_data(param)
+
+    @staticmethod
+    def _unflatten_parameter(aux_data: _StaticAux, children: Any, *, cls: type) -> "StaticParam":
+        _param = _BaseParamMeta.unflatten_parameter(aux_data, children, cls=cls)
+        object.__setattr__(_param, "_static_aux", aux_data if isinstance(aux_data, _StaticAux) else None)
+
+        return _param
+
     def __init__(self, value: Any | None = None):
         """StaticParam constructor.
 
@@ -90,6 +245,10 @@ class StaticParam(BaseParam):
 
     def __getattr__(self, __name: str) -> Any:
         """Overloads __getattr__ to return the attribute of the static value."""
+        # '_static_value' is missing only if the parameter is being created (e.g., when unpickling).
+        if __name == "_static_value":
+            raise AttributeError(__name)
+
         return getattr(self._static_value, __name)
 
     def __contains__(self, __key: str) -> bool:
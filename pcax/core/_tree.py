@@ -9,6 +9,7 @@ import equinox as eqx
 
 from ..core._parameter import BaseParam, DynamicParam
 from ..core._static import StaticParam
+from ..core._flat import _batched_writes
 
 
 ########################################################################################################################
@@ -79,6 +80,133 @@ class _BaseParamRef(StaticParam):
         super().__init__(n)
 
 
+def _is_param(x: Any) -> bool:
+    return isinstance(x, BaseParam)
+
+
+# Kind of each type of leaf: 0 for non-parameters, 1 for parameters and 2 for references. 'isinstance' checks against
+# abstract classes are relatively expensive, so the result is cached for each type.
+_LEAF_KINDS = {}
+
+
+def _leaf_kind(x: Any) -> int:
+    if (_kind := _LEAF_KINDS.get(type(x), None)) is None:
+        _kind = _LEAF_KINDS[type(x)] = 2 if isinstance(x, _BaseParamRef) else 1 if isinstance(x, BaseParam) else 0
+
+    return _kind
+
+
+class _RefPlan:
+    """
+    Memoized references created by 'tree_ref' for a given pydag. The plan is keyed on the structure of the pydag (with
+    parameters as leaves) and on the identity of its parameters, which fully determine which leaves are duplicates: any
+    structural change (a new attribute, a replaced or newly shared parameter) results in a different key and thus in a
+    new plan. Since the plan is a function of the key only, it does not need to keep the parameters alive (i.e., it
+    stays valid even if an 'id' is recycled).
+
+    The references are created once and shared by all the pytrees reffed with the same plan (references are static
+    and never modified), so that also their aux data is computed only once.
+    """
+
+    _MAX_PLANS = 64
+    _plans = {}
+
+    # Marks the leaves that are already references, which are wrapped into a new reference (see 'tree_ref').
+    _REF = -1
+
+    def __init__(self, key: Tuple[Any, ...]):
+        _seen = _cache()
+        _refs = {}
+
+        def _slot(_id):
+            if _id is None:
+                return None
+            elif _id == self._REF:
+                return self._REF
+            elif (_r := _seen(_id)) is not None:
+                return _refs.setdefault(_r, _BaseParamRef(_r))
+
+            return None
+
+        # For each leaf, None if it is kept as is, '_REF' if it is wrapped into a new reference, or the reference that
+        # replaces it.
+        self.slots = tuple(map(_slot, key[1]))
+        self.is_identity = all(_s is None for _s in self.slots)
+
+    @staticmethod
+    def key(leaves: Sequence[Any], structure: jtu.PyTreeDef) -> Tuple[Any, ...]:
+        def _k(x):
+            _kind = _leaf_kind(x)
+
+            return None if _kind == 0 else id(x) if _kind == 1 else _RefPlan._REF
+
+        return (structure, tuple(map(_k, leaves)))
+
+    @classmethod
+    def get(cls, leaves: Sequence[Any], structure: jtu.PyTreeDef) -> "_RefPlan":
+        _key = cls.key(leaves, structure)
+
+        if (_plan := cls._plans.get(_key, None)) is None:
+            if len(cls._plans) >= cls._MAX_PLANS:
+                del cls._plans[next(iter(cls._plans))]
+            _plan = cls._plans[_key] = cls(_key)
+
+        return _plan
+
+    def ref(self, leaves: Sequence[Any]) -> Sequence[Any]:
+        if self.is_identity:
+            return leaves
+
+        return [
+            _x if _s is None else _BaseParamRef(_x) if _s is self._REF else _s for _x, _s in zip(leaves, self.slots)
+        ]
+
+
+class _UnrefPlan(_RefPlan):
+    """
+    Memoized inverse of '_RefPlan': for each reference, the position of the leaf it points to. The plan is keyed on the
+    structure of the pytree and on the content of its references (the parameters themselves are not part of the key, as
+    unreffing only depends on their position).
+    """
+
+    _plans = {}
+
+    # Marks the non-reference parameters and the nested references (which are unwrapped, see 'tree_unref').
+    _PARAM = -1
+    _NESTED = -2
+
+    def __init__(self, key: Tuple[Any, ...]):
+        _params = tuple(_i for _i, _k in enumerate(key[1]) if _k == self._PARAM)
+
+        # For each leaf, None if it is kept as is, '_NESTED' if it is a nested reference, or the position of the
+        # referenced parameter.
+        self.slots = tuple(
+            None if _k is None or _k == self._PARAM else _k if _k == self._NESTED else _params[_k] for _k in key[1]
+        )
+        self.is_identity = all(_s is None for _s in self.slots)
+
+    @staticmethod
+    def key(leaves: Sequence[Any], structure: jtu.PyTreeDef) -> Tuple[Any, ...]:
+        def _k(x):
+            _kind = _leaf_kind(x)
+            if _kind == 2:
+                x = x.get()
+
+                return x if isinstance(x, int) else _UnrefPlan._NESTED
+
+            return None if _kind == 0 else _UnrefPlan._PARAM
+
+        return (structure, tuple(map(_k, leaves)))
+
+    def unref(self, leaves: Sequence[Any]) -> Sequence[Any]:
+        if self.is_identity:
+            return leaves
+
+        return [
+            _x if _s is None else _x.get() if _s == self._NESTED else leaves[_s] for _x, _s in zip(leaves, self.slots)
+        ]
+
+
 # Core #################################################################################################################
 
 
@@ -213,7 +341,9 @@ def tree_inject(
         else:
             return False
 
-    jtu.tree_leaves(pydag, is_leaf=_inject_param)
+    # Writes to FlatStore views are applied to their buffers at once.
+    with _batched_writes():
+        jtu.tree_leaves(pydag, is_leaf=_inject_param)
 
     if strict is True:
         # This is to assert the user didn't mess up with the pytree structure.
@@ -235,27 +365,18 @@ def tree_ref(pydag: PyTree) -> PyTree:
 
     NOTE #1: ref has some usage limitations, see unref for a complete overview.
 
+    NOTE #2: the positions of the references depend only on the structure of the pydag and on the identity of its
+    parameters, so they are memoized (see '_RefPlan'): reffing the same model again does not require to recompute them.
+
     Args:
         pydag (PyTree): input pydag
 
     Returns:
         PyTree: output pytree with duplicate BaseParams replaced by explicit references.
     """
-    # We use BaseParam and not Param to target also StaticParams and ParamDicts.
-    _seen = _cache()
-
-    def _ref(x):
-        if isinstance(x, _BaseParamRef):
-            # We ref a ref to keep the structure consistent and allow multiple reffing/unreffing.
-            return _BaseParamRef(x)
-        elif isinstance(x, BaseParam) and ((_ref := _seen(id(x))) is not None):
-            # If the parameter is already seen, we replace it with a reference.
-            # _ref is an integer that refers to the index of parameter in the ordered sequence of unique parameters
-            # encountered in pydag during flattening.
-            return _BaseParamRef(_ref)
-        return x
+    _leaves, _structure = jtu.tree_flatten(pydag, is_leaf=_is_param)
 
-    return jtu.tree_map(_ref, pydag, is_leaf=lambda x: isinstance(x, BaseParam))
+    return jtu.tree_unflatten(_structure, _RefPlan.get(_leaves, _structure).ref(_leaves))
 
 
 def tree_unref(pytree: PyTree) -> PyTree:
@@ -316,16 +437,6 @@ def tree_unref(pytree: PyTree) -> PyTree:
     Returns:
         PyTree: output pydag with resolved references.
     """
-    _seen = []
-
-    def _unref(x: Any) -> Any:
-        if isinstance(x, _BaseParamRef):
-            # Since a _BaseParamRef can be nested, we check if we reached the final index and, if so, unref.
-            x = x.get()
-            return _seen[x] if isinstance(x, int) else x
-        elif isinstance(x, BaseParam):
-            _seen.append(x)
-
-        return x
+    _leaves, _structure = jtu.tree_flatten(pytree, is_leaf=_is_param)
 
-    return jtu.tree_map(_unref, pytree, is_leaf=lambda x: isinstance(x, BaseParam))
+    return jtu.tree_unflatten(_structure, _UnrefPlan.get(_leaves, _structure).unref(_leaves))
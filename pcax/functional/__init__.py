@@ -1,17 +1,24 @@
 __all__ = [
     "scan",
     "while_loop",
+    "fori_loop",
     "cond",
     "switch",
     "jit",
     "vmap",
+    "pmap",
+    "shard_map",
+    "remat",
     "value_and_grad",
+    "grad",
+    "jvp",
+    "hvp",
 ]
 
 from typing import Any, Hashable, Sequence, Callable
 
-from ._transform import _BaseTransform, Jit, Vmap, ValueAndGrad
-from ._flow import Scan, WhileLoop, Cond, Switch
+from ._transform import _BaseTransform, Jit, Vmap, Pmap, ShardMap, Remat, ValueAndGrad, Grad, Jvp, Hvp
+from ._flow import Scan, WhileLoop, ForiLoop, Cond, Switch
 
 
 # Flow ###############################################################################################################
@@ -36,6 +43,14 @@ def while_loop(
     return WhileLoop(f, cond_fun=cond_fun)
 
 
+def fori_loop(
+    f: _BaseTransform | Callable,
+    unroll: int | bool | None = None,
+) -> ForiLoop:
+    """Utility function to use the jax.lax.fori_loop syntax for the :class:`~pcax.functional.ForiLoop` transformation."""
+    return ForiLoop(f, unroll=unroll)
+
+
 def cond(
     true_fun: _BaseTransform | Callable,
     false_fun: _BaseTransform | Callable,
@@ -59,11 +74,17 @@ def jit(
     # static_argnames=None,  # this is currently disabled as it hasn't been tested.
     donate_argnums=None,
     donate_argnames=None,
+    donate_tracked: bool = False,
+    cache_dir: str | None = None,
+    explain_retrace: bool = False,
     **kwargs,
 ):
     def decorator(fn: _BaseTransform | Callable):
         return Jit(
             fn,
+            donate_tracked=donate_tracked,
+            cache_dir=cache_dir,
+            explain_retrace=explain_retrace,
             static_argnums=static_argnums,
             # static_argnames=static_argnames,
             donate_argnums=donate_argnums,
@@ -79,15 +100,64 @@ def vmap(
     in_axes: Sequence[int | None] = (),
     out_axes: Sequence[int | None] = (),
     axis_name: str | None = None,
+    axis_size: int | None = None,
+    split_rkg: bool = False,
 ):
     def decorator(fn: _BaseTransform | Callable):
         return Vmap(
-            fn, kwargs_mask, in_axes=in_axes, out_axes=out_axes, axis_name=axis_name
+            fn,
+            kwargs_mask,
+            split_rkg=split_rkg,
+            in_axes=in_axes,
+            out_axes=out_axes,
+            axis_name=axis_name,
+            axis_size=axis_size,
+        )
+
+    return decorator
+
+
+def pmap(
+    kwargs_mask: Any = {},
+    in_axes: Sequence[int | None] = (),
+    out_axes: Sequence[int | None] = (),
+    axis_name: str | None = None,
+    **kwargs,
+):
+    def decorator(fn: _BaseTransform | Callable):
+        return Pmap(
+            fn, kwargs_mask, in_axes=in_axes, out_axes=out_axes, axis_name=axis_name, **kwargs
         )
 
     return decorator
 
 
+def shard_map(
+    kwargs_mask: Any = {},
+    mesh: Any = None,
+    in_specs: Sequence[Any] = (),
+    out_specs: Any = None,
+    **kwargs,
+):
+    def decorator(fn: _BaseTransform | Callable):
+        return ShardMap(
+            fn, kwargs_mask, mesh=mesh, in_specs=in_specs, out_specs=out_specs, **kwargs
+        )
+
+    return decorator
+
+
+def remat(
+    prevent_cse: bool = True,
+    policy: Callable[..., bool] | None = None,
+    static_argnums: int | Sequence[int] = (),
+):
+    def decorator(fn: _BaseTransform | Callable):
+        return Remat(fn, prevent_cse=prevent_cse, policy=policy, static_argnums=static_argnums)
+
+    return decorator
+
+
 def value_and_grad(
     kwargs_mask: Any = {},
     argnums: int | Sequence[int] = (),
@@ -100,3 +170,37 @@ def value_and_grad(
         )
 
     return decorator
+
+
+def grad(
+    kwargs_mask: Any = {},
+    argnums: int | Sequence[int] = (),
+    has_aux: bool = False,
+    reduce_axes: Sequence[Hashable] = (),
+):
+    def decorator(fn: _BaseTransform | Callable):
+        return Grad(
+            fn, kwargs_mask, argnums=argnums, has_aux=has_aux, reduce_axes=reduce_axes
+        )
+
+    return decorator
+
+
+def jvp(
+    kwargs_mask: Any = {},
+    has_aux: bool = False,
+):
+    def decorator(fn: _BaseTransform | Callable):
+        return Jvp(fn, kwargs_mask, has_aux=has_aux)
+
+    return decorator
+
+
+def hvp(
+    kwargs_mask: Any = {},
+    has_aux: bool = False,
+):
+    def decorator(fn: _BaseTransform | Callable):
+        return Hvp(fn, kwargs_mask, has_aux=has_aux)
+
+    return decorator
@@ -0,0 +1,127 @@
+__all__ = ["ExecutableCache"]
+
+
+import hashlib
+import os
+import pickle
+import warnings
+
+import jax
+import jax.tree_util as jtu
+from jax.experimental import serialize_executable
+
+
+########################################################################################################################
+#
+# CACHE
+#
+# Compiling a jitted function can take a long time (especially when many inference steps are unrolled), and jax only
+# caches the compiled executables in memory. ExecutableCache stores them on disk so that they can be reused by other
+# processes (e.g., when restarting a job, or by the workers of a hyperparameter sweep).
+#
+# The key is computed from the lowered program (i.e., the StableHLO text produced by tracing the function), together
+# with the structure of its outputs and the jax version and devices it is compiled for. So, anything that changes the
+# computation (the code of the function and of the modules it calls, constants, global values, static arguments and
+# attributes, input shapes and dtypes, donated buffers) changes the key, while the (expensive) XLA compilation is
+# skipped whenever an equal program has already been compiled. Tracing is still required to obtain the key.
+#
+########################################################################################################################
+
+
+# Core #################################################################################################################
+
+
+class ExecutableCache:
+    """
+    On-disk cache of compiled executables. Each entry is stored in a separate file, whose name is the hash of the
+    lowered program it was compiled from.
+    """
+
+    def __init__(self, path: str):
+        """ExecutableCache constructor.
+
+        Args:
+            path (str): directory where to store the compiled executables. It is created if it does not exist.
+        """
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def fingerprint(lowered: jax.stages.Lowered) -> str | None:
+        """Computes the key of a lowered function.
+
+        Args:
+            lowered (jax.stages.Lowered): the lowered function, as returned by 'jax.jit(...).lower'.
+
+        Returns:
+            str | None: the key, or None if the function cannot be cached (i.e., the structure of its outputs is not
+                stable across processes).
+        """
+        _out_tree = str(lowered.out_tree)
+        if " at 0x" in _out_tree:
+            warnings.warn("Compiled executable cannot be cached: the outputs structure is not stable across processes.")
+
+            return None
+
+        _key = "|".join(
+            (
+                jax.__version__,
+                jax.lib.__version__,
+                *(f"{d.platform}:{d.device_kind}" for d in jax.local_devices()),
+                _out_tree,
+                # Unused inputs are pruned from the program, so the inputs are keyed separately.
+                *(f"{_a._aval}:{_a.donated}" for _a in jtu.tree_leaves(lowered.args_info)),
+                lowered.as_text(),
+            )
+        )
+
+        return hashlib.sha256(_key.encode()).hexdigest()
+
+    def load(self, key: str, in_tree: jtu.PyTreeDef) -> jax.stages.Compiled | None:
+        """Loads the compiled executable corresponding to the given key, if present.
+
+        Args:
+            key (str): the key returned by 'ExecutableCache.fingerprint'.
+            in_tree (jtu.PyTreeDef): the structure of the inputs of the executable, in the format expected by
+                'jax.stages.Compiled' (i.e., (args, kwargs) without static arguments).
+
+        Returns:
+            jax.stages.Compiled | None: the compiled executable, or None if not found.
+        """
+        _path = os.path.join(self.path, f"{key}.pcax")
+        if not os.path.exists(_path):
+            return None
+
+        try:
+            with open(_path, "rb") as f:
+                _serialized, _out_tree = pickle.load(f)
+
+            return serialize_executable.deserialize_and_load(_serialized, in_tree, _out_tree)
+        except Exception as e:
+            warnings.warn(f"Failed to load the compiled executable '{_path}': {e}")
+
+            return None
+
+    def save(self, key: str, compiled: jax.stages.Compiled) -> None:
+        """Stores the given compiled executable with the given key.
+
+        Args:
+            key (str): the key returned by 'ExecutableCache.fingerprint'.
+            compiled (jax.stages.Compiled): the compiled executable.
+        """
+        _path = os.path.join(self.path, f"{key}.pcax")
+
+        try:
+            _serialized, _, _out_tree = serialize_executable.serialize(compiled)
+            _data = pickle.dumps((_serialized, _out_tree))
+        except Exception as e:
+            warnings.warn(f"Failed to serialize the compiled executable: {e}")
+
+            return
+
+        # Write to a temporary file first, so that concurrent workers never read a partially written file.
+        _tmp_path = f"{_path}.{os.getpid()}.tmp"
+        with open(_tmp_path, "wb") as f:
+            f.write(_data)
+        os.replace(_tmp_path, _path)
+
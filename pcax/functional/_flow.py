@@ -1,4 +1,4 @@
-__all__ = ["Scan", "WhileLoop", "Cond", "Switch"]
+__all__ = ["Scan", "WhileLoop", "ForiLoop", "Cond", "Switch"]
 
 
 from typing import Callable, Any, Sequence
@@ -117,6 +117,49 @@ class WhileLoop(_BaseTransform):
         return _r, kwargs
 
 
+class ForiLoop(_BaseTransform):
+    """
+    pcax wrap around jax.lax.fori_loop(..., body_fun, ...).
+    Takes the same function arguments (except 'lower', 'upper' and 'init_val', with the first two passed when calling
+    the transformation) but does not require a compact val argument. In particular, fn must have signature
+    fn(i, *args, **kwargs) -> args, where 'i' is the loop index. If no positional argument is given, fn can return None.
+    Since the loop bounds can be dynamic values, the number of iterations can change without recompiling.
+
+    Example:
+
+    .. code-block:: python
+
+        def inference_step(i, x, *, model, optim_h):
+            with pxu.step(model, clear_params=pxc.VodeParam.Cache):
+                _, g = pxf.value_and_grad(...)(energy)(x, model=model)
+            optim_h.step(model, g["model"])
+
+            return (x,)
+
+        ForiLoop(inference_step)(0, T, x, model=model, optim_h=optim_h)
+    """
+
+    def __init__(self, fn: _BaseTransform | Callable, **t_kwargs: Any):
+        """ForiLoop constructor.
+
+        Args:
+            fn (_BaseTransformation | Callable): function corresponding to `body_fun` for jax.lax.fori_loop.
+        """
+        super().__init__(fn)
+
+        self.t_kwargs = t_kwargs
+
+    def _t(self, lower, upper, *args, **kwargs):
+        def _wrap_fn(i, args):
+            _args, _kwargs = args
+            _r, _kwargs = self.fn(i, *_args, **_kwargs)
+
+            return (_make_tuple(_r) if _r is not None else ()), _kwargs
+
+        _r, kwargs = jax.lax.fori_loop(lower, upper, _wrap_fn, (args, kwargs), **self.t_kwargs)
+        return _r, kwargs
+
+
 class Cond(_BaseTransform):
     """
     pcax wrap around jax.lax.cond(..., true_fn, false_fn, ...).
@@ -1,15 +1,22 @@
-from typing import Any, Callable, Tuple, Sequence
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple, Sequence
 from jaxtyping import PyTree
 import abc
 import inspect
+import math
+import os
+import warnings
 
 import jax
+import jax.numpy as jnp
 import jax.tree_util as jtu
 import equinox as eqx
 
-from ..core._tree import tree_extract, tree_inject, tree_ref, tree_unref
+from ..core._tree import tree_extract, tree_inject, tree_ref, tree_unref, _BaseParamRef
 from ..core._random import RKG
-from ..core._parameter import BaseParam
+from ..core._parameter import BaseParam, DynamicParam
+from ..core._static import _static_key
+from ..core._flat import _FlatView, _splice
+from ._cache import ExecutableCache
 
 
 ########################################################################################################################
@@ -86,6 +93,253 @@ def _repr_function(f: Callable) -> str:
     return f.__name__
 
 
+def _mapped_axis_size(in_axes: PyTree, args: PyTree) -> int | None:
+    """Return the size of the mapped axis, read from the first mapped jax.Array in 'args' (which 'in_axes' is a
+    prefix of)."""
+
+    def _extract_axis_size(node, axis):
+        if axis is None:
+            return None
+
+        for param in filter(lambda _node: hasattr(_node, "shape"), jtu.tree_leaves(node)):
+            return param.shape[axis]
+
+        return None
+
+    return jtu.tree_leaves(
+        jtu.tree_map(lambda axis, node: _extract_axis_size(node, axis), in_axes, args, is_leaf=lambda x: x is None)
+    )[0]
+
+
+def _trace_signature(args: Tuple[Any, ...], kwargs: PyTree) -> Dict[str, str]:
+    """Describes the inputs of a traced function as a flat dictionary mapping the path of each input to a string
+    describing it: abstract shape and dtype for traced values, value for static ones, and static attributes for
+    parameters."""
+
+    def _describe(x: Any) -> str:
+        return str(x.aval) if isinstance(x, jax.core.Tracer) else repr(x)
+
+    def _describe_param(x: BaseParam) -> str:
+        _aux = ", ".join(f"{k}={_describe(v)}" for k, v in x.__dict__.items() if k != "_value")
+        _value = jtu.tree_map(_describe, x._value)
+
+        return f"{type(x).__name__}({_value}; {_aux})"
+
+    _signature = {}
+    for _prefix, _tree in (("args", args), ("kwargs", kwargs)):
+        for _path, _x in jtu.tree_flatten_with_path(_tree, is_leaf=_is_param)[0]:
+            _signature[f"{_prefix}{jtu.keystr(_path)}"] = (
+                _describe_param(_x) if isinstance(_x, BaseParam) else _describe(_x)
+            )
+
+    return _signature
+
+
+def _diff_signatures(old: Dict[str, str], new: Dict[str, str], max_items: int = 8) -> List[str]:
+    """Lists the differences between two signatures computed by '_trace_signature'."""
+    _diff = [f"{k}: {old[k]} -> {new[k]}" for k in new if k in old and old[k] != new[k]]
+    _diff += [f"{k}: added {new[k]}" for k in new if k not in old]
+    _diff += [f"{k}: removed {old[k]}" for k in old if k not in new]
+
+    if len(_diff) > max_items:
+        _diff = _diff[:max_items] + [f"... and {len(_diff) - max_items} more"]
+
+    return _diff
+
+
+def _is_param(x: Any) -> bool:
+    return isinstance(x, BaseParam)
+
+
+class _ViewSlot(NamedTuple):
+    """Layout slot of a FlatStore view: its value is the slice [offset, offset + prod(shape)) of the tracked buffer in
+    position 'buffer', and 'structure' is used to rebuild it as a regular parameter."""
+
+    buffer: int
+    offset: int
+    shape: Tuple[int, ...]
+    structure: jtu.PyTreeDef
+
+
+class _CallPlan:
+    """
+    Precomputed description of how a given kwargs pydag is passed through a jax transformation. It stores the
+    structure of the kwargs (with parameters as leaves), which of its leaves are duplicate references to an already
+    seen parameter (and thus are replaced by a '_BaseParamRef' as 'tree_ref' would do), and the flat list of unique
+    DynamicParams whose values are updated by the transformation. Once built, calling the transformation only requires
+    to gather the leaves of the kwargs, and to scatter the returned values back into 'params'.
+
+    The leaves passed to the transformation are split in two groups: the tracked DynamicParams and all the other
+    leaves (StaticParams and any non-parameter value), so that the former can be donated if required.
+
+    Views of a 'FlatStore' are not passed individually: their buffers are tracked in their place, the views are rebuilt
+    as slices of the buffers within the transformation, and their updated values are packed back into the buffers
+    before returning (see '_CallPlan.pack').
+
+    The plan is keyed on the structure of the kwargs and on the identity of its parameters (see '_CallPlan.key'), and
+    it holds a reference to them, so the identity check cannot be fooled by a recycled 'id'.
+    """
+
+    def __init__(self, leaves: Sequence[Any], structure: jtu.PyTreeDef):
+        """_CallPlan constructor.
+
+        Args:
+            leaves (Sequence[Any]): the leaves of the kwargs pydag, flattened with parameters as leaves.
+            structure (jtu.PyTreeDef): the corresponding tree structure.
+
+        Raises:
+            ValueError: if the kwargs already contain references (i.e., they are not a root pydag).
+        """
+        _reffed = jtu.tree_leaves(tree_ref(jtu.tree_unflatten(structure, leaves)), is_leaf=_is_param)
+
+        # Each leaf is classified as a tracked parameter (its index among the tracked parameters), another
+        # input (its index among the other inputs, shifted by the number of tracked parameters once known),
+        # a view of a FlatStore buffer (whose buffer is tracked in place of the view), or a reference (tuple),
+        # which is a static value and thus can be recreated within the transformation.
+        _tracked, _others_idx, _buffers = [], [], {}
+        _slots = []
+        for _i, (_leaf, _r) in enumerate(zip(leaves, _reffed)):
+            if _r is _leaf and isinstance(_leaf, _FlatView):
+                _store, _dtype, _offset, _shape = _leaf.__dict__["_flat"]
+                _buffer = _store.buffers[_dtype]
+
+                if (_b := _buffers.get(id(_buffer), None)) is None:
+                    _b = _buffers[id(_buffer)] = len(_tracked)
+                    _tracked.append(_buffer)
+                _slots.append(_ViewSlot(_b, _offset, _shape, jtu.tree_structure(_leaf)))
+            elif _r is _leaf and isinstance(_leaf, DynamicParam):
+                _slots.append(("p", len(_tracked)))
+                _tracked.append(_leaf)
+            elif _r is _leaf:
+                _slots.append(("o", len(_others_idx)))
+                _others_idx.append(_i)
+            elif isinstance(_r, _BaseParamRef) and isinstance(_r.get(), int):
+                _slots.append((_r.get(),))
+            else:
+                raise ValueError("Cannot build a call plan for already reffed kwargs.")
+
+        _n = len(_tracked)
+        self.others_idx = tuple(_others_idx)
+        self.params = tuple(_tracked)
+        self.layout = (
+            structure,
+            tuple(
+                _s
+                if isinstance(_s, _ViewSlot)
+                else _s[1] if _s[0] == "p" else _n + _s[1] if _s[0] == "o" else _s
+                for _s in _slots
+            ),
+        )
+
+    @staticmethod
+    def key(leaves: Sequence[Any], structure: jtu.PyTreeDef) -> Tuple[Any, ...]:
+        # Views are identified by their buffer as well, since they can be released or moved to a new FlatStore.
+        return (
+            structure,
+            tuple(
+                (id(_x), id(_x.__dict__["_flat"][0].buffers[_x.__dict__["_flat"][1]]))
+                if isinstance(_x, _FlatView)
+                else id(_x) if isinstance(_x, BaseParam) else None
+                for _x in leaves
+            ),
+        )
+
+    def gather(self, leaves: Sequence[Any]) -> Tuple[Tuple[Any, ...], Tuple[Any, ...]]:
+        """Select the leaves of the kwargs that are passed to the transformation (i.e., all but the references),
+        split into tracked parameters and other inputs."""
+        return self.params, tuple(leaves[_i] for _i in self.others_idx)
+
+    def scatter(self, values: Sequence[Any]) -> None:
+        """Write the values returned by the transformation back into the tracked parameters."""
+        for _p, _v in zip(self.params, values):
+            _p.set(_v)
+
+    @staticmethod
+    def unflatten(layout: Tuple[Any, ...], inputs: Sequence[Any]) -> PyTree:
+        """Rebuild the reffed kwargs pytree from the leaves received by the transformation (tracked parameters
+        first, followed by the other inputs)."""
+        structure, slots = layout
+
+        def _leaf(_s):
+            if isinstance(_s, int):
+                return inputs[_s]
+            elif isinstance(_s, _ViewSlot):
+                # Views are rebuilt as regular parameters, whose value is a slice of the buffer.
+                _value = inputs[_s.buffer].get()[_s.offset : _s.offset + math.prod(_s.shape)].reshape(_s.shape)
+
+                return jtu.tree_unflatten(_s.structure, (_value,))
+            else:
+                return _BaseParamRef(_s[0])
+
+        return jtu.tree_unflatten(structure, [_leaf(_s) for _s in slots])
+
+    @staticmethod
+    def pack(layout: Tuple[Any, ...], tracked: Sequence[DynamicParam], kwargs: PyTree) -> None:
+        """Write the values of the parameters rebuilt from FlatStore views back into their (tracked) buffers."""
+        structure, slots = layout
+
+        _views = {}
+        for _s, _p in zip(slots, structure.flatten_up_to(kwargs)):
+            if isinstance(_s, _ViewSlot):
+                _views.setdefault(_s.buffer, []).append((_s, _p.get()))
+
+        for _b, _vs in _views.items():
+            _buffer = tracked[_b].get()
+
+            # Views that are not part of kwargs keep their previous value.
+            for _s, _v in _vs:
+                if getattr(_v, "shape", None) != _s.shape or getattr(_v, "dtype", None) != _buffer.dtype:
+                    raise ValueError(
+                        f"Cannot set a value of shape {getattr(_v, 'shape', None)} and dtype "
+                        f"{getattr(_v, 'dtype', None)} to a flat parameter of shape {_s.shape} and dtype "
+                        f"{_buffer.dtype}. Release its FlatStore first."
+                    )
+
+            tracked[_b].set(_splice(_buffer, tuple((_s.offset, _v.reshape(-1)) for _s, _v in _vs)))
+
+    @staticmethod
+    def extract(tracked: Sequence[DynamicParam]) -> Tuple[Any, ...]:
+        """Collect the (updated) values of the tracked parameters, in the same order of '_CallPlan.params'. Values are
+        read from the tracked parameters themselves: as with 'tree_extract', a parameter replaced by a new object
+        within the transformation (e.g., 'model.w = Param(...)') is not tracked, and its value is discarded."""
+        return tuple(_p.get() for _p in tracked)
+
+
+class _MaskPartition:
+    """
+    Precomputed result of 'eqx.partition(kwargs, mask, is_leaf=_is_param)' for a given kwargs structure: it stores
+    which of the kwargs' leaves (with parameters as leaves) are selected by the mask, so that splitting and combining
+    the kwargs does not require to evaluate the mask again. A mask is assumed to depend only on the structure of the
+    kwargs (which includes the type and the static attributes of each parameter) and on the shape and dtype of their
+    values, and not on the values themselves.
+    """
+
+    def __init__(self, mask: PyTree, structure: jtu.PyTreeDef):
+        # We partition the indices of the leaves, so that we obtain the selected ones following 'eqx.partition' rules
+        # (e.g., a mask can be a prefix of the kwargs).
+        _target, _ = eqx.partition(
+            jtu.tree_unflatten(structure, range(structure.num_leaves)), mask, is_leaf=_is_param
+        )
+        _target_idx = set(jtu.tree_leaves(_target))
+
+        self.structure = structure
+        self.is_target = tuple(_i in _target_idx for _i in range(structure.num_leaves))
+
+    def split(self, leaves: Sequence[Any]) -> Tuple[PyTree, PyTree]:
+        return (
+            jtu.tree_unflatten(self.structure, [_l if _m else None for _l, _m in zip(leaves, self.is_target)]),
+            jtu.tree_unflatten(self.structure, [None if _m else _l for _l, _m in zip(leaves, self.is_target)]),
+        )
+
+    def combine(self, target: PyTree, other: PyTree) -> PyTree:
+        _target = self.structure.flatten_up_to(target)
+        _other = self.structure.flatten_up_to(other)
+
+        return jtu.tree_unflatten(
+            self.structure, [_t if _m else _o for _t, _o, _m in zip(_target, _other, self.is_target)]
+        )
+
+
 # Core #################################################################################################################
 
 
@@ -236,6 +490,72 @@ class _BaseTransform(abc.ABC):
 
         return mask
 
+    # Processed masks are shared among all the transformations using an equal mask, as masks are usually recreated
+    # every time a transformation is called (e.g., once per inference step).
+    _masks_cache: Dict[Any, Any] = {}
+    _MAX_MASKS_CACHE = 256
+
+    def _cached_mask(
+        self, mask: PyTree, kwargs: PyTree, rkg_mask=None, build: Callable[[PyTree], Any] = lambda mask: mask
+    ) -> Any:
+        """Cached version of '_process_mask'. The processed mask is computed only the first time the mask is applied to
+        kwargs with a given structure and it is then reused.
+
+        Args:
+            mask (PyTree): the mask, as in '_process_mask'.
+            kwargs (PyTree): keyword arguments to which the mask is applied.
+            rkg_mask (optional): the mask value for the RKG, as in '_process_mask'.
+            build (Callable[[PyTree], Any], optional): function applied to the processed mask before caching it, to
+                cache any further computation depending only on it. Defaults to the identity. Different transformations
+                should not use different 'build' functions with equal masks, as they share the same cache.
+
+        Returns:
+            Any: the (built) processed mask. It must not be modified, as it is shared.
+        """
+        # The mask may depend on the type, the static attributes and the shape of the parameters, so we use the full
+        # structure of the kwargs and the shape and dtype of their leaves as key.
+        _leaves, _structure = jtu.tree_flatten(kwargs)
+        _kwargs_key = (
+            _structure,
+            tuple((getattr(_l, "shape", None), getattr(_l, "dtype", None)) for _l in _leaves),
+        )
+        try:
+            _key = (type(self), _static_key(mask), _static_key(rkg_mask), _kwargs_key)
+            _cache = _BaseTransform._masks_cache
+        except TypeError:
+            # Masks containing values that cannot be compared by content are cached by the transformation itself.
+            _key = _kwargs_key
+            _cache = self.__dict__.setdefault("_own_masks_cache", {})
+
+        try:
+            _m = _cache.get(_key, None)
+        except (TypeError, ValueError):
+            # Static values that cannot be compared (the mask is processed without caching it).
+            _m, _cache = None, None
+
+        if _m is None:
+            _m = build(self._process_mask(mask, kwargs, rkg_mask))
+
+            if _cache is not None:
+                if len(_cache) >= self._MAX_MASKS_CACHE:
+                    del _cache[next(iter(_cache))]
+                _cache[_key] = _m
+
+        return _m
+
+    def _partition(self, mask: PyTree, kwargs: PyTree, rkg_mask=None) -> Tuple[PyTree, PyTree, _MaskPartition]:
+        """Splits kwargs in the leaves selected by the mask and the remaining ones, as 'eqx.partition' would do with
+        the mask processed by '_process_mask'. The partition is cached per kwargs structure (see '_cached_mask').
+
+        Returns:
+            Tuple[PyTree, PyTree, _MaskPartition]: the selected kwargs, the remaining ones, and the partition used to
+                recombine them.
+        """
+        _leaves, _structure = jtu.tree_flatten(kwargs, is_leaf=_is_param)
+        _p = self._cached_mask(mask, kwargs, rkg_mask, lambda mask: _MaskPartition(mask, _structure))
+
+        return (*_p.split(_leaves), _p)
+
 
 class Jit(_BaseTransform):
     """
@@ -244,17 +564,225 @@ class Jit(_BaseTransform):
     Uses 'tree_extract' to return a list of parameters instead of a complex pytree.
     This is used to reduce the overhead of injecting the new values back into the
     original kwargs outside of the "jit barrier".
+
+    When called as the outermost transformation, a '_CallPlan' is cached for each kwargs structure (and parameters
+    identity) encountered. Subsequent calls with the same kwargs skip 'tree_ref' and 'tree_inject' altogether: the
+    leaves of kwargs are gathered in a flat tuple, passed to the compiled function, and the returned values are
+    scattered back into the cached list of parameters. 'donate_argnames' refer to the keyword arguments of the original
+    function, so they disable this fast path. Plans keep their parameters alive, so only the '_MAX_PLANS' most recently
+    used ones are stored.
+
+    As for all pcax transformations, parameters must be updated in place (i.e., via 'set'): the function receives a
+    copy of the containers in kwargs, so replacing a parameter object (e.g., 'model.w = Param(...)') within the function
+    has no effect on the original kwargs, and the value of the new parameter is discarded.
+
+    If 'donate_tracked' is True, the buffers of the DynamicParams in kwargs are donated to the compiled function, so
+    that XLA can reuse them for the updated values written back into the same parameters. This avoids holding two
+    copies of the model (and optimizers) state at the same time, but it also means that any jax.Array previously
+    obtained from a tracked parameter (e.g., 'w = model.w.get()') is invalidated by the call.
+
+    Each time the function is traced (and thus recompiled) 'n_traces' is incremented. On a retrace, a description of
+    the inputs that changed since the previous trace (a different shape/dtype, a new parameter, or a changed static
+    attribute such as a 'StaticParam' value, 'Vode.cache' keys or 'Optim.filter') is appended to 'retraces', and, if
+    'explain_retrace' is True, it is also raised as a warning. This is useful to make sure that hot loops compile only
+    once.
+
+    The function can also be compiled ahead of time via 'Jit.compile', which returns a 'CompiledJit' callable. If
+    'cache_dir' is specified, compiled executables are stored on disk and reused by 'Jit.compile' in later runs
+    whenever the function lowers to the same program (see 'ExecutableCache'; the function is still traced):
+
+    ```python
+    train_on_batch = pxf.jit(static_argnums=0, cache_dir="~/.cache/pcax")(train_on_batch)
+    train_step = train_on_batch.compile(T, x, y, model=model, optim_w=optim_w, optim_h=optim_h)
+
+    for x, y in dl:
+        train_step(T, x, y, model=model, optim_w=optim_w, optim_h=optim_h)
+    ```
     """
 
-    def __init__(self, fn: "_BaseTransform" | Callable, **t_kwargs: Any):
+    _MAX_PLANS = 16
+
+    def __init__(
+        self,
+        fn: "_BaseTransform" | Callable,
+        donate_tracked: bool = False,
+        cache_dir: str | None = None,
+        explain_retrace: bool = False,
+        **t_kwargs: Any,
+    ):
         super().__init__(fn)
 
         def _wrap_fn(*args, **kwargs):
+            self._on_trace(args, kwargs)
             _r, _kwargs = self.fn(*args, **kwargs)
 
             return _r, tree_extract(_kwargs, is_pytree=True)
 
         self.wrap_fn = jax.jit(_wrap_fn, **t_kwargs)
+        self.donate_tracked = donate_tracked
+        self.explain_retrace = explain_retrace
+        self.n_traces = 0
+        self.retraces = []
+        self._signature = None
+        self.t_kwargs = t_kwargs
+        self.cache = ExecutableCache(os.path.expanduser(cache_dir)) if cache_dir is not None else None
+
+        if t_kwargs.get("donate_argnames", None) is None:
+
+            def _wrap_plan_fn(*args, _layout, _tracked, _others):
+                _kwargs = _CallPlan.unflatten(_layout, _tracked + _others)
+                self._on_trace(args, _kwargs)
+                _r, _ = self.fn(*args, **_kwargs)
+                _CallPlan.pack(_layout, _tracked, _kwargs)
+
+                return _r, _CallPlan.extract(_tracked)
+
+            self.wrap_plan_fn = jax.jit(
+                _wrap_plan_fn,
+                **{
+                    **t_kwargs,
+                    "static_argnames": _make_tuple(t_kwargs.get("static_argnames", None) or ()) + ("_layout",),
+                    "donate_argnames": ("_tracked",) if donate_tracked else None,
+                },
+            )
+            self.plans = {}
+        elif donate_tracked is True:
+            raise ValueError("'donate_tracked' cannot be used together with 'donate_argnames'.")
+        else:
+            self.wrap_plan_fn = None
+            self.plans = None
+
+    def __call__(self, *args, _is_root: bool = True, **kwargs: Any) -> Any:
+        if _is_root is False or self.plans is None:
+            return super().__call__(*args, _is_root=_is_root, **kwargs)
+
+        if (_r := self._get_plan(kwargs)) is None:
+            return super().__call__(*args, _is_root=_is_root, **kwargs)
+        _plan, _leaves = _r
+
+        _tracked, _others = self._gather(_plan, _leaves)
+        _r, _values = self.wrap_plan_fn(*args, _layout=_plan.layout, _tracked=_tracked, _others=_others)
+        _plan.scatter(_values)
+
+        return _r
+
+    def lower(self, *args, **kwargs: Any) -> jax.stages.Lowered:
+        """Lowers the function for the given example arguments, as 'jax.jit(...).lower' does.
+
+        Returns:
+            jax.stages.Lowered: the lowered function.
+        """
+        if self.plans is None or (_r := self._get_plan(kwargs)) is None:
+            raise ValueError("Ahead-of-time compilation is not supported with 'donate_argnames'.")
+        _plan, _leaves = _r
+        _tracked, _others = _plan.gather(_leaves)
+
+        return self.wrap_plan_fn.lower(*args, _layout=_plan.layout, _tracked=_tracked, _others=_others)
+
+    def compile(self, *args, **kwargs: Any) -> "CompiledJit":
+        """Compiles the function for the given example arguments. If 'cache_dir' was specified, the compiled executable
+        is loaded from disk when available, and stored otherwise.
+
+        Returns:
+            CompiledJit: callable with the same signature of the original function that can be called with arguments
+                with the same structure, shapes and static values of the ones given.
+        """
+        if self.plans is None or (_r := self._get_plan(kwargs)) is None:
+            raise ValueError("Ahead-of-time compilation is not supported with 'donate_argnames'.")
+        _plan, _leaves = _r
+        _tracked, _others = _plan.gather(_leaves)
+        _static, _dynamic = self._split_args(args)
+
+        _lowered = self.lower(*args, **kwargs)
+        _compiled = _key = None
+        if self.cache is not None and (_key := ExecutableCache.fingerprint(_lowered)) is not None:
+            _compiled = self.cache.load(
+                _key, jtu.tree_structure((_dynamic, {"_tracked": _tracked, "_others": _others}))
+            )
+
+        if _compiled is None:
+            _compiled = _lowered.compile()
+
+            if _key is not None:
+                self.cache.save(_key, _compiled)
+
+        return CompiledJit(self, _plan, _static, _compiled)
+
+    def _on_trace(self, args: Tuple[Any, ...], kwargs: Any) -> None:
+        """Called every time the function is traced (i.e., compiled). It keeps count of the traces and, on a retrace,
+        records which inputs changed with respect to the previous trace in 'retraces'."""
+        self.n_traces += 1
+        _signature = _trace_signature(args, kwargs)
+
+        if self._signature is not None:
+            _diff = _diff_signatures(self._signature, _signature)
+            _msg = f"{repr(self)} retraced (trace #{self.n_traces}): " + ("; ".join(_diff) or "no input change detected")
+            self.retraces.append(_msg)
+
+            if self.explain_retrace is True:
+                warnings.warn(_msg, stacklevel=2)
+
+        self._signature = _signature
+
+    def _get_plan(self, kwargs: Any) -> Tuple[_CallPlan, Sequence[Any]] | None:
+        """Returns the plan corresponding to the given kwargs and their flattened leaves, or None if kwargs cannot be
+        planned (i.e., they contain references)."""
+        if "__RKG" not in kwargs:
+            kwargs["__RKG"] = RKG
+
+        _leaves, _structure = jtu.tree_flatten(kwargs, is_leaf=_is_param)
+        _key = _CallPlan.key(_leaves, _structure)
+
+        # Plans keep their parameters alive, so we only store the most recently used ones.
+        if (_plan := self.plans.pop(_key, None)) is None:
+            try:
+                _plan = _CallPlan(_leaves, _structure)
+            except ValueError:
+                return None
+
+            if len(self.plans) >= self._MAX_PLANS:
+                del self.plans[next(iter(self.plans))]
+        self.plans[_key] = _plan
+
+        return _plan, _leaves
+
+    def _gather(self, plan: _CallPlan, leaves: Sequence[Any]) -> Tuple[Tuple[Any, ...], Tuple[Any, ...]]:
+        _tracked, _others = plan.gather(leaves)
+        if self.donate_tracked is True:
+            _tracked = self._unique_buffers(_tracked)
+
+        return _tracked, _others
+
+    def _split_args(self, args: Tuple[Any, ...]) -> Tuple[Tuple[Any, ...], Tuple[Any, ...]]:
+        """Splits the positional arguments into static and dynamic ones, according to 'static_argnums'."""
+        _static_argnums = self.t_kwargs.get("static_argnums", None)
+        _static_argnums = tuple(i % len(args) for i in (_make_tuple(_static_argnums) if _static_argnums is not None else ()))
+
+        return (
+            tuple(a for i, a in enumerate(args) if i in _static_argnums),
+            tuple(a for i, a in enumerate(args) if i not in _static_argnums),
+        )
+
+    @staticmethod
+    def _unique_buffers(params: Tuple[DynamicParam, ...]) -> Tuple[DynamicParam, ...]:
+        """The same buffer cannot be donated twice, but different parameters may share the same jax.Array (for
+        example, a Vode value 'h' and its cached activation 'u' after the forward initialisation). In such (rare)
+        case, we pass a copy of each repeated buffer.
+        """
+        _leaves = jtu.tree_leaves(tuple(_p._value for _p in params))
+        if len(_leaves) == len(set(map(id, _leaves))):
+            return params
+
+        _seen = set()
+
+        def _copy_if_seen(x: Any) -> Any:
+            if id(x) in _seen:
+                return jax.numpy.array(x, copy=True)
+            _seen.add(id(x))
+
+            return x
+
+        return tuple(jtu.tree_map(_copy_if_seen, _p) for _p in params)
 
     def _t(self, *args, **kwargs):
         _r, kwargs = self.wrap_fn(*args, **kwargs)
@@ -262,6 +790,80 @@ class Jit(_BaseTransform):
         return _r, kwargs
 
 
+class CompiledJit:
+    """
+    Ahead-of-time compiled 'Jit', returned by 'Jit.compile'. It is called with the same arguments of the original
+    function (static ones included), which must have the same structure, shapes, and static values of the example
+    arguments used for compilation (a TypeError or ValueError is raised otherwise).
+    """
+
+    def __init__(self, jit: Jit, plan: _CallPlan, static_args: Tuple[Any, ...], compiled: jax.stages.Compiled):
+        """CompiledJit constructor.
+
+        Args:
+            jit (Jit): the compiled transformation.
+            plan (_CallPlan): the plan of the kwargs used for compilation.
+            static_args (Tuple[Any, ...]): the static positional arguments used for compilation.
+            compiled (jax.stages.Compiled): the compiled executable.
+        """
+        self.jit = jit
+        self.plan = plan
+        self.static_args = static_args
+        self.compiled = compiled
+
+    def __call__(self, *args, **kwargs: Any) -> Any:
+        if "__RKG" not in kwargs:
+            kwargs["__RKG"] = RKG
+
+        _leaves, _structure = jtu.tree_flatten(kwargs, is_leaf=_is_param)
+        if self.jit.plans.get(_CallPlan.key(_leaves, _structure), None) is not self.plan:
+            raise ValueError("The function was compiled for different keyword arguments. Use 'Jit.compile' again.")
+
+        _static, _dynamic = self.jit._split_args(args)
+        if _static != self.static_args:
+            raise ValueError("The function was compiled for different static arguments. Use 'Jit.compile' again.")
+
+        _tracked, _others = self.jit._gather(self.plan, _leaves)
+        _r, _values = self.compiled(*_dynamic, _tracked=_tracked, _others=_others)
+        self.plan.scatter(_values)
+
+        return _r
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({repr(self.jit)})"
+
+
+class Remat(_BaseTransform):
+    """
+    Wrap around jax.checkpoint(fn, ...) (also known as jax.remat).
+    The intermediate values computed by fn are not stored for the backward pass, but recomputed when needed, trading
+    computation for memory. Which values are saved can be controlled via 'policy' (see jax.checkpoint_policies).
+    It is typically applied to a block of layers (or to a single Vode) of a deep model, passed as keyword argument to
+    keep its parameters tracked:
+
+    ```python
+    @pxf.remat(policy=jax.checkpoint_policies.nothing_saveable)
+    def block_forward(x, *, block):
+        return block(x)
+
+    class Model(pxc.EnergyModule):
+        def __call__(self, x):
+            for block in self.blocks:
+                x = block_forward(x, block=block)
+            ...
+    ```
+    """
+
+    def __init__(self, fn: "_BaseTransform" | Callable, **t_kwargs: Any):
+        super().__init__(fn)
+        self.t_kwargs = t_kwargs
+
+    def _t(self, *args, **kwargs):
+        _r, kwargs = jax.checkpoint(self.fn, **self.t_kwargs)(*args, **kwargs)
+
+        return _r, kwargs
+
+
 class ValueAndGrad(_BaseTransform):
     """
     Wrap around jax.value_and_grad(fn, ...).
@@ -302,9 +904,13 @@ class ValueAndGrad(_BaseTransform):
         self.t_kwargs = t_kwargs
 
     def _t(self, *args, **kwargs):
+        # We split kwargs to isolate the parameters we want to differentiate, following the jax syntax.
+        # We pass 'False' as rkg mask to not take its gradient.
+        _target_kwargs, _other_kwargs, _partition = self._partition(self.kwargs_mask, kwargs, False)
+
         def _wrap_fn(*args):
             _args, _target_kwargs, _other_kwargs = args[:-2], args[-2], args[-1]
-            _kwargs = eqx.combine(_target_kwargs, _other_kwargs, is_leaf=lambda x: isinstance(x, BaseParam))
+            _kwargs = _partition.combine(_target_kwargs, _other_kwargs)
             _r, _kwargs = self.fn(*_args, **_kwargs)
             _r = _make_tuple(_r)
 
@@ -312,16 +918,7 @@ class ValueAndGrad(_BaseTransform):
 
         (_l, (_r, _values)), _aux = jax.value_and_grad(
             _wrap_fn, **{**self.t_kwargs, "argnums": self.t_kwargs.get("argnums", ()) + (len(args),)}
-        )(
-            *args,
-            # We split kwargs to isolate the parameters we want to differentiate, following the jax syntax.
-            *eqx.partition(
-                kwargs,
-                # we pass 'False' as rkg mask to not take its gradient.
-                self._process_mask(self.kwargs_mask, kwargs, False),
-                is_leaf=lambda x: isinstance(x, BaseParam),
-            ),
-        )
+        )(*args, _target_kwargs, _other_kwargs)
 
         if self.t_kwargs.get("argnums", ()) != ():
             _aux = (_aux[:-1], _aux[-1])
@@ -334,39 +931,231 @@ class ValueAndGrad(_BaseTransform):
             return ((_l, _aux), _values)
 
 
+class Grad(ValueAndGrad):
+    """
+    Wrap around jax.grad(fn, ...). Same as 'ValueAndGrad' (check it for the semantics of 'kwargs_mask'), but only the
+    gradient is returned, i.e., 'g' or '(g, aux)' if 'has_aux' is True (where 'g' is '(args_g, kwargs_g)' if 'argnums'
+    is specified).
+    """
+
+    def _t(self, *args, **kwargs):
+        _r, _values = super()._t(*args, **kwargs)
+
+        if self.has_aux:
+            ((_, _aux), _g) = _r
+            return ((_g, _aux), _values)
+        else:
+            (_, _g) = _r
+            return (_g, _values)
+
+
+class Jvp(_BaseTransform):
+    """
+    Wrap around jax.jvp(fn, ...), computing the Jacobian-vector product of fn with respect to the kwargs selected by
+    'kwargs_mask' (same semantics as 'ValueAndGrad'). Positional arguments are considered constants.
+    The tangents are passed as first argument when calling the transformation and must have the same structure as the
+    masked kwargs, i.e., the same structure of the gradients returned by 'ValueAndGrad' with the same mask (so that,
+    for example, a gradient can be directly used as tangent). Only the values of the tangents are used, so their
+    parameters' metadata do not need to match the ones of the primals. For example:
+
+    ```python
+    @pxf.jvp(kwargs_mask={"model": pxu.Mask(pxc.VodeParam)})
+    def energy(x, *, model):
+        ...
+
+    (e, e_dot), = energy(tangents, x, model=model)  # 'tangents' is a dict {"model": ...}
+    ```
+
+    Returns '(primal_out, tangent_out)', or '(primal_out, tangent_out, aux)' if 'has_aux' is True.
+    """
+
+    def __init__(self, fn: "_BaseTransform" | Callable, kwargs_mask: Any = {}, has_aux: bool = False):
+        super().__init__(fn)
+        self.kwargs_mask = kwargs_mask
+        self.has_aux = has_aux
+
+    @staticmethod
+    def _match_tangents(tangents: PyTree, primals: PyTree) -> PyTree:
+        """Rebuilds the tangents with the structure of the primals, ignoring the static attributes of parameters."""
+        _leaves, _structure = jtu.tree_flatten(tangents)
+        _primals_structure = jtu.tree_structure(primals)
+
+        if _structure.num_leaves != _primals_structure.num_leaves:
+            raise ValueError(
+                f"The tangents have {_structure.num_leaves} leaves, "
+                f"while the masked kwargs have {_primals_structure.num_leaves}."
+            )
+
+        return jtu.tree_unflatten(_primals_structure, _leaves)
+
+    def _t(self, tangents, *args, **kwargs):
+        _target_kwargs, _other_kwargs, _partition = self._partition(self.kwargs_mask, kwargs, False)
+
+        def _wrap_fn(_target_kwargs):
+            _kwargs = _partition.combine(_target_kwargs, _other_kwargs)
+            _r, _kwargs = self.fn(*args, **_kwargs)
+            _r = _make_tuple(_r)
+
+            return _r[0], (_r[1:], _kwargs)
+
+        # '__RKG' is masked out, so it never receives a tangent.
+        _p, _t, (_r, _values) = jax.jvp(
+            _wrap_fn, (_target_kwargs,), (self._match_tangents(tangents, _target_kwargs),), has_aux=True
+        )
+
+        if self.has_aux:
+            return ((_p, _t, _r), _values)
+        else:
+            return ((_p, _t), _values)
+
+
+class Hvp(Jvp):
+    """
+    Hessian-vector product of a scalar function with respect to the kwargs selected by 'kwargs_mask' (same semantics as
+    'ValueAndGrad'), computed in forward-over-reverse mode (i.e., jax.jvp(jax.grad(fn), ...)) without materialising the
+    Hessian. The vector is passed as first argument when calling the transformation, with the same requirements as the
+    tangents of 'Jvp'.
+
+    Since the gradient is computed anyway, it is returned as well: the output is '(g, hvp)', or '(g, hvp, aux)' if
+    'has_aux' is True, where both 'g' and 'hvp' have the same structure of the gradients returned by 'ValueAndGrad'.
+    """
+
+    def _t(self, vector, *args, **kwargs):
+        _target_kwargs, _other_kwargs, _partition = self._partition(self.kwargs_mask, kwargs, False)
+
+        def _wrap_fn(_target_kwargs):
+            _kwargs = _partition.combine(_target_kwargs, _other_kwargs)
+            _r, _kwargs = self.fn(*args, **_kwargs)
+            _r = _make_tuple(_r)
+
+            return _r[0], (_r[1:], _kwargs)
+
+        _g, _hvp, (_r, _values) = jax.jvp(
+            jax.grad(_wrap_fn, has_aux=True),
+            (_target_kwargs,),
+            (self._match_tangents(vector, _target_kwargs),),
+            has_aux=True,
+        )
+
+        if self.has_aux:
+            return ((_g, _hvp, _r), _values)
+        else:
+            return ((_g, _hvp), _values)
+
+
 class Vmap(_BaseTransform):
     """
     Wrap around jax.vmap(fn, ...).
     kwargs_mask must specify whether each leaf is vectorised or not. It is assumed that the behaviour for
     each leaf is the same for both input and output (this could be changed by providing an 'out_kwargs_mask'
     as well as a 'in_kwargs_mask'). Both 'in_axes' and 'out_axes' must be provided in a jax supported format.
-
-    NOTE: RKG is automatically handled by the transformation, so it must not be provided in the kwargs.
+    The processed kwargs_mask is cached per kwargs structure, so it is evaluated only once.
+
+    NOTE: RKG is automatically handled by the transformation, so it must not be provided in the kwargs. The key is not
+    mapped: each element of the batch derives its own key from it (by folding in its index along the mapped axis), and
+    the global key is advanced only if the function actually generates random numbers. This differs from previous
+    versions of pcax, which split the key in one key per element (so the random numbers generated within a vmap are
+    different for the same seed). The previous random streams can be reproduced with 'split_rkg=True', which requires
+    the size of the mapped axis and always advances the global key.
     """
 
-    def __init__(self, fn: "_BaseTransform" | Callable, kwargs_mask: Any = {}, **t_kwargs: Any):
+    def __init__(
+        self, fn: "_BaseTransform" | Callable, kwargs_mask: Any = {}, split_rkg: bool = False, **t_kwargs: Any
+    ):
         super().__init__(fn)
         self.kwargs_mask = kwargs_mask
+        self.split_rkg = split_rkg
         self.t_kwargs = t_kwargs
 
+        # An axis name is necessary to retrieve the index of each element along the mapped axis.
+        if self.t_kwargs.get("axis_name", None) is None:
+            self.t_kwargs["axis_name"] = f"__vmap_{id(self)}"
+
     def _t(self, *args, **kwargs):
-        _kwargs_mask = self._process_mask(self.kwargs_mask, kwargs)
+        _kwargs_mask = self._cached_mask(self.kwargs_mask, kwargs)
         _in_axes_mask = _make_tuple(self.t_kwargs.get("in_axes", ())) + (_kwargs_mask,)
 
-        # Compute vaxes dimension which is necessary to split the RKG key.
-        def _extract_vaxes_dim(node, mask):
-            for param in filter(lambda _node: hasattr(_node, "shape"), jtu.tree_leaves(node)):
-                return param.shape[mask]
+        if self.split_rkg is True:
+            _axis_size = self.t_kwargs.get("axis_size", None) or _mapped_axis_size(_in_axes_mask, (*args, kwargs))
 
-            return None
+        def _wrap_fn(*args):
+            *_args, _kwargs = args
+            _axis_index = jax.lax.axis_index(self.t_kwargs["axis_name"])
+
+            # The key is unmapped, so we derive a different one for each element.
+            _key = _kwargs["__RKG"].key.get()
+            if self.split_rkg is True:
+                # Same keys as 'RKGState.split(axis_size)'.
+                _keys = jax.random.split(_key, _axis_size + 1)
+                _next_key, _element_key = _keys[0], _keys[1 + _axis_index]
+            else:
+                _subkey, _next_key = jax.random.split(_key)
+                _element_key = jax.random.fold_in(_subkey, _axis_index)
+            _kwargs["__RKG"].key.set(_element_key)
+
+            _r, _kwargs = self.fn(*_args, **_kwargs)
+
+            # If the key has been consumed, we advance the global key (which must be the same for all the elements);
+            # otherwise we leave it untouched (and the unused computations are removed by the compiler).
+            _consumed = self.split_rkg is True or _kwargs["__RKG"].key.get() is not _element_key
+            _kwargs["__RKG"].key.set(_next_key if _consumed else _key)
+
+            return _r, _kwargs
+
+        _r, kwargs = jax.vmap(
+            _wrap_fn,
+            **{
+                **self.t_kwargs,
+                "in_axes": _in_axes_mask,
+                "out_axes": (self.t_kwargs.get("out_axes", None), _kwargs_mask),
+            },
+        )(*args, kwargs)
+
+        return _r, kwargs
+
+
+class Pmap(_BaseTransform):
+    """
+    Wrap around jax.pmap(fn, ...).
+    Behaves as 'Vmap', with kwargs_mask specifying whether each leaf is mapped over the devices or replicated on all of
+    them (None). The typical data-parallel setting replicates the model weights (LayerParam) and the optimizers state,
+    and shards the Vodes (VodeParam and VodeParam.Cache) along the batch axis:
+
+    ```python
+    @pxf.pmap(pxu.Mask(pxc.VodeParam | pxc.VodeParam.Cache, (None, 0)), in_axes=(0, 0), axis_name="device")
+    def train_on_batch(x, y, *, model, optim_w, optim_h):
+        ...
+        optim_w.step(model, jax.lax.pmean(g["model"], "device"))
+    ```
+
+    where 'x' and 'y' have shape (n_devices, batch_size // n_devices, ...). Replicated outputs (out_axes = None) are
+    taken from the first device, so it is up to the user to keep them synchronised (e.g., by averaging the gradients
+    with 'jax.lax.pmean' before updating the weights).
+
+    The processed kwargs_mask is cached per kwargs structure, as in 'Vmap'.
+
+    NOTE #1: RKG is automatically handled by the transformation, so each device receives a different key.
+
+    NOTE #2: multiple devices can be emulated on CPU by setting the environment variable
+    'XLA_FLAGS=--xla_force_host_platform_device_count=N' before importing jax.
+    """
+
+    def __init__(self, fn: "_BaseTransform" | Callable, kwargs_mask: Any = {}, **t_kwargs: Any):
+        super().__init__(fn)
+        self.kwargs_mask = kwargs_mask
+        self.t_kwargs = t_kwargs
 
-        _vaxis_dim = jtu.tree_leaves(
-            jtu.tree_map(lambda mask, node: _extract_vaxes_dim(node, mask), _in_axes_mask, (*args, kwargs))
-        )[0]
+    def _t(self, *args, **kwargs):
+        # The cached mask is shared, so we copy it before setting the mask of the __RKG key.
+        _kwargs_mask = dict(self._cached_mask(self.kwargs_mask, kwargs))
+        _in_axes_mask = _make_tuple(self.t_kwargs.get("in_axes", ())) + (_kwargs_mask,)
 
-        # Split the __RKG key over the vmap axis (and set the mask accordingly)
-        _in_axes_mask[-1]["__RKG"] = 0
-        kwargs["__RKG"].key.set(kwargs["__RKG"].key.split(_vaxis_dim))
+        # The number of devices is the size of the mapped axis.
+        _n_devices = _mapped_axis_size(_in_axes_mask, (*args, kwargs))
+
+        # Split the __RKG key over the devices (and set the mask accordingly)
+        _kwargs_mask["__RKG"] = 0
+        kwargs["__RKG"].key.set(kwargs["__RKG"].key.split(_n_devices))
 
         def _wrap_fn(*args):
             *_args, _kwargs = args
@@ -374,7 +1163,7 @@ class Vmap(_BaseTransform):
 
             return _r, _kwargs
 
-        _r, kwargs = jax.vmap(
+        _r, kwargs = jax.pmap(
             _wrap_fn,
             **{
                 **self.t_kwargs,
@@ -383,8 +1172,91 @@ class Vmap(_BaseTransform):
             },
         )(*args, kwargs)
 
-        # Merge back the key value to remove the vmap axis before returning it;
-        # it will automatically be injected back into the global RKG (being it a kwarg)
+        # Merge back the key value to remove the device axis before returning it.
         kwargs["__RKG"].key.set(kwargs["__RKG"].key[0])
 
         return _r, kwargs
+
+
+class ShardMap(_BaseTransform):
+    """
+    Wrap around jax.experimental.shard_map.shard_map(fn, ...).
+    Behaves as 'Pmap', but the inputs are global arrays split over a 'jax.sharding.Mesh' according to their
+    'PartitionSpec', so that it composes with 'Jit' and with multi-dimensional meshes. kwargs_mask specifies the
+    PartitionSpec of each leaf (None is equivalent to 'PartitionSpec()', i.e., replicated). The typical data-parallel
+    setting replicates the model weights (LayerParam) and the optimizers state, and shards the Vodes (VodeParam and
+    VodeParam.Cache) along the batch axis:
+
+    ```python
+    mesh = jax.sharding.Mesh(jax.devices(), ("batch",))
+
+    @pxf.jit()
+    @pxf.shard_map(
+        pxu.Mask(pxc.VodeParam | pxc.VodeParam.Cache, (P(), P("batch"))),
+        mesh=mesh, in_specs=(P("batch"), P("batch")), out_specs=P(), check_rep=False,
+    )
+    def train_on_batch(x, y, *, model, optim_w, optim_h):
+        ...
+        optim_w.step(model, jax.lax.pmean(g["model"], "batch"))
+    ```
+
+    where 'x' and 'y' have shape (batch_size, ...). Positional arguments listed in 'static_argnums' are not passed
+    through shard_map but closed over (their entries in 'in_specs' are ignored), e.g., to pass the number of inference
+    steps of a jitted function with the same 'static_argnums'. Unlike 'Pmap', no leading device axis is added: each device sees
+    a slice of shape (batch_size // n_devices, ...). As for 'Pmap', it is up to the user to keep the replicated
+    outputs synchronised.
+
+    NOTE: RKG is automatically handled by the transformation, as in 'Vmap': the key is replicated, each device derives
+    its own key from it (by folding in its index along each axis of the mesh), and the global key is advanced only if
+    the function actually generates random numbers.
+    """
+
+    def __init__(self, fn: "_BaseTransform" | Callable, kwargs_mask: Any = {}, **t_kwargs: Any):
+        super().__init__(fn)
+        self.kwargs_mask = kwargs_mask
+        self.t_kwargs = t_kwargs
+
+    def _t(self, *args, **kwargs):
+        from jax.experimental.shard_map import shard_map
+        from jax.sharding import PartitionSpec
+
+        _kwargs_mask = jtu.tree_map(
+            lambda x: PartitionSpec() if x is None else x,
+            self._cached_mask(self.kwargs_mask, kwargs, PartitionSpec()),
+            is_leaf=lambda x: x is None,
+        )
+        _t_kwargs = dict(self.t_kwargs)
+        _mesh = _t_kwargs["mesh"]
+        _out_specs = _t_kwargs.pop("out_specs", None)
+        _static = set(_make_tuple(_t_kwargs.pop("static_argnums", ())))
+        _in_specs = _make_tuple(_t_kwargs.pop("in_specs", ()))
+
+        def _wrap_fn(*dynamic_args):
+            *_dynamic_args, _kwargs = dynamic_args
+            _dynamic_it = iter(_dynamic_args)
+            _args = tuple(args[_i] if _i in _static else next(_dynamic_it) for _i in range(len(args)))
+
+            # The key is replicated, so we derive a different one for each device.
+            _key = _kwargs["__RKG"].key.get()
+            _subkey, _next_key = jax.random.split(_key)
+            _device_key = _subkey
+            for _axis in _mesh.axis_names:
+                _device_key = jax.random.fold_in(_device_key, jax.lax.axis_index(_axis))
+            _kwargs["__RKG"].key.set(_device_key)
+
+            _r, _kwargs = self.fn(*_args, **_kwargs)
+
+            _kwargs["__RKG"].key.set(_key if _kwargs["__RKG"].key.get() is _device_key else _next_key)
+
+            return _r, _kwargs
+
+        _r, kwargs = shard_map(
+            _wrap_fn,
+            **{
+                **_t_kwargs,
+                "in_specs": tuple(_s for _i, _s in enumerate(_in_specs) if _i not in _static) + (_kwargs_mask,),
+                "out_specs": (PartitionSpec() if _out_specs is None else _out_specs, _kwargs_mask),
+            },
+        )(*(_a for _i, _a in enumerate(args) if _i not in _static), kwargs)
+
+        return _r, kwargs
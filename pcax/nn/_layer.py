@@ -9,14 +9,17 @@ __all__ = [
 ]
 
 
-from typing import Tuple, Sequence
+from typing import Any, Callable, List, Tuple, Sequence
+import contextlib
 
+import jax
 import jax.tree_util as jtu
 import equinox as eqx
 
 from ..core._module import Module
+from ..core._lazy import LazyModule
 from ..core._random import RandomKeyGenerator, RKG
-from ..core._parameter import BaseParam
+from ..core._parameter import BaseParam, get
 from ..core._static import StaticParam
 from ._parameter import LayerParam
 
@@ -27,27 +30,100 @@ from ._parameter import LayerParam
 #
 # pcax layers are a thin wrapper around equinox layers that replaces all jax.Arrays with LayerParam instances.
 # In this file only stateless layers are implemented as they don't need any particular ad-hoc adaptation.
+#
+# Linear and convolutional layers can be created lazily by passing 'None' as their number of input features/channels,
+# which is inferred from their first input within 'pcax.init' (see 'pcax.core._lazy'). For example,
+# 'pxnn.Linear(None, 10)' after a convolutional block does not require to compute the size of the flattened features.
 ########################################################################################################################
 
 
+# Utils ################################################################################################################
+
+
+# Stack of callbacks applied to the output of each layer call, as 'callback(layer, args, output)' (see 'pcax.
+# predictive_coding.local_weight_grads'). Only the innermost one is applied.
+_TAPES: List[Callable[["Layer", Tuple[Any, ...], Any], Any]] = []
+
+
+@contextlib.contextmanager
+def _tape(callback: Callable[["Layer", Tuple[Any, ...], Any], Any]):
+    """Within the context, the output of each layer call is replaced by 'callback(layer, args, output)'."""
+    _TAPES.append(callback)
+    try:
+        yield
+    finally:
+        _TAPES.pop()
+
+
+def _in_features(x: jax.ShapeDtypeStruct) -> int:
+    # Unbatched input of a linear layer: (in_features,).
+    return x.shape[-1]
+
+
+def _in_channels(x: jax.ShapeDtypeStruct) -> int:
+    # Unbatched input of a convolutional layer: (in_channels, *spatial_dims).
+    return x.shape[0]
+
+
 # Core #################################################################################################################
 
 
-class Layer(Module):
+class Layer(LazyModule, Module):
+    # Mixed precision policy, set by 'pcax.Precision.apply'.
+    precision = None
+
     def __init__(
         self,
         cls,
         *args,
         filter=eqx._filters.is_array,
+        infer: Tuple[int, Callable[[jax.ShapeDtypeStruct], Any]] | None = None,
         **kwargs,
     ):
+        """Layer constructor.
+
+        Args:
+            cls: the equinox layer class to wrap.
+            *args, **kwargs: arguments passed to 'cls'.
+            filter (optional): selects which leaves of the layer become LayerParams (all others are StaticParams).
+            infer (Tuple[int, Callable[[jax.ShapeDtypeStruct], Any]] | None, optional): if provided, the layer is
+                created lazily: 'args[infer[0]]' is replaced by 'infer[1](x)', where 'x' is the first input of the
+                first call, and 'cls' is later constructed within 'pcax.init'. If no 'key' is given in 'kwargs', the
+                random key reserved by 'pcax.init' is used.
+        """
         super().__init__()
-        self.nn = jtu.tree_map(
-            lambda w: LayerParam(w) if filter(w) else StaticParam(w),
-            cls(*args, **kwargs),
-        )
+
+        if infer is None:
+            self.nn = self._wrap(cls(*args, **kwargs), filter)
+        else:
+            self.nn = None
+            self._lazy_init((cls, args, kwargs, filter, infer))
+
+    @staticmethod
+    def _wrap(nn, filter):
+        return jtu.tree_map(lambda w: LayerParam(w) if filter(w) else StaticParam(w), nn)
+
+    def _lazy_build(self, value, key):
+        _cls, _, _kwargs, _, _ = self.lazy.get().spec
+
+        return _cls(*value, **{"key": key, **_kwargs})
+
+    def _lazy_install(self, value, built):
+        _, _, _, _filter, _ = self.lazy.get().spec
+
+        if (_precision := get(self.precision)) is not None:
+            built = _precision.cast_to_param(built)
+
+        self.nn = self._wrap(built, _filter)
 
     def __call__(self, *args, key=None, **kwargs):
+        if self.is_lazy:
+            _, _args, _, _, (_i, _infer) = self.lazy.get().spec
+            _args = self._lazy_resolve(_args[:_i] + (_infer(args[0]),) + _args[_i + 1 :])
+
+            # Only the shape of the output is relevant within 'pcax.init', so any key can be used.
+            return self._lazy_build(_args, jax.random.PRNGKey(0))(*args, **kwargs, key=key)
+
         # Can do this, since nn is stateless
         _nn = jtu.tree_map(
             lambda w: w.get() if isinstance(w, BaseParam) else w,
@@ -55,15 +131,24 @@ class Layer(Module):
             is_leaf=lambda w: isinstance(w, BaseParam),
         )
 
-        return _nn(*args, **kwargs, key=key)
+        if (_precision := get(self.precision)) is not None:
+            _nn, args = _precision.cast_to_compute((_nn, args))
+
+        _r = _nn(*args, **kwargs, key=key)
+
+        return _TAPES[-1](self, args, _r) if _TAPES else _r
 
 
 # Common Layers ########################################################################################################
 
 
 class Linear(Layer):
-    def __init__(self, in_features: int, out_features: int, bias: bool = True, rkg: RandomKeyGenerator = RKG):
-        super().__init__(eqx.nn.Linear, in_features, out_features, bias, key=rkg())
+    def __init__(self, in_features: int | None, out_features: int, bias: bool = True, rkg: RandomKeyGenerator = RKG):
+        if in_features is None:
+            # The key is drawn at construction, so that a lazy layer is initialised as the equivalent eager one.
+            super().__init__(eqx.nn.Linear, None, out_features, bias, infer=(0, _in_features), key=rkg())
+        else:
+            super().__init__(eqx.nn.Linear, in_features, out_features, bias, key=rkg())
 
 
 class LayerNorm(Layer):
@@ -80,7 +165,7 @@ class Conv(Layer):
     def __init__(
         self,
         num_spatial_dims: int,
-        in_channels: int,
+        in_channels: int | None,
         out_channels: int,
         kernel_size: int | Sequence[int],
         stride: int | Sequence[int] = 1,
@@ -90,25 +175,18 @@ class Conv(Layer):
         use_bias: bool = True,
         rkg: RandomKeyGenerator = RKG,
     ):
-        super().__init__(
-            eqx.nn.Conv,
-            num_spatial_dims,
-            in_channels,
-            out_channels,
-            kernel_size,
-            stride,
-            padding,
-            dilation,
-            groups,
-            use_bias,
-            key=rkg(),
-        )
+        _args = (num_spatial_dims, in_channels, out_channels, kernel_size, stride, padding, dilation, groups, use_bias)
+
+        if in_channels is None:
+            super().__init__(eqx.nn.Conv, *_args, infer=(1, _in_channels), key=rkg())
+        else:
+            super().__init__(eqx.nn.Conv, *_args, key=rkg())
 
 
 class Conv2d(Conv):
     def __init__(
         self,
-        in_channels: int,
+        in_channels: int | None,
         out_channels: int,
         kernel_size: int | Sequence[int],
         stride: int | Sequence[int] = 1,
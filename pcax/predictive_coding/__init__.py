@@ -9,7 +9,10 @@ __all__ = [
     
     "STATUS",
     "Vode",
-    "Ruleset"
+    "Ruleset",
+
+    "infer",
+    "local_weight_grads",
 ]
 
 from ._energy import (
@@ -33,4 +36,14 @@ from ._vode import (
     STATUS,
     Ruleset,
     Vode
-)
\ No newline at end of file
+)
+
+
+from ._infer import (
+    infer
+)
+
+
+from ._learn import (
+    local_weight_grads
+)
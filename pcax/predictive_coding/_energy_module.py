@@ -1,13 +1,11 @@
 __all__ = []
 
-from typing import Any, Callable, Type
-import functools
-from types import UnionType
+from typing import Any, Callable, Tuple, Type
 
 import jax
+import jax.numpy as jnp
 
-from ..core._module import Module
-from ..core._tree import tree_apply
+from ..core._module import Module, _ModuleIndex
 from ..core._static import static
 
 
@@ -22,6 +20,24 @@ from ..core._static import static
 ########################################################################################################################
 
 
+# Utils ################################################################################################################
+
+
+def _energy_sources(module: "EnergyModule") -> Tuple["EnergyModule", ...]:
+    """Returns the submodules whose energy is summed by 'EnergyModule.energy': the EnergyModules that define their own
+    'energy' method (e.g., the Vodes), searched recursively through the ones that do not. The modules are listed in
+    the order in which they are encountered."""
+    _sources = ()
+
+    for _m in module.submodules(cls=EnergyModule):
+        if type(_m).energy is EnergyModule.energy:
+            _sources += _energy_sources(_m)
+        else:
+            _sources += (_m,)
+
+    return _sources
+
+
 # Core #################################################################################################################
 
 
@@ -35,17 +51,30 @@ class EnergyModule(Module):
         super().__init__()
         self._status = static(None)
 
+    def energies(self) -> jax.Array:
+        """Return the energies of all the submodules that define their own energy (e.g., the Vodes), stacked along
+        the first axis in the order in which the submodules are encountered. This allows to monitor the energy of
+        each layer at no extra cost, as 'energy' is computed by reducing the same array.
+
+        Returns:
+            jax.Array: energy of each submodule, with shape (n_submodules,) if called within a vmapped function and
+                (n_submodules, batch_size) otherwise.
+        """
+        _energies = tuple(_m.energy() for _m in _energy_sources(self))
+
+        if len(_energies) == 0:
+            return jnp.zeros((0,))
+
+        return jnp.stack(jnp.broadcast_arrays(*_energies))
+
     def energy(self) -> jax.Array:
-        """Return the total energy of the module as the recursive sum of all the energies of its submodules.
-        Note that differently from the Vodes, the energy is not cached.
+        """Return the total energy of the module as the recursive sum of all the energies of its submodules
+        (see 'energies'). Note that differently from the Vodes, the energy is not cached.
         
         Returns:
             jax.Array: total energy of the module.
         """
-        return functools.reduce(
-            lambda x, y: x + y,
-            (m.energy() for m in self.submodules(cls=EnergyModule))
-        )
+        return self.energies().sum(axis=0)
     
     def clear_params(self, filter: Callable[[Any], bool] | Type) -> None:
         """Set the selected parameters to None. This is especially useful to clear the cache of the parameters when needed.
@@ -54,12 +83,8 @@ class EnergyModule(Module):
         Args:
             filter (Callable[[Any], bool] | Type): filter function or type identifying the parameters to clear.
         """
-        tree_apply(
-            lambda p: p.set(None),
-            filter if not isinstance(filter, type | UnionType) else lambda x: isinstance(x, filter),
-            tree=self,
-            recursive=False
-        )
+        for _p in _ModuleIndex.of(self).select(filter, params=True):
+            _p.set(None)
 
     @property
     def status(self) -> Any:
@@ -0,0 +1,289 @@
+__all__ = ["infer"]
+
+
+from typing import Any, Callable, Tuple
+import functools
+
+import jax
+import jax.numpy as jnp
+
+from ..core._module import _ModuleIndex
+from ..core._parameter import get as _get
+from ..functional import value_and_grad, vmap, while_loop
+from ..functional._transform import Vmap
+from ..utils._mask import Mask, m
+# NOTE: "pcax.utils._misc" imports this package, so "step" is looked up at call time to avoid a circular import.
+from ..utils import _misc
+from ..utils._optim import Optim
+from ._energy import se_energy
+from ._energy_module import EnergyModule, _energy_sources
+from ._parameter import VodeParam
+from ._vode import STATUS, Vode
+
+
+########################################################################################################################
+#
+# INFER
+#
+# Inference (i.e., the optimisation of the vode values for a given input) follows the same pattern in most training
+# scripts: a forward pass with status 'STATUS.INIT' to initialise the vodes, followed by T gradient steps on the energy
+# of the model with respect to the vode values. 'infer' runs such steps within a single 'while_loop', stopping as soon
+# as the relative decrease of the energy between two consecutive steps falls below a given tolerance, so that batches
+# that converge early do not pay for the remaining steps.
+#
+# Since the samples of a batch converge at different rates, convergence can also be tracked per sample ('per_sample'):
+# the vode values of the samples that have converged are no longer updated, and the loop stops once all of them have.
+#
+# For the vodes using 'se_energy', the gradient of the energy with respect to 'h' has a closed form: the local error
+# 'e = h - u' minus the errors of the vodes it predicts, backpropagated through their predictions 'u'. In the 'local'
+# mode, such gradient is obtained by differentiating 'stop_gradient(e) * (h - u)' (which has the same gradient), so
+# that the reverse pass only goes through the predictions and not through the energy functions and their reductions.
+#
+########################################################################################################################
+
+
+# Utils ################################################################################################################
+
+
+_VODE_MASK = Mask(VodeParam | VodeParam.Cache, (None, 0))
+_TARGET = m(VodeParam).has_not(frozen=True)
+_GRAD_MASK = Mask(_TARGET, [False, True])
+
+
+def _local_energy(model: EnergyModule) -> Tuple[jax.Array, jax.Array]:
+    """Returns the objective differentiated in the 'local' mode and the energy of the model (for a single sample).
+    For the vodes using 'se_energy', the objective is computed from their errors 'e = h - u' treated as constants;
+    the other energy terms are used as they are."""
+    _objective, _energy = [], []
+
+    for _m in _energy_sources(model):
+        if isinstance(_m, Vode) and _m.energy_fn.get() is se_energy:
+            _delta = _m.get("h") - _m.get("u")
+            _e = jax.lax.stop_gradient(_delta)
+            _o, _E = _e * _delta, 0.5 * (_e * _e)
+
+            if (_precision := _get(_m.precision)) is not None:
+                _o, _E = _precision.scale_energy(_o), _precision.scale_energy(_E)
+        else:
+            _o = _E = _m.energy()
+
+        _objective.append(_o.sum())
+        _energy.append(_E.sum())
+
+    return jnp.stack(_objective).sum(), jnp.stack(_energy).sum()
+
+
+@functools.cache
+def _default_energy(n: int, per_sample: bool = False, local: bool = False) -> Vmap:
+    """Returns the vmapped function for 'n' positional (batched) arguments that calls the model with them and returns
+    the objective to differentiate and the energy, averaged over the batch (or per sample, if 'per_sample' is True).
+    The two are the same, unless 'local' is True."""
+
+    @vmap(_VODE_MASK, in_axes=(0,) * n, out_axes=0 if per_sample else None, axis_name="batch")
+    def _energy(*args, model: EnergyModule) -> Tuple[jax.Array, jax.Array]:
+        model(*args)
+        _r = _local_energy(model) if local else (model.energy().sum(),) * 2
+
+        return _r if per_sample else tuple(jax.lax.pmean(_x, "batch") for _x in _r)
+
+    return _energy
+
+
+def _as_objective(energy: Callable[..., jax.Array]) -> Callable[..., Tuple[jax.Array, jax.Array]]:
+    """Wraps a user provided energy function so that it returns the energy both as objective and as energy."""
+
+    def _energy(*args, model: EnergyModule) -> Tuple[jax.Array, jax.Array]:
+        _e = energy(*args, model=model)
+
+        return _e, _e
+
+    return _energy
+
+
+def _mean_objective(energy: Callable[..., Tuple[jax.Array, jax.Array]]) -> Callable[..., Tuple[jax.Array, jax.Array]]:
+    """Wraps a per sample objective function so that it returns the batch average of the objective (to differentiate)
+    and the per sample energies."""
+
+    def _energy(*args, model: EnergyModule) -> Tuple[jax.Array, jax.Array]:
+        _o, _e = energy(*args, model=model)
+
+        return _o.mean(), _e
+
+    return _energy
+
+
+def _check_precision(model: EnergyModule, optim_h: Optim) -> None:
+    """Checks that 'optim_h' undoes the 'energy_scale' of the precision policies of the vodes of 'model'."""
+    _scales = {
+        _p.energy_scale
+        for _m in _ModuleIndex.of(model).select(Vode, params=False)
+        if (_p := _get(_m.precision)) is not None
+    } or {1.0}
+    _scale = _p.energy_scale if (_p := optim_h.precision.get()) is not None else 1.0
+
+    if _scales != {_scale}:
+        raise ValueError(
+            f"The vodes scale their energy by {sorted(_scales)}, but 'optim_h' unscales the gradients by {_scale}: "
+            "construct 'optim_h' with the same Precision policy applied to the model."
+        )
+
+
+def _masked_step(model: EnergyModule, optim_h: Optim, grads: Any, active: jax.Array) -> None:
+    """Updates the vode values with 'optim_h', restoring the previous values of the samples that are not active. The
+    per sample entries of the optimizer state (e.g., momentum or Adam moments) and of its master weights are restored
+    as well, so that the samples that have converged are left untouched. Entries shared by the whole batch (such as the
+    step count of Adam) and the state of a 'flat' optimizer are still updated."""
+    _params = tuple(_p for _p in _ModuleIndex.of(model).params if Mask.apply(_TARGET, _p))
+    _values = tuple(_p.get() for _p in _params)
+    _state, _master = optim_h.state.get(), optim_h.master.get()
+
+    def _select(new, old):
+        if getattr(new, "ndim", 0) < 1 or new.shape[0] != active.shape[0]:
+            return new
+
+        return jnp.where(active.reshape(active.shape + (1,) * (new.ndim - 1)), new, old)
+
+    optim_h.step(model, grads, True)
+
+    for _p, _v in zip(_params, _values):
+        _p.set(_select(_p.get(), _v))
+
+    if optim_h.flat.get() is not True:
+        optim_h.state.set(jax.tree_util.tree_map(_select, optim_h.state.get(), _state))
+        if _master is not None:
+            optim_h.master.set(jax.tree_util.tree_map(_select, optim_h.master.get(), _master))
+
+
+# Core #################################################################################################################
+
+
+def infer(
+    model: EnergyModule,
+    x: Any,
+    optim_h: Optim,
+    T_max: int,
+    tol: float = 0.0,
+    *,
+    energy: Callable[..., jax.Array] | None = None,
+    per_sample: bool = False,
+    local: bool = False,
+) -> Tuple[jax.Array, jax.Array]:
+    """Initialises the vodes of a model with a forward pass and then updates them with 'optim_h' until the relative
+    decrease of the energy falls below 'tol' or 'T_max' steps are performed. Example of usage:
+
+    ```python
+    @pxf.jit()
+    def train_on_batch(x, y, *, model, optim_w, optim_h):
+        model.train()
+        steps, _ = pxc.infer(model, (x, y), optim_h, T_max=20, tol=1e-3)
+
+        # weight update
+        ...
+    ```
+
+    Args:
+        model (EnergyModule): the target model.
+        x (Any): the batched input of the model, or a tuple of batched inputs (e.g., '(x, y)').
+        optim_h (Optim): the optimizer of the vode values. It is initialised with all the non frozen VodeParams of
+            the model and cleared at the end. If the model uses a mixed precision policy with an 'energy_scale', it
+            must be constructed with the same policy, otherwise a ValueError is raised.
+        T_max (int): maximum number of inference steps.
+        tol (float, optional): inference stops when the energy decreases by less than 'tol' times its previous value
+            between two consecutive steps. Defaults to 0.0 (i.e., stop when the energy stops decreasing).
+        energy (Callable[..., jax.Array] | None, optional): function with signature 'energy(*x, model=model)'
+            returning the scalar energy to minimise (or the vector of per sample energies, if 'per_sample' is True),
+            already vmapped over the batch. By default, the model is called with 'x' and its energy is averaged over
+            the batch.
+        per_sample (bool, optional): if True, convergence is tracked independently for each sample: the vode values
+            of a sample (and their optimizer state) are no longer updated once its energy decreases by less than 'tol'
+            times its previous value, and inference stops when all the samples have converged. The gradients are still
+            computed on the batch average of the energy. Defaults to False.
+        local (bool, optional): if True, the gradient of the energy of the vodes using 'se_energy' is computed in
+            closed form from their errors, so that the reverse pass does not go through the energy functions. It
+            requires the default energy function. Defaults to False.
+
+    Raises:
+        ValueError: if both 'energy' and 'local' are provided.
+
+    Returns:
+        Tuple[jax.Array, jax.Array]: the number of inference steps performed and the energy before the last update.
+            If 'per_sample' is True, both are vectors with one entry per sample (e.g., 'steps.mean()' and
+            'steps.max()' can be used to tune 'T_max').
+    """
+    _args = x if isinstance(x, tuple) else (x,)
+    if energy is None:
+        _energy = _default_energy(len(_args), per_sample, local)
+    elif local:
+        raise ValueError("The 'local' mode requires the default energy function, but 'energy' was provided.")
+    else:
+        _energy = _as_objective(energy)
+    _check_precision(model, optim_h)
+
+    with _misc.step(model, STATUS.INIT, clear_params=VodeParam.Cache):
+        _energy(*_args, model=model)
+
+    optim_h.init(Mask(_TARGET)(model))
+
+    if per_sample:
+        _t, _e = _infer_per_sample(model, _args, optim_h, T_max, tol, _mean_objective(_energy))
+    else:
+        _t, _e = _infer(model, _args, optim_h, T_max, tol, _energy)
+
+    optim_h.clear()
+
+    return _t, _e
+
+
+def _infer(
+    model: EnergyModule, args: Tuple[Any, ...], optim_h: Optim, T_max: int, tol: float, energy: Callable
+) -> Tuple[jax.Array, jax.Array]:
+    def _step(t, e_prev, e, *, model, optim_h):
+        with _misc.step(model, clear_params=VodeParam.Cache):
+            (_, (_e,)), _g = value_and_grad(_GRAD_MASK, has_aux=True)(energy)(*args, model=model)
+        optim_h.step(model, _g["model"], True)
+
+        return t + 1, e, _e.astype(jnp.float32)
+
+    def _continue(t, e_prev, e, *, model, optim_h):
+        # The energy is computed before each update, so two steps are needed to measure its decrease.
+        return (t < T_max) & ((t < 2) | (e_prev - e > tol * jnp.abs(e_prev)))
+
+    _t, _, _e = while_loop(_step, _continue)(
+        jnp.array(0, dtype=jnp.int32), jnp.array(jnp.inf, dtype=jnp.float32), jnp.array(jnp.inf, dtype=jnp.float32),
+        model=model,
+        optim_h=optim_h,
+    )
+
+    return _t, _e
+
+
+def _infer_per_sample(
+    model: EnergyModule, args: Tuple[Any, ...], optim_h: Optim, T_max: int, tol: float, energy: Callable
+) -> Tuple[jax.Array, jax.Array]:
+    _batch_size = jax.tree_util.tree_leaves(args)[0].shape[0]
+
+    def _step(t, steps, active, e, *, model, optim_h):
+        with _misc.step(model, clear_params=VodeParam.Cache):
+            (_, (_e,)), _g = value_and_grad(_GRAD_MASK, has_aux=True)(energy)(*args, model=model)
+        _e = _e.astype(jnp.float32)
+
+        # A sample stays active while the last update decreased its energy enough. Since the energy of inactive
+        # samples does not change anymore, they cannot become active again.
+        active = active & ((t < 1) | (e - _e > tol * jnp.abs(e)))
+        _masked_step(model, optim_h, _g["model"], active)
+
+        return t + 1, steps + active, active, _e
+
+    def _continue(t, steps, active, e, *, model, optim_h):
+        return (t < T_max) & jnp.any(active)
+
+    _, _steps, _, _e = while_loop(_step, _continue)(
+        jnp.array(0, dtype=jnp.int32),
+        jnp.zeros((_batch_size,), dtype=jnp.int32),
+        jnp.ones((_batch_size,), dtype=jnp.bool_),
+        jnp.full((_batch_size,), jnp.inf, dtype=jnp.float32),
+        model=model,
+        optim_h=optim_h,
+    )
+
+    return _steps, _e
@@ -0,0 +1,153 @@
+__all__ = ["local_weight_grads"]
+
+
+from typing import Any, Callable, Dict, List, Tuple, Type
+import functools
+
+import jax
+import jax.numpy as jnp
+import jax.tree_util as jtu
+
+from ..core._module import _ModuleIndex
+from ..core._parameter import BaseParam
+from ..functional import grad, vmap
+from ..nn._layer import Layer, _tape
+from ..nn._parameter import LayerParam
+from ..utils._mask import Mask
+# NOTE: "pcax.utils._misc" imports this package, so "step" is looked up at call time to avoid a circular import.
+from ..utils import _misc
+from ._energy_module import EnergyModule
+from ._infer import _VODE_MASK, _local_energy
+from ._parameter import VodeParam
+
+
+########################################################################################################################
+#
+# LEARN
+#
+# In predictive coding, the vodes cut the computational graph of the model: the prediction 'u' of each vode only
+# depends on the weights of the layers producing it and on the values 'h' of the vodes they receive as input. So, the
+# gradient of the energy with respect to the weights of a layer only depends on its (presynaptic) input and on the
+# error 'e = h - u' of the vode it predicts.
+#
+# 'local_weight_grads' computes it in two stages. First, the model is called with the layers recording their inputs,
+# and the errors are propagated to the output of each layer call: for the vodes using 'se_energy', the cotangent of 'u'
+# is '-e' (see the 'local' mode of 'infer'), so this reverse pass only goes through the operations between the layers
+# and the vodes they predict (e.g., activation functions). Then, the gradient of each layer is computed independently,
+# as the vector-Jacobian product of the layer alone with its recorded inputs and output cotangents.
+#
+########################################################################################################################
+
+
+# Utils ################################################################################################################
+
+
+_NO_GRAD_MASK = Mask(BaseParam, (False, False))
+
+
+@functools.cache
+def _layer_cotangents(n: int) -> Callable:
+    """Returns the vmapped function for 'n' positional (batched) arguments that calls the model with them and returns
+    the energy, averaged over the batch, and the inputs and output cotangents of each layer call, grouped by the
+    position of the layer in the '_ModuleIndex' of the model."""
+
+    @vmap(_VODE_MASK, in_axes=(0,) * n, out_axes=(None, 0), axis_name="batch")
+    def _cotangents(*args, model: EnergyModule) -> Tuple[jax.Array, Dict[int, List[Tuple[Any, Any]]]]:
+        _calls = []
+        with _tape(lambda _layer, _args, _r: _calls.append((_layer, _args, _r)) or _r):
+            model(*args)
+        _e = jax.lax.pmean(_local_energy(model)[1], "batch")
+
+        def _objective(deltas, *, model):
+            # Each layer output is perturbed by a zero delta, whose gradient is the cotangent of the output.
+            _deltas = iter(deltas)
+            with _tape(lambda _layer, _args, _r: jtu.tree_map(jnp.add, _r, next(_deltas))):
+                model(*args)
+
+            return _local_energy(model)[0]
+
+        model.clear_params(VodeParam.Cache)
+        ((_ct,), _) = grad(_NO_GRAD_MASK, argnums=(0,))(_objective)(
+            [jtu.tree_map(jnp.zeros_like, _r) for _, _, _r in _calls], model=model
+        )
+
+        # The gradients are averaged over the batch.
+        _n = jax.lax.psum(1, "batch")
+        _index = {id(_l): _i for _i, _l in enumerate(_ModuleIndex.of(model).select(Layer, params=False))}
+        _r = {}
+        for (_layer, _args, _), _c in zip(_calls, _ct):
+            _r.setdefault(_index[id(_layer)], []).append((_args, jtu.tree_map(lambda _x: _x / _n, _c)))
+
+        return _e, _r
+
+    return _cotangents
+
+
+def _layer_vjp(args: Tuple[Any, ...], ct: Any, *, layer: Layer) -> jax.Array:
+    """Returns the inner product of the (batched) layer outputs with their cotangents, whose gradient with respect to
+    the layer weights is their vector-Jacobian product."""
+    _r = jax.vmap(lambda *_args: layer(*_args))(*args)
+
+    return sum(jnp.vdot(_x, _c) for _x, _c in zip(jtu.tree_leaves(_r), jtu.tree_leaves(ct)))
+
+
+# Core #################################################################################################################
+
+
+def local_weight_grads(
+    model: EnergyModule,
+    x: Any,
+    *,
+    filter: Callable[[Any], bool] | Type[BaseParam] = LayerParam,
+) -> Tuple[jax.Array, Any]:
+    """Computes the gradients of the energy of a model with respect to its weights, given the current vode values,
+    using the local errors of the vodes (see above). The layers are applied again to the inputs recorded during the
+    forward pass, which must be jax arrays passed as positional arguments. Example of usage:
+
+    ```python
+    @pxf.jit()
+    def train_on_batch(x, y, *, model, optim_w, optim_h):
+        model.train()
+        pxc.infer(model, (x, y), optim_h, T_max=20)
+
+        e, g = pxc.local_weight_grads(model, (x, y))
+        optim_w.step(model, g)
+
+        return e
+    ```
+
+    Args:
+        model (EnergyModule): the target model. The vodes must be initialised, e.g., by 'infer'.
+        x (Any): the batched input of the model, or a tuple of batched inputs (e.g., '(x, y)').
+        filter (Callable[[Any], bool] | Type[BaseParam], optional): the parameters to differentiate. Only the
+            parameters of the layers of the model receive a (non zero) gradient. Defaults to LayerParam (i.e., all the
+            weights of the layers).
+
+    Returns:
+        Tuple[jax.Array, Any]: the energy of the model averaged over the batch and the gradients of the selected
+            parameters, in the format expected by 'Optim.step'.
+    """
+    _args = x if isinstance(x, tuple) else (x,)
+
+    with _misc.step(model, clear_params=VodeParam.Cache):
+        _e, _calls = _layer_cotangents(len(_args))(*_args, model=model)
+
+    _layers = _ModuleIndex.of(model).select(Layer, params=False)
+    _mask = Mask(filter, [False, True])
+    _grads = {}
+    for _i, _layer_calls in _calls.items():
+        _params = jtu.tree_leaves(Mask(filter)(_layers[_i]), is_leaf=lambda _x: isinstance(_x, BaseParam))
+        if not _params:
+            continue
+
+        for _args_i, _ct in _layer_calls:
+            _g = grad(_mask)(_layer_vjp)(_args_i, _ct, layer=_layers[_i])["layer"]
+            for _p, _g_p in zip(_params, jtu.tree_leaves(_g, is_leaf=lambda _x: isinstance(_x, BaseParam))):
+                _grads[id(_p)] = jtu.tree_map(jnp.add, _grads[id(_p)], _g_p) if id(_p) in _grads else _g_p
+
+    # The selected parameters that are not used by any layer call have zero gradient.
+    return _e, jtu.tree_map(
+        lambda _p: _grads[id(_p)] if id(_p) in _grads else jtu.tree_map(jnp.zeros_like, _p),
+        Mask(filter)(model),
+        is_leaf=lambda _x: isinstance(_x, BaseParam),
+    )
@@ -4,8 +4,9 @@ __all__ = [
 ]
 
 
-from typing import Dict, Optional
+from typing import Any, Dict, Optional, Sequence, Tuple
 import jax
+import jax.numpy as jnp
 
 from ..core._parameter import Param, ParamDict, ParamCache
 
@@ -17,6 +18,12 @@ from ..core._parameter import Param, ParamDict, ParamCache
 # We introduce different types of parameters to be used in the Vodes. This allow the user to distinguish them and target
 # them with specify transformations.
 #
+# By default, the entries of a 'VodeParam.Cache' are added when first set and the whole cache is dropped when cleared,
+# so its structure changes between the phases of a training step (e.g., between the forward initialisation, the energy
+# computation and after clearing). 'VodeParam.FixedCache' instead declares a fixed set of slots: all of them are
+# allocated as soon as the first one is set, and clearing resets their values and validity flags instead of removing
+# them, so that its structure stays the same once the first step has been performed.
+#
 ########################################################################################################################
 
 
@@ -28,6 +35,109 @@ class VodeParam(Param):
         def __init__(self, params: Dict[str, jax.Array] = None):
             super().__init__(params)
 
+    class FixedCache(Cache):
+        """
+        Cache with a fixed set of slots. Slots are allocated (with zeros) when the first one is set: regular slots have
+        the same shape and dtype of the first value, while 'scalar' slots (such as the energy 'E') have one value per
+        sample. Each slot stores its value together with a boolean validity flag (per sample). Clearing the cache
+        (i.e., setting it to None) zeros the values and the flags of all slots, without changing its structure.
+
+        Reading a cleared slot returns zeros (instead of None). Whether a slot has been set since the cache was last
+        cleared is only tracked within the current trace, so '"key" in cache' is False for slots set by a different
+        transformation; 'FixedCache.select' can be used to choose between the cached value and a new one, depending on
+        the validity flag.
+        """
+
+        def __init__(self, slots: Sequence[str] = (), scalars: Sequence[str] = (), ndim: int | None = None):
+            """FixedCache constructor.
+
+            Args:
+                slots (Sequence[str], optional): names of the slots with the same shape of the Vode value.
+                scalars (Sequence[str], optional): names of the slots with a scalar value per sample.
+                ndim (int | None, optional): number of dimensions of a single sample (i.e., of the Vode shape), used
+                    to determine the batch dimensions of the first value. It must be set before the cache is used.
+            """
+            super().__init__(None)
+
+            self.slots = tuple(slots)
+            self.scalars = tuple(scalars)
+            self.ndim = ndim
+
+        # The names of the slots set since the cache was cleared (within the current trace) are not part of its
+        # structure.
+        @staticmethod
+        def _aux_data(param: "VodeParam.FixedCache") -> Tuple[Tuple[str, Any], ...]:
+            return tuple(sorted(_i for _i in param.__dict__.items() if _i[0] != "_known"))
+
+        @staticmethod
+        def _flatten_parameter(param: "VodeParam.FixedCache") -> Tuple[Any, Tuple[Tuple[str, Any], ...]]:
+            return (param._value,), VodeParam.FixedCache._aux_data(param)
+
+        @staticmethod
+        def _flatten_parameter_with_keys(param: "VodeParam.FixedCache") -> Tuple[Any, Tuple[Tuple[str, Any], ...]]:
+            return ((jax.tree_util.GetAttrKey("value"), param._value),), VodeParam.FixedCache._aux_data(param)
+
+        def _allocate(self, value: jax.Array) -> None:
+            _batch_shape = value.shape[: value.ndim - self.ndim]
+            _flag = jnp.zeros(_batch_shape, dtype=bool)
+
+            self._value = {
+                **{_k: (jnp.zeros_like(value), _flag) for _k in self.slots},
+                **{_k: (jnp.zeros(_batch_shape, dtype=value.dtype), _flag) for _k in self.scalars},
+            }
+
+        def __getitem__(self, __key: str) -> jax.Array:
+            if self._value is None:
+                raise KeyError(__key)
+
+            return self._value[__key][0]
+
+        def __setitem__(self, __key: str, __value: jax.Array) -> None:
+            if __key not in self.slots and __key not in self.scalars:
+                raise KeyError(f"'{__key}' is not a slot of {self.__class__.__qualname__}{self.slots + self.scalars}.")
+
+            if self._value is None:
+                self._allocate(__value)
+
+            _flag = self._value[__key][1]
+            self._value = {**self._value, __key: (__value, jnp.ones_like(_flag))}
+            self.__dict__["_known"] = self.__dict__.get("_known", frozenset()) | {__key}
+
+        def __contains__(self, __key: str) -> bool:
+            return __key in self.__dict__.get("_known", ())
+
+        def get(self, key: str | None = None, default: jax.Array | Any | None = None) -> Any:
+            if key is None:
+                return self._value
+
+            return self._value[key][0] if self._value is not None and key in self._value else default
+
+        def set(self, value) -> None:
+            if value is None and self._value is not None:
+                value = {_k: (jnp.zeros_like(_v), jnp.zeros_like(_f)) for _k, (_v, _f) in self._value.items()}
+
+            self._value = value
+            self.__dict__.pop("_known", None)
+
+        def select(self, key: str, value: jax.Array) -> jax.Array:
+            """Returns the cached value of the given slot for the samples for which it is valid, and 'value' for the
+            others.
+
+            Args:
+                key (str): name of the slot.
+                value (jax.Array): the value to use where the slot is not valid.
+
+            Returns:
+                jax.Array: the selected value.
+            """
+            if key in self or self._value is None:
+                return self[key] if key in self else value
+
+            _cached, _flag = self._value[key]
+            _flag = jnp.reshape(_flag, _flag.shape + (1,) * (_cached.ndim - _flag.ndim))
+
+            return jnp.where(_flag, _cached, value)
+
     def __init__(
         self,
         value: Optional[jax.Array] = None
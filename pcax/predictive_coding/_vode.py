@@ -9,9 +9,10 @@ from typing import Callable, Any, Tuple, Dict, Sequence
 import re
 
 from ..core._random import RKG, RandomKeyGenerator
-from ..core._parameter import Param
+from ..core._parameter import Param, get as _get
 from ..core._module import BaseModule
-from ..core._static import static
+from ..core._lazy import LazyModule
+from ..core._static import static, _static_key
 from ._parameter import VodeParam
 from ._energy_module import EnergyModule
 from ._energy import se_energy
@@ -26,8 +27,112 @@ from ._energy import se_energy
 # The standard usage is 'x = vode(act_fn(layer(x)))'. The behaviour of a Vode can be customised by specifying the
 # 'energy_fn' and its 'ruleset'.
 #
+# The shape of a Vode can be omitted, in which case it is inferred from its first activation 'u' within 'pcax.init'.
+#
+# By passing 'cache_slots', a Vode uses a 'VodeParam.FixedCache', whose slots are the given ones plus all the cache
+# entries required by its ruleset ('u', the targets of its input rules that are not parameters and the transformed
+# values of its output rules) and the energy 'E'.
+#
 ########################################################################################################################
 
+# Utils ################################################################################################################
+
+
+# Shared dispatch tables, indexed by the content of their rules.
+_dispatches = {}
+_MAX_DISPATCHES = 256
+
+
+class _Dispatch:
+    """
+    Compiled version of a set of rules. The status patterns are compiled and the rules are parsed once, and the rules
+    matching each (operation, status, key) triplet are cached, so that 'Vode.set' and 'Vode.get' do not match any
+    regular expression after the first time a status and key are seen. It is stored in a Ruleset as a static value,
+    which is shared by all the copies of the Ruleset created within transformations.
+
+    Dispatch tables are shared by all the Rulesets with equal rules (see '_Dispatch.of') and are compared only by
+    their rules, so that they do not prevent models with equal rules from sharing a jit trace. The cached lookups are
+    not part of their identity.
+    """
+
+    _MAX_LOOKUPS = 256
+
+    def __init__(self, rules: Dict[str, Sequence[str]], key: Any | None = None):
+        self.rules = rules
+        # Hashable representation of the content of the rules, or None if they can only be compared by identity.
+        self._key = key
+        self.patterns = tuple(
+            (
+                re.compile(_pattern),
+                tuple(_m.groups() for _rule in _rules if (_m := re.match("(.*(?<!\\s))\\s*<-\\s*(.*)", _rule))),
+                tuple(_m.groups() for _rule in _rules if (_m := re.match("(.*?)\\s*->\\s*(.*)", _rule))),
+            )
+            for _pattern, _rules in rules.items()
+        )
+        self._lookups = {}
+
+    @staticmethod
+    def of(rules: Dict[str, Sequence[str]]) -> "_Dispatch":
+        """Returns the dispatch table shared by all the rulesets with rules equal to the given ones."""
+        try:
+            # Unlike for dict equality, the order of the patterns matters, as it is the order in which they are applied.
+            _key = _static_key(tuple(rules.items()))
+            hash(_key)
+        except TypeError:
+            return _Dispatch(rules)
+
+        if (_dispatch := _dispatches.get(_key, None)) is None:
+            # An evicted table is still valid, it is just not shared with the rulesets created afterwards.
+            if len(_dispatches) >= _MAX_DISPATCHES:
+                del _dispatches[next(iter(_dispatches))]
+            _dispatch = _dispatches[_key] = _Dispatch(rules, _key)
+
+        return _dispatch
+
+    def __eq__(self, other: Any) -> bool:
+        # Rules that cannot be compared by content are compared by identity.
+        if self._key is None or not isinstance(other, _Dispatch):
+            return self is other
+
+        return self._key == other._key
+
+    def __hash__(self) -> int:
+        return hash(self._key) if self._key is not None else id(self)
+
+    def _fingerprint(self) -> Tuple[Tuple[str, Sequence[str]], ...]:
+        return tuple(self.rules.items())
+
+    def _match(self, op: str, status: str, key: str) -> Tuple[Any, ...]:
+        _r = ()
+
+        for _pattern, _set_rules, _get_rules in self.patterns:
+            if _pattern.match(status) is None:
+                continue
+
+            if op == "<-":
+                _r += tuple(
+                    (tuple(_t.strip() for _t in _targets.split(",")), _tform, _tform.split(":", 1)[0])
+                    for _targets, _tform in _set_rules
+                    if re.match(key, _tform)
+                )
+            else:
+                _r += tuple((_key, _tform) for _key, _tform in _get_rules if re.fullmatch(key, _key))
+
+        return _r
+
+    def lookup(self, op: str, status: str | None, key: str) -> Tuple[Any, ...]:
+        _k = (op, status or "", key)
+
+        # Least recently used entries are evicted first.
+        if (_r := self._lookups.pop(_k, None)) is None:
+            _r = self._match(*_k)
+            if len(self._lookups) >= self._MAX_LOOKUPS:
+                del self._lookups[next(iter(self._lookups))]
+        self._lookups[_k] = _r
+
+        return _r
+
+
 # Core #################################################################################################################
 
 
@@ -69,8 +174,36 @@ class Ruleset(BaseModule):
         """
         super().__init__()
 
-        self.rules = static(rules)
+        _dispatch = _Dispatch.of(rules)
+
+        # We store the rules of the shared dispatch table (which are equal to the given ones), so that 'lookup' can
+        # check that they are unchanged by identity.
+        self.rules = static(_dispatch.rules)
         self.tforms = static(tforms)
+        self.dispatch = static(_dispatch)
+
+    def lookup(self, op: str, status: str | None, key: str) -> Tuple[Any, ...]:
+        """Returns the rules matching the current status, the given operation and key. Equivalent to 'filter', but
+        the result is computed once per status and key.
+
+        Args:
+            op (str): either '<-' (input rules) or '->' (output rules).
+            status (str | None): the target status to match.
+            key (str): the key of the rules (i.e., their right-hand side for input rules and their left-hand side for
+                output rules).
+
+        Returns:
+            Tuple[Any, ...]: for input rules, a tuple of (targets, transformation, key) with the targets already split;
+                for output rules, a tuple of (key, transformation).
+        """
+        _dispatch = self.dispatch.get()
+        if _dispatch.rules is not self.rules.get():
+            # The rules have been replaced.
+            _dispatch = _Dispatch.of(self.rules.get())
+            self.rules = static(_dispatch.rules)
+            self.dispatch = static(_dispatch)
+
+        return _dispatch.lookup(op, status, key)
 
     def filter(self, status: str | None, rule_pattern: str):
         """Filter all the rules that match the current status and the given rule pattern.
@@ -137,6 +270,11 @@ class Ruleset(BaseModule):
         """
         _value = node.get(tform, None)
 
+        # A FixedCache returns the value of a slot even if it has been cleared, so it is recomputed (and then selected
+        # according to the validity flag of the slot by 'Vode.get').
+        if ":" in tform and isinstance(node.cache, VodeParam.FixedCache) and tform not in node.cache:
+            _value = None
+
         if _value is None and ":" in tform:
             tform, _t = tform.rsplit(":", 1)
 
@@ -150,7 +288,7 @@ class Ruleset(BaseModule):
         return _value
 
 
-class Vode(EnergyModule):
+class Vode(LazyModule, EnergyModule):
     """
     Base and configurable class for Vectorised Nodes. In a predictive coding network, a Vode is any element whose
     state depends on a particular sample data provided to the network (in contrast with the module weights, which
@@ -162,21 +300,27 @@ class Vode(EnergyModule):
     by Gaussian value nodes. The user can define a custom energy function, a custom set of rules to update the Vode
     and simply inherits from it do define even more customised behaviour."""
 
+    # Mixed precision policy, set by 'pcax.Precision.apply'.
+    precision = None
+
     def __init__(
         self,
-        shape: Tuple[int, ...],
+        shape: Tuple[int, ...] | None = None,
         energy_fn: Callable[["Vode", RandomKeyGenerator], jax.Array] = se_energy,
         ruleset: dict = {},
         tforms: dict = {},
         param_type: type[VodeParam] = VodeParam,
         *param_args,
+        cache_slots: Sequence[str] | None = None,
         **param_kwargs,
     ):
         """Vode constructor.
 
         Args:
-            shape (Tuple[int, ...]): shape (not including the batch dimension) of the Vode value. It should match
-                the input activation 'u'.
+            shape (Tuple[int, ...] | None, optional): shape (not including the batch dimension) of the Vode value. It
+                should match the input activation 'u'. If None, it is set to the shape of the first activation 'u'
+                received within 'pcax.init', which must thus be called on the same (vmapped) function used to train
+                the model.
             energy_fn (Callable[['Vode', RandomKeyGenerator], jax.Array], optional): function used to compute the Vode
                 energy.
             ruleset (Ruleset, optional): ruleset specifying the Vode behaviour. The default value indicates that, with
@@ -184,6 +328,8 @@ class Vode(EnergyModule):
                 corresponds to forward initialisation.
             param_type (type[VodeParam], optional): the parameter type of the value 'h'. Defaults to VodeParam.
             *param_args, **param_kwargs: arguments passed to the 'param_type' constructor.
+            cache_slots (Sequence[str] | None, optional): if provided, the Vode uses a 'VodeParam.FixedCache' with the
+                given slots in addition to the ones required by its ruleset. By default, a 'VodeParam.Cache' is used.
         """
         super().__init__()
 
@@ -193,6 +339,35 @@ class Vode(EnergyModule):
         self.energy_fn = static(energy_fn)
         self.ruleset = Ruleset({STATUS.INIT: ("h, u <- u",), **ruleset}, tforms)
 
+        if cache_slots is not None:
+            self.cache = param_type.FixedCache(
+                self._cache_slots(cache_slots), ("E",), len(shape) if shape is not None else None
+            )
+
+        if shape is None:
+            self._lazy_init()
+
+    def _cache_slots(self, slots: Sequence[str]) -> Tuple[str, ...]:
+        """Returns the given cache slots plus the ones required by the Vode ruleset."""
+        _slots = dict.fromkeys(("u", *slots))
+
+        for _rules in self.ruleset.rules.values():
+            for _rule in _rules:
+                if _match := re.match("(.*(?<!\\s))\\s*<-\\s*(.*)", _rule):
+                    for _target in _match.group(1).split(","):
+                        if not isinstance(getattr(self, _target.strip(), None), Param):
+                            _slots[_target.strip()] = None
+                elif (_match := re.match("(.*?)\\s*->\\s*(.*)", _rule)) and ":" in _match.group(2):
+                    _slots[_match.group(2)] = None
+
+        return tuple(_slots)
+
+    def _lazy_install(self, value: Tuple[int, ...], built: None) -> None:
+        self.shape = static(value)
+
+        if isinstance(self.cache, VodeParam.FixedCache):
+            self.cache.ndim = len(value)
+
     def __call__(self, u: jax.Array | None, rkg: RandomKeyGenerator = RKG, output="h", **kwargs) -> jax.Array | Any:
         """Deep learning layers are typically implemented as callable objects, taking in input the incoming activation
         and returning the transformed activation. Analogously, a Vode is implemented as a callable object, taking in
@@ -210,6 +385,12 @@ class Vode(EnergyModule):
             jax.Array | 'Vode': output value corresponding to the selected output parameter.
         """
         if u is not None:
+            if self.is_lazy:
+                self.shape.set(self._lazy_resolve(tuple(u.shape)))
+
+                if isinstance(self.cache, VodeParam.FixedCache):
+                    self.cache.ndim = len(self.shape.get())
+
             self.set("u", u, rkg)
 
         for _k, _v in kwargs.items():
@@ -237,14 +418,11 @@ class Vode(EnergyModule):
         Returns:
             Vode: returns itself to allow for chaining.
         """
-        _rule_pattern = f'(.*(?<!\\s))\\s*<-\\s*({key}.*)'
-
-        rules = tuple(self.ruleset.filter(self.status, _rule_pattern))
-        for _targets, _tform in rules:
-            _value = self.ruleset.apply_set_transformation(self, _tform, _tform.split(":", 1)[0], value, rkg)
+        rules = self.ruleset.lookup("<-", self.status, key)
+        for _targets, _tform, _key in rules:
+            _value = self.ruleset.apply_set_transformation(self, _tform, _key, value, rkg)
 
-            for _target in _targets.split(","):
-                _target = _target.strip()
+            for _target in _targets:
                 if hasattr(self, _target) and isinstance((_param := getattr(self, _target)), Param):
                     _param.set(_value)
                 else:
@@ -272,9 +450,7 @@ class Vode(EnergyModule):
         Returns:
             jax.Array | Any | None: the value of the parameter corresponding to the given key.
         """
-        _rule_pattern = f"({key})\\s*->\\s*(.*)"
-
-        _rules = tuple(self.ruleset.filter(self.status, _rule_pattern))
+        _rules = self.ruleset.lookup("->", self.status, key)
 
         if len(_rules) == 0:
             if hasattr(self, key) and isinstance((_param := getattr(self, key)), Param):
@@ -290,6 +466,9 @@ class Vode(EnergyModule):
             _value = self.ruleset.apply_get_transformation(self, _tform, _target, rkg=rkg)
 
             if ":" in _tform:
+                if isinstance(self.cache, VodeParam.FixedCache):
+                    _value = self.cache.select(_tform, _value)
+
                 self.cache[_tform] = _value
 
             return _value
@@ -308,6 +487,9 @@ class Vode(EnergyModule):
         """
         if "E" not in self.cache:
             _E = self.energy_fn(self, rkg=rkg) if self.energy_fn is not None else 0.0
+            if (_precision := _get(self.precision)) is not None:
+                # energies are summed over all the units of the vode, so they are cast before being reduced
+                _E = _precision.scale_energy(_E)
             if self.h.shape == self.shape.get():
                 # if the shape is the same as the vode shape,
                 # '.energy' is being called from a vmapped function
@@ -5,6 +5,9 @@ __all__ = [
     "step",
     
     "Optim",
+
+    "MemoryReport",
+    "memory_report",
     
     "save_params",
     "load_params",
@@ -13,6 +16,7 @@ __all__ = [
 from ._mask import (Mask, m)
 from ._misc import (step)
 from ._optim import (Optim)
+from ._memory import (MemoryReport, memory_report)
 
 
 from ._serialisation import (
@@ -48,6 +48,9 @@ class Mask:
         self.x = x
         self.map_to = map_to
 
+    def _fingerprint(self) -> Tuple[Any, ...]:
+        return (self.x, self.map_to)
+
     def __call__(self, pydag: Any, is_pytree: bool = False) -> Any:
         """Applies the mask to the given pydag.
 
@@ -120,6 +123,9 @@ class m:
     ):
         self.x = x
 
+    def _fingerprint(self) -> Tuple[Any, ...]:
+        return (self.x,)
+
     def __call__(self, leaf: Any) -> Any:
         return Mask.apply(self.x, leaf)
 
@@ -176,6 +182,9 @@ class _m_hasattr(m):
         super().__init__(arg)
         self.attrs = attrs
 
+    def _fingerprint(self) -> Tuple[Any, ...]:
+        return (self.x, self.attrs)
+
     def __call__(self, leaf: Any):
         return Mask.apply(self.x, leaf) and all(
             hasattr(leaf, attr) and getattr(leaf, attr) == value
@@ -190,6 +199,9 @@ class _m_hasnotattr(m):
         super().__init__(arg)
         self.attrs = attrs
 
+    def _fingerprint(self) -> Tuple[Any, ...]:
+        return (self.x, self.attrs)
+
     def __call__(self, leaf: Any):
         return Mask.apply(self.x, leaf) and all(
             (not hasattr(leaf, attr)) or (getattr(leaf, attr) != value)
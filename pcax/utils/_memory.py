@@ -0,0 +1,202 @@
+__all__ = ["MemoryReport", "memory_report"]
+
+
+from typing import Any, Dict, Tuple
+import math
+
+import numpy as np
+import jax
+import jax.tree_util as jtu
+
+from ..core._module import BaseModule
+from ..core._parameter import BaseParam, DynamicParam
+from ..predictive_coding._parameter import VodeParam
+from ..predictive_coding._vode import Vode
+from ._optim import Optim
+
+
+########################################################################################################################
+#
+# MEMORY
+#
+# Utilities to estimate the memory required by a model before running it. The size of each parameter is computed from
+# the abstract value (i.e., shape and dtype) of its value, so nothing is allocated or copied. Since the size of the
+# VodeParams depends on the batch size, they can be rescaled to a different one (or estimated from the Vode shape, if
+# they have not been initialised yet). The peak memory of a jitted step is taken from XLA's memory analysis of its
+# compiled executable.
+#
+########################################################################################################################
+
+
+# Utils ################################################################################################################
+
+
+_FLOAT32_BYTES = np.dtype(np.float32).itemsize
+
+
+def _nbytes(x: Any, batch_size: int | None = None) -> int:
+    """Bytes required by the array leaves of 'x'. If 'batch_size' is given, the leading dimension of each leaf is
+    replaced by it."""
+    _bytes = 0
+
+    for _l in jtu.tree_leaves(x):
+        try:
+            _aval = jax.api_util.shaped_abstractify(_l)
+        except TypeError:
+            continue
+
+        _shape = _aval.shape
+        if batch_size is not None and len(_shape):
+            _shape = (batch_size,) + _shape[1:]
+        _bytes += math.prod(_shape) * _aval.dtype.itemsize
+
+    return _bytes
+
+
+def _params_nbytes(x: Any, batch_size: int | None = None) -> int:
+    """Bytes required by the parameters in 'x' (e.g., an optimizer state). If 'batch_size' is given, the VodeParams
+    are rescaled to it."""
+    return sum(
+        _nbytes(_l, batch_size if isinstance(_l, VodeParam | VodeParam.Cache) else None)
+        for _l in jtu.tree_leaves(x, is_leaf=lambda x: isinstance(x, BaseParam))
+    )
+
+
+def _param_type(param: BaseParam) -> str:
+    # FlatStore views are reported as their original type.
+    return getattr(type(param), "_view_of", type(param)).__qualname__
+
+
+# Core #################################################################################################################
+
+
+class MemoryReport:
+    """Memory report returned by 'memory_report'. All sizes are in bytes."""
+
+    def __init__(
+        self,
+        modules: Dict[str, int],
+        params: Dict[str, int],
+        optims: Tuple[int, ...],
+        step: Any | None = None,
+    ):
+        """MemoryReport constructor.
+
+        Args:
+            modules (Dict[str, int]): bytes of the parameters owned by each (sub)module, indexed by its path.
+            params (Dict[str, int]): bytes of the parameters of each type, indexed by the type name.
+            optims (Tuple[int, ...]): bytes of the state (and master weights) of each optimizer.
+            step (Any | None, optional): XLA memory analysis of the compiled step, if any.
+        """
+        self.modules = modules
+        self.params = params
+        self.optims = optims
+        self.step = step
+
+    @property
+    def total(self) -> int:
+        """Bytes of all the parameters and optimizer states."""
+        return sum(self.params.values()) + sum(self.optims)
+
+    @property
+    def peak(self) -> int | None:
+        """Peak memory of the compiled step (its arguments, outputs and temporary buffers), if available."""
+        if self.step is None:
+            return None
+
+        return (
+            self.step.argument_size_in_bytes
+            + self.step.output_size_in_bytes
+            + self.step.temp_size_in_bytes
+            - self.step.alias_size_in_bytes
+        )
+
+    def __repr__(self) -> str:
+        _lines = ["modules:"]
+        _lines += [f"  {_k or '<root>'}: {_v}" for _k, _v in self.modules.items()]
+        _lines += ["params:"]
+        _lines += [f"  {_k}: {_v}" for _k, _v in self.params.items()]
+        _lines += ["optims:"]
+        _lines += [f"  [{_i}]: {_v}" for _i, _v in enumerate(self.optims)]
+        _lines += [f"total: {self.total}"]
+        if self.step is not None:
+            _lines += [f"step peak: {self.peak} (temp: {self.step.temp_size_in_bytes})"]
+
+        return "\n".join(_lines)
+
+
+def memory_report(
+    model: BaseModule,
+    *optims: Optim,
+    batch_size: int | None = None,
+    step: Any | None = None,
+    args: Tuple[Any, ...] = (),
+    kwargs: Dict[str, Any] | None = None,
+) -> MemoryReport:
+    """Reports the memory used by the (dynamic) parameters of a model, per module and per parameter type, and by the
+    given optimizers. Example of usage:
+
+    ```python
+    print(pxu.memory_report(model, optim_w, batch_size=256, step=train_on_batch, args=(x, y), kwargs=kwargs))
+    ```
+
+    Args:
+        model (BaseModule): the target model.
+        *optims (Optim): optimizers whose state is reported. Uninitialised optimizers require no memory.
+        batch_size (int | None, optional): if provided, the size of VodeParams and VodeParam.Caches (and of the
+            optimizer states of VodeParams, e.g., of 'optim_h') is computed for the given batch size. Uninitialised
+            Vodes are assumed to store (in float32) their value 'h' and their activation 'u' in the cache. The state
+            of flat optimizers is not rescaled.
+        step (Jit | None, optional): a 'pcax.functional.Jit' transformation whose compiled memory is reported. It is
+            lowered and compiled (but not run) with 'args' and 'kwargs'.
+        args (Tuple[Any, ...], optional): positional arguments used to compile 'step'.
+        kwargs (Dict[str, Any] | None, optional): keyword arguments used to compile 'step'.
+
+    Returns:
+        MemoryReport: the memory report.
+    """
+    _modules = {}
+    _params = {}
+    _seen = set()
+
+    def _visit(module: BaseModule, path: str) -> None:
+        _modules[path] = 0
+
+        for _path, _leaf in jtu.tree_leaves_with_path(
+            module, is_leaf=lambda x: x is not module and isinstance(x, BaseParam | BaseModule)
+        ):
+            if isinstance(_leaf, BaseModule):
+                if id(_leaf) not in _seen:
+                    _seen.add(id(_leaf))
+                    _visit(_leaf, path + jtu.keystr(_path))
+                continue
+            elif not isinstance(_leaf, DynamicParam) or id(_leaf) in _seen:
+                continue
+            _seen.add(id(_leaf))
+
+            _vode = isinstance(_leaf, VodeParam | VodeParam.Cache)
+            _bytes = _nbytes(_leaf.get(), batch_size if _vode else None)
+
+            # Uninitialised vodes (but not initialised vodes with a cleared cache) are estimated from their shape.
+            if (
+                batch_size is not None
+                and isinstance(module, Vode)
+                and (_leaf is module.h or _leaf is module.cache)
+                and module.h.get() is None
+                and isinstance(_shape := module.shape.get(), tuple)
+            ):
+                _bytes = batch_size * math.prod(_shape) * _FLOAT32_BYTES
+
+            _modules[path] += _bytes
+            _params[_param_type(_leaf)] = _params.get(_param_type(_leaf), 0) + _bytes
+
+    _seen.add(id(model))
+    _visit(model, "")
+
+    _optims = tuple(_params_nbytes((_o.state.get(), _o.master.get()), batch_size) for _o in optims)
+
+    _step = None
+    if step is not None:
+        _step = step.lower(*args, **(kwargs or {})).compile().memory_analysis()
+
+    return MemoryReport(_modules, _params, _optims, _step)
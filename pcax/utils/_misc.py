@@ -3,7 +3,7 @@ from jaxtyping import PyTree
 import contextlib
 import enum
 
-from ..core._tree import tree_apply
+from ..core._module import _ModuleIndex
 from ..predictive_coding._energy_module import EnergyModule
 
 
@@ -51,11 +51,13 @@ def step(
     if clear_params[0] is not None:
         module.clear_params(clear_params[0])
         
-    tree_apply(lambda m: m._status.set(status[0]), lambda x: isinstance(x, EnergyModule), tree=module)
+    for _m in _ModuleIndex.of(module).select(EnergyModule, params=False):
+        _m._status.set(status[0])
 
     yield
-    
-    tree_apply(lambda m: m._status.set(status[1]), lambda x: isinstance(x, EnergyModule), tree=module)
+
+    for _m in _ModuleIndex.of(module).select(EnergyModule, params=False):
+        _m._status.set(status[1])
     
     if clear_params[1] is not None:
         module.clear_params(clear_params[1])
@@ -2,11 +2,14 @@ __all__ = ["Optim"]
 
 from jaxtyping import PyTree
 import optax
+import jax.numpy as jnp
 import jax.tree_util as jtu
+from jax.flatten_util import ravel_pytree
 import equinox as eqx
 
 from ..core._module import BaseModule
 from ..core._parameter import Param, BaseParam, set, get
+from ..core._precision import Precision
 from ..core._static import static
 
 
@@ -25,23 +28,47 @@ from ..core._static import static
 # each individual weights with a different parameter (which when '.update' is called, can be firstly replaced with their
 # values, similarly to the 'Layer.__call__' method).
 #
+# When constructed with a mixed precision policy (see 'pcax.Precision') whose 'param_dtype' is not float32, Optim keeps
+# a float32 copy (the master weights) of the target parameters. The gradients are cast to float32 and unscaled, the
+# optimizer is applied to the master weights, and the parameters are set to their value cast to 'param_dtype'. This
+# prevents small updates from being rounded away by the low precision parameters. If a parameter is changed outside of
+# the optimizer (e.g., the vode values by a forward pass with status 'STATUS.INIT'), its master weights are reset to
+# its new value at the next step. Gradients computed from a scaled energy are unscaled only by an Optim constructed with
+# the same policy, so all the optimizers of the energy of a model (including the vode one) must be given it.
+#
 ########################################################################################################################
 
 
 class Optim(BaseModule):
     """Optim inherits from core.BaseModule and thus it is a pytree. It is a thin wrapper around the optax library."""
 
-    def __init__(self, optax_opt: optax.GradientTransformation, parameters: PyTree | None = None):
+    def __init__(
+        self,
+        optax_opt: optax.GradientTransformation,
+        parameters: PyTree | None = None,
+        flat: bool = False,
+        precision: Precision | None = None,
+    ):
         """Optim constructor.
 
         Args:
             optax_opt (optax.GradientTransformation): the optax constructor function.
             parameters (PyTree | None, optional): target parameters. The init method can be called separately by passing
                 None.
+            flat (bool, optional): if True, the target parameters are concatenated into a single vector before being
+                passed to optax, so that the whole group is updated at once (instead of once per parameter) and the
+                optimizer state is stored contiguously. Note that, in this case, optax transformations that depend on
+                the structure of the parameters (such as masked or per-layer ones) see a single parameter.
+            precision (Precision | None, optional): mixed precision policy of the target parameters. If provided, the
+                gradients are divided by its 'energy_scale' and, if its 'param_dtype' is not float32, the optimizer
+                updates float32 master weights.
         """
         self.optax_opt = static(optax_opt)
         self.state = Param(None)
         self.filter = static(None)
+        self.flat = static(flat)
+        self.precision = static(precision)
+        self.master = Param(None)
 
         if parameters is not None:
             self.init(parameters)
@@ -84,11 +111,26 @@ class Optim(BaseModule):
         else:
             grads = eqx.filter(grads, self.filter.get(), is_leaf=lambda x: isinstance(x, BaseParam))
 
-        updates, state = self.optax_opt.update(
-            grads,
-            self.state.get(),
-            module,
-        )
+        if (_precision := self.precision.get()) is not None:
+            grads = _precision.unscale(grads)
+
+        # With master weights, the optimizer operates on their (float32) values instead of the parameters.
+        if (_params := self.master.get()) is not None:
+            _params = self._sync_master(module)
+            grads = jtu.tree_map(get, grads, is_leaf=lambda x: isinstance(x, BaseParam))
+        else:
+            _params = module
+
+        if self.flat.get() is True:
+            _grads, _unravel = ravel_pytree(grads)
+            updates, state = self.optax_opt.update(_grads, self.state.get(), ravel_pytree(_params)[0])
+            updates = _unravel(updates)
+        else:
+            updates, state = self.optax_opt.update(
+                grads,
+                self.state.get(),
+                _params,
+            )
         self.state.set(state)
 
         if apply_updates:
@@ -96,6 +138,20 @@ class Optim(BaseModule):
 
         return updates
 
+    def _sync_master(self, module: PyTree) -> PyTree:
+        """Updates the master weights with the values of the (filtered) parameters in 'module' that differ from them
+        (once cast to the parameters dtype), i.e., that have been changed outside of the optimizer."""
+
+        def _sync(m, p):
+            _p = get(p)
+
+            return jnp.where(_p == m.astype(_p.dtype), m, _p.astype(jnp.float32))
+
+        _master = jtu.tree_map(_sync, self.master.get(), module, is_leaf=lambda x: isinstance(x, BaseParam))
+        self.master.set(_master)
+
+        return _master
+
     def apply_updates(self, module: PyTree, updates: PyTree) -> None:
         """Applies the updates to the module parameters.
 
@@ -104,6 +160,21 @@ class Optim(BaseModule):
             updates (PyTree): the updates to apply. Provided updates must match the same structure of the module used to
                 initialise the optimizer.
         """
+        if (_master := self.master.get()) is not None:
+            _master = jtu.tree_map(
+                lambda u, m: eqx.apply_updates(m, get(u)), updates, _master, is_leaf=lambda x: isinstance(x, BaseParam)
+            )
+            self.master.set(_master)
+
+            jtu.tree_map(
+                lambda m, p: set(p, m.astype(get(p).dtype)),
+                _master,
+                eqx.filter(module, self.filter.get(), is_leaf=lambda x: isinstance(x, BaseParam)),
+                is_leaf=lambda x: isinstance(x, BaseParam),
+            )
+
+            return
+
         jtu.tree_map(
             lambda u, p: set(p, eqx.apply_updates(get(p), get(u))),
             updates,
@@ -120,8 +191,21 @@ class Optim(BaseModule):
         )
         parameters = eqx.filter(parameters, self.filter.get(), is_leaf=lambda x: isinstance(x, BaseParam))
 
+        _precision = self.precision.get()
+        if _precision is not None and _precision.param_dtype != jnp.float32:
+            parameters = jtu.tree_map(
+                lambda x: get(x).astype(jnp.float32), parameters, is_leaf=lambda x: isinstance(x, BaseParam)
+            )
+            self.master.set(parameters)
+        else:
+            self.master.set(None)
+
+        if self.flat.get() is True:
+            parameters = ravel_pytree(parameters)[0]
+
         self.state.set(self.optax_opt.init(parameters))
 
     def clear(self) -> None:
         self.state.set(None)
         self.filter.set(None)
+        self.master.set(None)
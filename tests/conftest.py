@@ -0,0 +1,19 @@
+import os
+
+# Multiple devices are emulated on CPU to test the data-parallel transformations. This must happen before jax is
+# imported.
+os.environ.setdefault("XLA_FLAGS", "--xla_force_host_platform_device_count=4")
+
+import jax  # noqa: E402
+import jax.numpy as jnp  # noqa: E402
+import pytest  # noqa: E402
+
+jax.config.update("jax_platform_name", "cpu")
+
+
+@pytest.fixture
+def batch():
+    x = jax.random.normal(jax.random.PRNGKey(1), (16, 8))
+    y = jax.nn.one_hot(jnp.arange(16) % 4, 4)
+
+    return x, y
@@ -0,0 +1,83 @@
+"""Small predictive coding models and training steps shared by the tests."""
+
+import jax
+import jax.numpy as jnp
+import optax
+
+import pcax as px
+import pcax.functional as pxf
+import pcax.nn as pxnn
+import pcax.predictive_coding as pxc
+import pcax.utils as pxu
+
+
+VODES = pxc.VodeParam | pxc.VodeParam.Cache
+H_FILTER = pxu.m(pxc.VodeParam).has_not(frozen=True)
+
+
+class Model(pxc.EnergyModule):
+    def __init__(self, i: int = 8, h: int = 16, o: int = 4, **vode_kwargs):
+        super().__init__()
+        self.layers = [pxnn.Linear(i, h), pxnn.Linear(h, o)]
+        self.vodes = [pxc.Vode((h,), **vode_kwargs), pxc.Vode((o,), **vode_kwargs)]
+        self.vodes[-1].h.frozen = True
+
+    def __call__(self, x, y):
+        x = self.vodes[0](jax.nn.tanh(self.layers[0](x)))
+        x = self.vodes[1](self.layers[1](x))
+        if y is not None:
+            self.vodes[1].set("h", y)
+
+        return self.vodes[1].get("u")
+
+
+@pxf.vmap(pxu.Mask(VODES, (None, 0)), in_axes=(0, 0), out_axes=0)
+def forward(x, y, *, model):
+    return model(x, y)
+
+
+@pxf.vmap(pxu.Mask(VODES, (None, 0)), in_axes=(0,), out_axes=(None, 0), axis_name="batch")
+def energy(x, *, model):
+    y_ = model(x, None)
+
+    return jax.lax.pmean(model.energy().sum(), "batch"), y_
+
+
+def init(model, x, y=None):
+    with pxu.step(model, pxc.STATUS.INIT, clear_params=pxc.VodeParam.Cache):
+        forward(x, y, model=model)
+
+
+def build(seed: int = 0, **vode_kwargs):
+    px.RKG.seed(seed)
+    model = Model(**vode_kwargs)
+    init(model, jnp.zeros((16, 8)))
+
+    optim_h = pxu.Optim(optax.sgd(0.1))
+    optim_w = pxu.Optim(optax.adam(1e-2), pxu.Mask(pxnn.LayerParam)(model))
+
+    return model, optim_w, optim_h
+
+
+def weight_grads(x, model):
+    with pxu.step(model, clear_params=pxc.VodeParam.Cache):
+        (e, _), g = pxf.value_and_grad(pxu.Mask(pxnn.LayerParam, [False, True]), has_aux=True)(energy)(x, model=model)
+
+    return e, g["model"]
+
+
+def train_on_batch(T, x, y, *, model, optim_w, optim_h):
+    model.train()
+    init(model, x, y)
+
+    optim_h.init(pxu.Mask(H_FILTER)(model))
+    for _ in range(T):
+        with pxu.step(model, clear_params=pxc.VodeParam.Cache):
+            (e, _), g = pxf.value_and_grad(pxu.Mask(H_FILTER, [False, True]), has_aux=True)(energy)(x, model=model)
+        optim_h.step(model, g["model"], True)
+    optim_h.clear()
+
+    e, g = weight_grads(x, model)
+    optim_w.step(model, g)
+
+    return e
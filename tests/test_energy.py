@@ -0,0 +1,58 @@
+import jax
+import jax.numpy as jnp
+
+import pcax.functional as pxf
+import pcax.predictive_coding as pxc
+import pcax.utils as pxu
+
+import pc_models as M
+
+
+class _Nested(pxc.EnergyModule):
+    def __init__(self):
+        super().__init__()
+        self.inner = M.Model()
+        self.vode = pxc.Vode((4,))
+
+    def __call__(self, x, y):
+        return self.vode(self.inner(x, y))
+
+
+@pxf.vmap(pxu.Mask(M.VODES, (None, 0)), in_axes=(0,), out_axes=0)
+def _energies(x, *, model):
+    model(x, None)
+
+    return model.energies(), model.energy()
+
+
+def test_energies(batch):
+    x, _ = batch
+    model, _, _ = M.build()
+    M.init(model, x)
+
+    with pxu.step(model, clear_params=pxc.VodeParam.Cache):
+        _es, _e = _energies(x + 1.0, model=model)
+
+    assert _es.shape == (x.shape[0], 2)
+    assert jnp.allclose(_es.sum(axis=1), _e)
+    assert jnp.allclose(_es[:, 0], jax.vmap(lambda _h, _u: 0.5 * ((_h - _u) ** 2).sum())(
+        model.vodes[0].h.get(), jax.nn.tanh(jax.vmap(model.layers[0])(x + 1.0))
+    ), atol=1e-5)
+
+
+def test_energies_nested(batch):
+    x, _ = batch
+    model = _Nested()
+    model.clear_params(M.VODES)
+    M.init(model, x)
+
+    with pxu.step(model, clear_params=pxc.VodeParam.Cache):
+        _es, _e = _energies(x, model=model)
+
+    # The vodes of the nested EnergyModule are included.
+    assert _es.shape == (x.shape[0], 3)
+    assert jnp.allclose(_es.sum(axis=1), _e)
+
+
+def test_energies_without_vodes():
+    assert pxc.EnergyModule().energies().shape == (0,)
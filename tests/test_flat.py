@@ -0,0 +1,88 @@
+import jax
+import jax.numpy as jnp
+import optax
+import pytest
+
+import pcax as px
+import pcax.functional as pxf
+import pcax.nn as pxnn
+import pcax.utils as pxu
+
+import pc_models as M
+
+
+def _train(x, y, flat, store, n=3):
+    model, _, _ = M.build()
+    optim_w = pxu.Optim(optax.adam(1e-2), pxu.Mask(pxnn.LayerParam)(model), flat=flat)
+    optim_h = pxu.Optim(optax.sgd(0.1), flat=flat)
+    if store:
+        px.FlatStore(pxu.Mask(pxnn.LayerParam)(model))
+
+    train_on_batch = pxf.jit(static_argnums=0)(M.train_on_batch)
+    _e = [float(train_on_batch(2, x, y, model=model, optim_w=optim_w, optim_h=optim_h)) for _ in range(n)]
+
+    return _e, model, optim_w
+
+
+@pytest.mark.parametrize("flat, store", [(True, False), (False, True), (True, True)])
+def test_flat_optim_matches(batch, flat, store):
+    x, y = batch
+    _ref, _ref_model, _ = _train(x, y, False, False)
+    _e, _model, _optim_w = _train(x, y, flat, store)
+
+    assert _e == pytest.approx(_ref, rel=1e-5)
+    for _p, _ref_p in zip(pxu.Mask(pxnn.LayerParam)(_model).layers, pxu.Mask(pxnn.LayerParam)(_ref_model).layers):
+        assert jnp.allclose(_p.nn.weight.get(), _ref_p.nn.weight.get(), atol=1e-6)
+
+    if flat:
+        # The optimizer state holds a single buffer per dtype instead of one array per parameter.
+        assert all(_s.ndim == 1 for _s in jax.tree_util.tree_leaves(_optim_w.state.get()) if _s.ndim > 0)
+
+
+def test_flat_store_views():
+    px.RKG.seed(0)
+    layers = [pxnn.Linear(4, 3) for _ in range(3)]
+    _values = [_l.nn.weight.get() for _l in layers]
+
+    store = px.FlatStore(pxu.Mask(pxnn.LayerParam)(layers))
+    assert set(store.buffers) == {"float32"}
+    assert store.buffers["float32"].get().size == 3 * (4 * 3 + 3)
+    assert all(isinstance(_l.nn.weight, pxnn.LayerParam) for _l in layers)
+    assert all(jnp.array_equal(_l.nn.weight.get(), _v) for _l, _v in zip(layers, _values))
+
+    layers[1].nn.weight.set(jnp.zeros((3, 4)))
+    assert jnp.array_equal(layers[1].nn.weight.get(), jnp.zeros((3, 4)))
+    assert jnp.array_equal(layers[0].nn.weight.get(), _values[0])
+
+    with pytest.raises(ValueError):
+        layers[0].nn.weight.set(jnp.zeros((4, 4)))
+
+    store.release()
+    assert jnp.array_equal(layers[1].nn.weight.get(), jnp.zeros((3, 4)))
+    assert jnp.array_equal(layers[2].nn.weight.get(), _values[2])
+
+
+def test_flat_store_batched_writes(monkeypatch):
+    px.RKG.seed(0)
+    layers = [pxnn.Linear(4, 4) for _ in range(4)]
+    store = px.FlatStore(pxu.Mask(pxnn.LayerParam)(layers))
+    _buffer = store.buffers["float32"]
+
+    _writes = []
+    _set = type(_buffer).set
+    monkeypatch.setattr(type(_buffer), "set", lambda self, v: (_writes.append(self is _buffer), _set(self, v))[1])
+
+    # Outside of Jit, the values returned by a transformation are written back into all the views with a single
+    # update of the buffer.
+    @pxf.vmap({"layers": None}, in_axes=(0,), out_axes=0)
+    def double(x, *, layers):
+        for _l in layers:
+            _l.nn.weight.set(_l.nn.weight.get() * 2)
+
+        return x
+
+    _values = [_l.nn.weight.get() for _l in layers]
+    double(jnp.zeros((1,)), layers=layers)
+
+    assert _writes.count(True) == 1
+    assert all(jnp.array_equal(_l.nn.weight.get(), 2 * _v) for _l, _v in zip(layers, _values))
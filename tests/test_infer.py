@@ -0,0 +1,170 @@
+import jax
+import jax.numpy as jnp
+import optax
+import pytest
+
+import pcax.functional as pxf
+import pcax.predictive_coding as pxc
+import pcax.utils as pxu
+from pcax.predictive_coding._infer import _masked_step
+
+import pc_models as M
+
+
+def _manual_infer(T, x, y, *, model, optim_h):
+    model.train()
+    M.init(model, x, y)
+
+    optim_h.init(pxu.Mask(M.H_FILTER)(model))
+    for _ in range(T):
+        with pxu.step(model, clear_params=pxc.VodeParam.Cache):
+            (e, _), g = pxf.value_and_grad(pxu.Mask(M.H_FILTER, [False, True]), has_aux=True)(M.energy)(x, model=model)
+        optim_h.step(model, g["model"], True)
+    optim_h.clear()
+
+    return e
+
+
+@pxf.jit(static_argnums=(0, 1, 2, 3))
+def _infer(T, tol, per_sample, local, x, y, *, model, optim_h):
+    model.train()
+
+    return pxc.infer(model, (x, y), optim_h, T, tol, per_sample=per_sample, local=local)
+
+
+def test_infer_matches_manual_loop(batch):
+    x, y = batch
+
+    model, _, optim_h = M.build()
+    _e = pxf.jit(static_argnums=0)(_manual_infer)(5, x, y, model=model, optim_h=optim_h)
+    _h = model.vodes[0].h.get()
+
+    model, _, optim_h = M.build()
+    _t, _e_infer = _infer(5, -1.0, False, False, x, y, model=model, optim_h=optim_h)
+
+    assert int(_t) == 5
+    assert float(_e_infer) == pytest.approx(float(_e), rel=1e-5)
+    assert jnp.allclose(model.vodes[0].h.get(), _h, atol=1e-6)
+
+
+class _Chain(pxc.EnergyModule):
+    def __init__(self, n: int):
+        super().__init__()
+        self.vodes = [pxc.Vode((n,)), pxc.Vode((n,))]
+        self.vodes[-1].h.frozen = True
+
+    def __call__(self, x, y):
+        self.vodes[1](self.vodes[0](x))
+        self.vodes[1].set("h", y)
+
+        return self.vodes[1].get("u")
+
+
+def test_infer_early_stopping(batch):
+    x, y = batch
+    # With 'h = x' after the forward initialisation, the energy '0.5 * (h - x)^2 + 0.5 * (y - h)^2' decreases as
+    # 'E_t = C * (1 + (1 - 2 * lr)^(2 * t))', where 'C = (y - x)^2 / 4'. With 'lr = 0.25', the relative decrease
+    # '(E_{t-1} - E_t) / E_{t-1}' is 0.375, 0.15, 0.044, 0.0115, ... for t = 1, 2, 3, 4, ..., so with 'tol = 0.02'
+    # inference stops after the 5th step (the decrease measured after the 4th update is below 'tol').
+    _C = float(((y - x[:, :4]) ** 2 / 4).sum(-1).mean())
+    optim_h = pxu.Optim(optax.sgd(0.25))
+
+    model = _Chain(4)
+    _t, _e = _infer(200, 2e-2, False, False, x[:, :4], y, model=model, optim_h=optim_h)
+    _h = model.vodes[0].h.get()
+
+    assert int(_t) == 5
+    assert float(_e) == pytest.approx(_C * (1 + 0.25**4), rel=1e-5)
+
+    # Same result as running exactly 5 steps.
+    model = _Chain(4)
+    _t_fixed, _e_fixed = _infer(5, -1.0, False, False, x[:, :4], y, model=model, optim_h=optim_h)
+
+    assert int(_t_fixed) == 5
+    assert float(_e_fixed) == pytest.approx(float(_e), rel=1e-6)
+    assert jnp.allclose(model.vodes[0].h.get(), _h, atol=1e-6)
+
+
+def test_infer_per_sample(batch):
+    x, y = batch
+
+    model, _, optim_h = M.build()
+    _t, _e = _infer(5, -1.0, True, False, x, y, model=model, optim_h=optim_h)
+    _h = model.vodes[0].h.get()
+
+    assert _t.shape == _e.shape == (x.shape[0],)
+    assert bool(jnp.all(_t == 5))
+
+    # Without early stopping, the per-sample updates are the same as the batched ones.
+    model, _, optim_h = M.build()
+    _infer(5, -1.0, False, False, x, y, model=model, optim_h=optim_h)
+    assert jnp.allclose(model.vodes[0].h.get(), _h, atol=1e-6)
+
+
+def test_infer_per_sample_step_counts(batch):
+    x, y = batch
+    # Samples that are already at equilibrium (i.e., whose target is the prediction) converge immediately.
+    model, _, optim_h = M.build()
+    with pxu.step(model, pxc.STATUS.INIT, clear_params=pxc.VodeParam.Cache):
+        _u = M.forward(x, None, model=model)
+    _y = y.at[: x.shape[0] // 2].set(_u[: x.shape[0] // 2])
+
+    model, _, optim_h = M.build()
+    _t, _e = _infer(50, 1e-3, True, False, x, _y, model=model, optim_h=optim_h)
+
+    assert bool(jnp.all(_t <= 50))
+    assert int(_t[: x.shape[0] // 2].max()) < int(_t[x.shape[0] // 2 :].min())
+
+
+def test_infer_masked_step_momentum(batch):
+    x, y = batch
+    model, _, _ = M.build()
+    model.train()
+    M.init(model, x, y)
+    optim_h = pxu.Optim(optax.sgd(0.1, momentum=0.9))
+    optim_h.init(pxu.Mask(M.H_FILTER)(model))
+
+    def _grads():
+        with pxu.step(model, clear_params=pxc.VodeParam.Cache):
+            _, g = pxf.value_and_grad(pxu.Mask(M.H_FILTER, [False, True]), has_aux=True)(M.energy)(x, model=model)
+
+        return g["model"]
+
+    # A first (unmasked) step initialises the momentum of all the samples.
+    optim_h.step(model, _grads(), True)
+    _h, _state = model.vodes[0].h.get(), jax.tree_util.tree_leaves(optim_h.state.get())
+
+    active = jnp.arange(x.shape[0]) < x.shape[0] // 2
+    _masked_step(model, optim_h, _grads(), active)
+
+    _n = x.shape[0] // 2
+    assert jnp.array_equal(model.vodes[0].h.get()[_n:], _h[_n:])
+    assert not jnp.allclose(model.vodes[0].h.get()[:_n], _h[:_n])
+    for _new, _old in zip(jax.tree_util.tree_leaves(optim_h.state.get()), _state, strict=True):
+        # The momentum of the inactive samples is not updated.
+        assert jnp.array_equal(_new[_n:], _old[_n:])
+        assert not jnp.allclose(_new[:_n], _old[:_n])
+
+
+def test_infer_local(batch):
+    x, y = batch
+
+    model, _, optim_h = M.build()
+    _t, _e = _infer(5, -1.0, False, False, x, y, model=model, optim_h=optim_h)
+    _h = model.vodes[0].h.get()
+
+    # For se_energy vodes, the local gradients are equal to the full ones.
+    model, _, optim_h = M.build()
+    _t_local, _e_local = _infer(5, -1.0, False, True, x, y, model=model, optim_h=optim_h)
+
+    assert int(_t_local) == int(_t)
+    assert float(_e_local) == pytest.approx(float(_e), rel=1e-5)
+    assert jnp.allclose(model.vodes[0].h.get(), _h, atol=1e-5)
+
+
+def test_infer_local_with_energy(batch):
+    x, y = batch
+    model, _, optim_h = M.build()
+
+    with pytest.raises(ValueError):
+        pxc.infer(model, (x, y), optim_h, 2, energy=lambda x, y, *, model: 0.0, local=True)
@@ -0,0 +1,216 @@
+import os
+import warnings
+
+import jax
+import jax.numpy as jnp
+import pytest
+
+import pcax as px
+import pcax.functional as pxf
+import pcax.predictive_coding as pxc
+import pcax.utils as pxu
+
+import pc_models as M
+
+
+def _infer(x, y, *, model, optim_h):
+    model.train()
+    M.init(model, x, y)
+
+    optim_h.init(pxu.Mask(M.H_FILTER)(model))
+    with pxu.step(model, clear_params=pxc.VodeParam.Cache):
+        (e, _), g = pxf.value_and_grad(pxu.Mask(M.H_FILTER, [False, True]), has_aux=True)(M.energy)(x, model=model)
+    optim_h.step(model, g["model"], True)
+    optim_h.clear()
+
+    return e
+
+
+def test_jit_matches_eager(batch):
+    x, y = batch
+    train_on_batch = pxf.jit(static_argnums=0)(M.train_on_batch)
+
+    model, optim_w, optim_h = M.build()
+    _jitted = [float(train_on_batch(2, x, y, model=model, optim_w=optim_w, optim_h=optim_h)) for _ in range(3)]
+    _w = model.layers[0].nn.weight.get()
+
+    model, optim_w, optim_h = M.build()
+    _eager = [float(M.train_on_batch(2, x, y, model=model, optim_w=optim_w, optim_h=optim_h)) for _ in range(3)]
+
+    assert _jitted == pytest.approx(_eager, rel=1e-5)
+    assert jnp.allclose(_w, model.layers[0].nn.weight.get(), atol=1e-6)
+    assert train_on_batch.n_traces == 1
+    assert len(train_on_batch.plans) == 1
+
+
+def test_jit_donate_tracked(batch):
+    x, y = batch
+    train_on_batch = pxf.jit(static_argnums=0, donate_tracked=True)(M.train_on_batch)
+
+    model, optim_w, optim_h = M.build()
+    _w = model.layers[0].nn.weight.get()
+    _e = [float(train_on_batch(2, x, y, model=model, optim_w=optim_w, optim_h=optim_h)) for _ in range(2)]
+
+    model, optim_w, optim_h = M.build()
+    _ref = pxf.jit(static_argnums=0)(M.train_on_batch)
+    assert _e == pytest.approx([float(_ref(2, x, y, model=model, optim_w=optim_w, optim_h=optim_h)) for _ in range(2)])
+
+    # CPU may ignore donation, in which case the old buffer is still valid.
+    if jax.devices()[0].platform != "cpu":
+        assert _w.is_deleted()
+
+
+def test_jit_donate_tracked_with_donate_argnames():
+    with pytest.raises(ValueError):
+        pxf.jit(donate_tracked=True, donate_argnames=("model",))(M.train_on_batch)
+
+
+def test_jit_single_trace_across_equivalent_models(batch):
+    x, y = batch
+    infer = pxf.jit()(_infer)
+    _, _, optim_h = M.build()
+
+    for _seed in range(3):
+        model, _, _ = M.build(_seed)
+        infer(x, y, model=model, optim_h=optim_h)
+
+    assert infer.n_traces == 1
+    assert infer.retraces == []
+
+
+def test_jit_plans_lru(monkeypatch):
+    monkeypatch.setattr(pxf.Jit, "_MAX_PLANS", 2)
+    f = pxf.jit()(lambda *, p: p.get() + 1)
+    _params = [px.Param(jnp.zeros((2,))) for _ in range(3)]
+
+    f(p=_params[0])
+    f(p=_params[1])
+    f(p=_params[0])  # '_params[0]' is now the most recently used plan
+    f(p=_params[2])
+
+    _plans = {id(_p) for _plan in f.plans.values() for _p in _plan.params}
+    assert len(f.plans) == 2
+    assert id(_params[0]) in _plans and id(_params[2]) in _plans and id(_params[1]) not in _plans
+
+
+def test_jit_replaced_param():
+    def _update(*, model):
+        model.w.set(model.w.get() + 1.0)
+        model.w = px.Param(model.w.get() + 1.0)
+
+    model = px.Module()
+    model.w = _w = px.Param(jnp.zeros((2,)))
+
+    # Only in-place updates are written back, on both the planned and unplanned paths.
+    pxf.jit()(_update)(model=model)
+    assert model.w is _w and jnp.allclose(_w.get(), 1.0)
+
+    pxf.jit(donate_argnames=())(_update)(model=model)
+    assert model.w is _w and jnp.allclose(_w.get(), 2.0)
+
+
+def test_jit_explains_retrace(batch):
+    x, y = batch
+    infer = pxf.jit(explain_retrace=True)(_infer)
+    model, _, optim_h = M.build()
+
+    infer(x, y, model=model, optim_h=optim_h)
+    infer(x, y, model=model, optim_h=optim_h)
+    assert infer.n_traces == 1
+
+    model.clear_params(pxc.VodeParam)
+    with pytest.warns(UserWarning, match="retraced"):
+        infer(x[:8], y[:8], model=model, optim_h=optim_h)
+
+    assert infer.n_traces == 2
+    assert len(infer.retraces) == 1
+    assert "float32[16,8]) -> ShapedArray(float32[8,8])" in infer.retraces[0]
+
+
+def test_jit_compile(batch):
+    x, y = batch
+    train_on_batch = pxf.jit(static_argnums=0)(M.train_on_batch)
+    model, optim_w, optim_h = M.build()
+
+    train_step = train_on_batch.compile(2, x, y, model=model, optim_w=optim_w, optim_h=optim_h)
+    _e = [float(train_step(2, x, y, model=model, optim_w=optim_w, optim_h=optim_h)) for _ in range(2)]
+
+    model, optim_w, optim_h = M.build()
+    assert _e == pytest.approx(
+        [float(train_on_batch(2, x, y, model=model, optim_w=optim_w, optim_h=optim_h)) for _ in range(2)]
+    )
+
+    with pytest.raises(ValueError):
+        train_step(3, x, y, model=model, optim_w=optim_w, optim_h=optim_h)
+
+
+def test_jit_cache_dir_hit_after_warm_up(batch, tmp_path, monkeypatch):
+    x, y = batch
+    model, optim_w, optim_h = M.build()
+
+    train_on_batch = pxf.jit(static_argnums=0, cache_dir=str(tmp_path))(M.train_on_batch)
+    train_on_batch.compile(2, x, y, model=model, optim_w=optim_w, optim_h=optim_h)
+    train_on_batch(2, x, y, model=model, optim_w=optim_w, optim_h=optim_h)
+    assert len(os.listdir(tmp_path)) == 1
+
+    # After a call, the (memoized) state of the inputs must not change the key: the executable is loaded from disk.
+    def _compile(*args, **kwargs):
+        raise AssertionError("The executable was not loaded from the cache.")
+
+    monkeypatch.setattr(jax.stages.Lowered, "compile", _compile)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", UserWarning)
+        train_step = pxf.jit(static_argnums=0, cache_dir=str(tmp_path))(M.train_on_batch).compile(
+            2, x, y, model=model, optim_w=optim_w, optim_h=optim_h
+        )
+    assert len(os.listdir(tmp_path)) == 1
+
+    _e = float(train_step(2, x, y, model=model, optim_w=optim_w, optim_h=optim_h))
+    assert jnp.isfinite(_e)
+
+
+SCALE = 1.0
+
+
+def _scaled(x, *, model):
+    return M.forward(x, None, model=model).sum() * SCALE
+
+
+def test_jit_cache_dir_miss_on_changed_program(batch, tmp_path, monkeypatch):
+    x, _ = batch
+    model, _, _ = M.build()
+    # The forward fills the vodes cache, so the inputs have the same structure from the first compilation onwards.
+    M.init(model, x)
+    _scaled(x, model=model)
+
+    def _compile(fn):
+        return pxf.jit(cache_dir=str(tmp_path))(fn).compile(x, model=model)
+
+    _e = float(_compile(_scaled)(x, model=model))
+    assert len(os.listdir(tmp_path)) == 1
+
+    # A hit for the same program.
+    assert float(_compile(_scaled)(x, model=model)) == _e
+    assert len(os.listdir(tmp_path)) == 1
+
+    # Changing a global value, a constant or the state of a bound method changes the program.
+    monkeypatch.setitem(globals(), "SCALE", 100.0)
+    assert float(_compile(_scaled)(x, model=model)) == pytest.approx(100.0 * _e)
+    assert len(os.listdir(tmp_path)) == 2
+
+    _c2 = float(_compile(lambda x, *, model: M.forward(x, None, model=model).sum() * 2)(x, model=model))
+    _c3 = float(_compile(lambda x, *, model: M.forward(x, None, model=model).sum() * 3)(x, model=model))
+    assert _c3 == pytest.approx(1.5 * _c2)
+    assert len(os.listdir(tmp_path)) == 4
+
+    class _Scaled:
+        def __init__(self, scale):
+            self.scale = scale
+
+        def __call__(self, x, *, model):
+            return M.forward(x, None, model=model).sum() * self.scale
+
+    assert float(_compile(_Scaled(4.0).__call__)(x, model=model)) == pytest.approx(4.0 / 3.0 * _c3)
+    assert float(_compile(_Scaled(5.0).__call__)(x, model=model)) == pytest.approx(5.0 / 3.0 * _c3)
+    assert len(os.listdir(tmp_path)) == 6
@@ -0,0 +1,98 @@
+import jax
+import jax.numpy as jnp
+import pytest
+
+import pcax as px
+import pcax.functional as pxf
+import pcax.nn as pxnn
+import pcax.predictive_coding as pxc
+import pcax.utils as pxu
+
+import pc_models as M
+
+
+class _ConvModel(pxc.EnergyModule):
+    def __init__(self, lazy: bool):
+        super().__init__()
+        self.conv = pxnn.Conv2d(None if lazy else 3, 4, 3)
+        self.linear = pxnn.Linear(None if lazy else 4 * 6 * 6, 10)
+        self.vodes = [pxc.Vode() if lazy else pxc.Vode((4, 6, 6)), pxc.Vode() if lazy else pxc.Vode((10,))]
+
+    def __call__(self, x):
+        x = self.vodes[0](jax.nn.relu(self.conv(x)))
+
+        return self.vodes[1](self.linear(x.reshape(-1)))
+
+
+@pxf.vmap(pxu.Mask(M.VODES, (None, 0)), in_axes=(0,), out_axes=0)
+def _forward(x, *, model):
+    return model(x)
+
+
+def _init_fn(x, *, model):
+    with pxu.step(model, pxc.STATUS.INIT, clear_params=pxc.VodeParam.Cache):
+        return _forward(x, model=model)
+
+
+def _weights(model):
+    return jax.tree_util.tree_leaves(pxu.Mask(pxnn.LayerParam)(model))
+
+
+def test_lazy_init():
+    x = jnp.ones((2, 3, 8, 8))
+
+    px.RKG.seed(0)
+    model = _ConvModel(lazy=True)
+    assert model.conv.is_lazy and model.linear.is_lazy and model.vodes[0].is_lazy
+    assert _weights(model) == []
+
+    _out = px.init(_init_fn, jax.ShapeDtypeStruct(x.shape, x.dtype), model=model)
+    assert _out == jax.ShapeDtypeStruct((2, 10), jnp.float32)
+    assert not any(_m.is_lazy for _m in (model.conv, model.linear, *model.vodes))
+    assert model.vodes[0].shape.get() == (4, 6, 6)
+    assert model.vodes[1].shape.get() == (10,)
+
+    # Same shapes and values as the eager model built with the same seed.
+    px.RKG.seed(0)
+    eager = _ConvModel(lazy=False)
+    for _a, _b in zip(_weights(model), _weights(eager), strict=True):
+        assert _a.shape == _b.shape and _a.dtype == _b.dtype
+        assert jnp.array_equal(_a, _b)
+
+    assert jnp.allclose(_init_fn(x, model=model), _init_fn(x, model=eager))
+
+
+def test_lazy_linear_matches_eager():
+    px.RKG.seed(1)
+    lazy = pxnn.Linear(None, 5)
+    px.init(lambda x, *, layer: layer(x), jax.ShapeDtypeStruct((7,), jnp.float32), layer=lazy)
+
+    px.RKG.seed(1)
+    eager = pxnn.Linear(7, 5)
+
+    assert lazy.nn.weight.get().shape == (5, 7)
+    assert jnp.array_equal(lazy.nn.weight.get(), eager.nn.weight.get())
+    assert jnp.array_equal(lazy.nn.bias.get(), eager.nn.bias.get())
+
+
+def test_lazy_init_leaves_params_unchanged():
+    x = jnp.ones((2, 3, 8, 8))
+    px.RKG.seed(0)
+    model = _ConvModel(lazy=True)
+
+    px.init(_init_fn, x, model=model)
+
+    # The vodes values set during the trace are discarded.
+    assert model.vodes[0].h.get() is None
+    assert not isinstance(px.RKG.key.get(), jax.core.Tracer)
+
+
+def test_lazy_module_not_called():
+    model = _ConvModel(lazy=True)
+
+    with pytest.raises(ValueError):
+        px.init(lambda x, *, model: model.conv(x), jnp.ones((3, 8, 8)), model=model)
+
+    # A lazy module cannot be used before being initialised.
+    with pytest.raises(ValueError):
+        model.linear(jnp.ones((10,)))
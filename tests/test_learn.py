@@ -0,0 +1,67 @@
+import re
+
+import jax
+import pytest
+
+import pcax.functional as pxf
+import pcax.predictive_coding as pxc
+
+import pc_models as M
+
+
+@pxf.jit()
+def _grads(x, y, *, model, optim_h):
+    model.train()
+    pxc.infer(model, (x, y), optim_h, 3, -1.0)
+
+    _e, _g = M.weight_grads(x, model)
+    _e_local, _g_local = pxc.local_weight_grads(model, (x, None))
+
+    return _e, _g, _e_local, _g_local
+
+
+def test_local_weight_grads_match_full_grads(batch):
+    x, y = batch
+    model, _, optim_h = M.build()
+
+    _e, _g, _e_local, _g_local = _grads(x, y, model=model, optim_h=optim_h)
+
+    assert float(_e_local) == pytest.approx(float(_e), rel=1e-5)
+    assert jax.tree_util.tree_structure(_g_local) == jax.tree_util.tree_structure(_g)
+    _leaves = jax.tree_util.tree_leaves(_g)
+    _leaves_local = jax.tree_util.tree_leaves(_g_local)
+    assert len(_leaves) == len(_leaves_local) == 4
+    for _a, _b in zip(_leaves, _leaves_local):
+        assert _a.shape == _b.shape
+        assert jax.numpy.allclose(_a, _b, atol=1e-6)
+
+
+def test_local_weight_grads_has_no_model_backward(batch):
+    x, _ = batch
+    model, _, _ = M.build()
+    M.init(model, x)
+
+    _hlo = pxf.jit()(lambda x, *, model: pxc.local_weight_grads(model, (x, None))).lower(x, model=model).compile()
+
+    # Each layer is applied once in the forward pass and differentiated once with respect to its weights: the errors
+    # are not backpropagated through the layers to their inputs.
+    assert len(re.findall(r" dot\(", _hlo.as_text())) == 2 * len(model.layers)
+
+
+def test_local_weight_grads_training(batch):
+    x, y = batch
+
+    @pxf.jit()
+    def train_on_batch(x, y, *, model, optim_w, optim_h):
+        model.train()
+        pxc.infer(model, (x, y), optim_h, 3, -1.0)
+
+        _e, _g = pxc.local_weight_grads(model, (x, None))
+        optim_w.step(model, _g)
+
+        return _e
+
+    model, optim_w, optim_h = M.build()
+    _e = [float(train_on_batch(x, y, model=model, optim_w=optim_w, optim_h=optim_h)) for _ in range(5)]
+
+    assert _e[-1] < _e[0]
@@ -0,0 +1,59 @@
+import optax
+
+import pcax.nn as pxnn
+import pcax.predictive_coding as pxc
+import pcax.utils as pxu
+from pcax.utils._memory import _nbytes
+
+import pc_models as M
+
+
+def _bytes(model, filter):
+    return _nbytes(pxu.Mask(filter)(model))
+
+
+def test_memory_report(batch):
+    x, _ = batch
+    model, optim_w, _ = M.build()
+    M.init(model, x)
+
+    _report = pxu.memory_report(model, optim_w)
+
+    assert _report.params["LayerParam"] == _bytes(model, pxnn.LayerParam) == 4 * (8 * 16 + 16 + 16 * 4 + 4)
+    assert _report.params["VodeParam"] == _bytes(model, pxc.VodeParam) == 4 * x.shape[0] * (16 + 4)
+    # The caches are cleared after the forward pass.
+    assert _report.params["VodeParam.Cache"] == 0
+    assert _report.modules[".layers[0]"] == 4 * (8 * 16 + 16)
+    assert _report.modules[".vodes[1]"] == 4 * x.shape[0] * 4
+    # Adam stores two moments per weight (and a step count).
+    assert _report.optims[0] == 2 * _report.params["LayerParam"] + 4
+    assert _report.total == sum(_report.params.values()) + _report.optims[0]
+
+
+def test_memory_report_batch_size(batch):
+    x, _ = batch
+    model, _, _ = M.build()
+    M.init(model, x)
+    optim_h = pxu.Optim(optax.sgd(0.1, momentum=0.9))
+    optim_h.init(pxu.Mask(M.H_FILTER)(model))
+
+    _report = pxu.memory_report(model, optim_h)
+    _rescaled = pxu.memory_report(model, optim_h, batch_size=4 * x.shape[0])
+
+    assert _rescaled.params["LayerParam"] == _report.params["LayerParam"]
+    assert _rescaled.params["VodeParam"] == 4 * _report.params["VodeParam"]
+    # The momentum of the (non frozen) vode values is rescaled as well.
+    assert _report.optims[0] == 4 * x.shape[0] * 16
+    assert _rescaled.optims[0] == 4 * _report.optims[0]
+    # Initialised vodes with a cleared cache are not estimated from their shape.
+    assert _rescaled.params["VodeParam.Cache"] == 0
+
+
+def test_memory_report_uninitialised():
+    model = M.Model()
+
+    _report = pxu.memory_report(model, batch_size=8)
+
+    # The value 'h' and the activation 'u' of each vode, in float32.
+    assert _report.params["VodeParam"] == _report.params["VodeParam.Cache"] == 4 * 8 * (16 + 4)
+    assert pxu.memory_report(model).params["VodeParam"] == 0
@@ -0,0 +1,91 @@
+import jax.numpy as jnp
+
+import pcax as px
+import pcax.nn as pxnn
+import pcax.predictive_coding as pxc
+from pcax.core._module import _ModuleIndex
+
+
+class _Container(px.Module):
+    def __init__(self):
+        super().__init__()
+        self.layers = [pxnn.Linear(2, 2)]
+        self.named = {"a": pxnn.Linear(2, 2)}
+
+
+def _layers(model):
+    return _ModuleIndex.of(model).select(pxnn.Linear, params=False)
+
+
+def test_module_index_is_reused():
+    model = _Container()
+    _index = _ModuleIndex.of(model)
+
+    assert _ModuleIndex.of(model) is _index
+    assert _layers(model) == (model.layers[0], model.named["a"])
+
+
+def test_module_index_attribute_set():
+    model = _Container()
+    _index = _ModuleIndex.of(model)
+
+    model.extra = pxnn.Linear(2, 2)
+    assert _ModuleIndex.of(model) is not _index
+    assert model.extra in _layers(model)
+
+    # Setting an attribute of a submodule invalidates the index as well.
+    _index = _ModuleIndex.of(model)
+    model.layers[0].nn = None
+    assert _ModuleIndex.of(model) is not _index
+
+
+def test_module_index_list_in_place():
+    model = _Container()
+    _layers(model)
+
+    model.layers.append(pxnn.Linear(2, 2))
+    assert _layers(model) == (*model.layers, model.named["a"])
+
+    model.layers[0] = pxnn.Linear(2, 2)
+    assert _layers(model) == (*model.layers, model.named["a"])
+
+    del model.layers[0]
+    assert _layers(model) == (*model.layers, model.named["a"])
+
+
+def test_module_index_dict_in_place():
+    model = _Container()
+    _layers(model)
+
+    model.named.update(b=pxnn.Linear(2, 2))
+    assert _layers(model) == (model.layers[0], model.named["a"], model.named["b"])
+
+    model.named["a"] = pxnn.Linear(2, 2)
+    assert _layers(model) == (model.layers[0], model.named["a"], model.named["b"])
+
+    # Renaming a key changes the pytree structure, but not the modules.
+    model.named = {"c": model.named["a"]}
+    _index = _ModuleIndex.of(model)
+    model.named["d"] = model.named.pop("c")
+    assert _ModuleIndex.of(model) is not _index
+
+
+def test_module_index_nested_containers():
+    model = _Container()
+    model.layers = [[pxnn.Linear(2, 2)]]
+    _layers(model)
+
+    model.layers[0].append(pxnn.Linear(2, 2))
+    assert _layers(model) == (*model.layers[0], model.named["a"])
+
+
+def test_clear_params_after_append():
+    model = pxc.EnergyModule()
+    model.vodes = [pxc.Vode((2,))]
+    model.clear_params(pxc.VodeParam)
+
+    model.vodes.append(pxc.Vode((2,)))
+    model.vodes[-1].h.set(jnp.ones((2,)))
+    model.clear_params(pxc.VodeParam)
+
+    assert model.vodes[-1].h.get() is None
@@ -0,0 +1,144 @@
+import jax
+import jax.numpy as jnp
+import pytest
+from jax.sharding import Mesh, PartitionSpec as P
+
+import pcax as px
+import pcax.functional as pxf
+import pcax.predictive_coding as pxc
+import pcax.utils as pxu
+
+import pc_models as M
+
+
+N_DEVICES = 4
+
+pytestmark = pytest.mark.skipif(jax.device_count() < N_DEVICES, reason=f"requires {N_DEVICES} devices")
+
+
+def _train_on_batch(axis_name):
+    def train_on_batch(T, x, y, *, model, optim_w, optim_h):
+        model.train()
+        M.init(model, x, y)
+
+        optim_h.init(pxu.Mask(M.H_FILTER)(model))
+        for _ in range(T):
+            with pxu.step(model, clear_params=pxc.VodeParam.Cache):
+                (e, _), g = pxf.value_and_grad(pxu.Mask(M.H_FILTER, [False, True]), has_aux=True)(M.energy)(
+                    x, model=model
+                )
+            optim_h.step(model, g["model"], True)
+        optim_h.clear()
+
+        e, g = M.weight_grads(x, model)
+        optim_w.step(model, jax.lax.pmean(g, axis_name))
+
+        return jax.lax.pmean(e, axis_name)
+
+    return train_on_batch
+
+
+def _reference(x, y, n):
+    model, optim_w, optim_h = M.build()
+    train_on_batch = pxf.jit(static_argnums=0)(M.train_on_batch)
+
+    return [float(train_on_batch(2, x, y, model=model, optim_w=optim_w, optim_h=optim_h)) for _ in range(n)], model
+
+
+def test_pmap_matches_single_device(batch):
+    x, y = batch
+    _ref, _ref_model = _reference(x, y, 2)
+
+    train_on_batch = pxf.pmap(
+        pxu.Mask(M.VODES, (None, 0)),
+        in_axes=(None, 0, 0),
+        out_axes=None,
+        axis_name="device",
+        static_broadcasted_argnums=0,
+    )(_train_on_batch("device"))
+
+    model, optim_w, optim_h = M.build()
+    # The vodes are re-initialised with a leading device axis.
+    model.clear_params(M.VODES)
+    _x, _y = x.reshape(N_DEVICES, -1, 8), y.reshape(N_DEVICES, -1, 4)
+    _e = [float(train_on_batch(2, _x, _y, model=model, optim_w=optim_w, optim_h=optim_h)) for _ in range(2)]
+
+    assert _e == pytest.approx(_ref, rel=1e-5)
+    assert model.vodes[0].h.shape == (N_DEVICES, x.shape[0] // N_DEVICES, 16)
+    assert jnp.allclose(model.layers[0].nn.weight.get(), _ref_model.layers[0].nn.weight.get(), atol=1e-5)
+
+
+def test_pmap_mask_cached(monkeypatch):
+    _calls = []
+    _process_mask = pxf._BaseTransform._process_mask
+    monkeypatch.setattr(
+        pxf._BaseTransform,
+        "_process_mask",
+        staticmethod(lambda *args: _calls.append(args) or _process_mask(*args)),
+    )
+
+    @pxf.pmap(pxu.Mask(px.Param, (None, 0)), in_axes=(), out_axes=None, axis_name="device")
+    def f(*, model):
+        model["h"].set(model["h"].get() + jax.random.normal(px.RKG(), ()))
+
+        return jax.lax.psum(1, "device")
+
+    model = {"h": px.Param(jnp.zeros((N_DEVICES, 2)))}
+    _h = []
+    for _ in range(3):
+        assert f(model=model) == N_DEVICES
+        _h.append(model["h"].get())
+
+    assert len(_calls) == 1
+    # The shared cached mask is not modified by the RKG handling.
+    assert all(_m.get("__RKG", None) != 0 for _m in pxf._BaseTransform._masks_cache.values() if isinstance(_m, dict))
+    # Each device receives a different key, and a new one on each call.
+    assert len({float(_v) for _v in _h[0][:, 0]}) == N_DEVICES
+    assert len({float(_v[0, 0]) for _v in _h}) == 3
+
+
+def test_shard_map_matches_single_device(batch):
+    x, y = batch
+    _ref, _ref_model = _reference(x, y, 2)
+
+    mesh = Mesh(jax.devices()[:N_DEVICES], ("batch",))
+    train_on_batch = pxf.jit(static_argnums=0)(
+        pxf.shard_map(
+            pxu.Mask(M.VODES, (None, P("batch"))),
+            mesh=mesh,
+            in_specs=(None, P("batch"), P("batch")),
+            out_specs=P(),
+            check_rep=False,
+            static_argnums=0,
+        )(_train_on_batch("batch"))
+    )
+
+    model, optim_w, optim_h = M.build()
+    _e = [float(train_on_batch(2, x, y, model=model, optim_w=optim_w, optim_h=optim_h)) for _ in range(2)]
+
+    assert _e == pytest.approx(_ref, rel=1e-5)
+    assert model.vodes[0].h.shape == (x.shape[0], 16)
+    assert len(model.vodes[0].h.get().sharding.device_set) == N_DEVICES
+    assert model.layers[0].nn.weight.get().sharding.is_fully_replicated
+    assert jnp.allclose(model.layers[0].nn.weight.get(), _ref_model.layers[0].nn.weight.get(), atol=1e-5)
+
+
+def test_shard_map_rkg():
+    mesh = Mesh(jax.devices()[:N_DEVICES], ("batch",))
+
+    @pxf.shard_map(mesh=mesh, in_specs=(P("batch"),), out_specs=P("batch"))
+    def noise(x):
+        return x + jax.random.normal(px.RKG(), x.shape)
+
+    @pxf.shard_map(mesh=mesh, in_specs=(P("batch"),), out_specs=P("batch"))
+    def no_noise(x):
+        return x + 1
+
+    px.RKG.seed(0)
+    _key = px.RKG.key.get()
+    no_noise(jnp.zeros((N_DEVICES,)))
+    assert (px.RKG.key.get() == _key).all()
+
+    _r = noise(jnp.zeros((N_DEVICES,)))
+    assert len(set(_r.tolist())) == N_DEVICES
+    assert (px.RKG.key.get() != _key).any()
@@ -0,0 +1,87 @@
+import jax.numpy as jnp
+import jax.tree_util as jtu
+import pytest
+
+import pcax as px
+import pcax.functional as pxf
+import pcax.nn as pxnn
+import pcax.predictive_coding as pxc
+from pcax.core._random import RKGState
+
+import pc_models as M
+
+
+def _frozen(param):
+    param.frozen = True
+
+    return param
+
+
+def _fixed_cache():
+    cache = pxc.VodeParam.FixedCache(("u",), ("E",), ndim=1)
+    cache["u"] = jnp.ones((2, 3))
+
+    return cache
+
+
+def _flat_view():
+    param = pxnn.LayerParam(jnp.arange(3.0))
+    px.FlatStore([param, pxnn.LayerParam(jnp.ones((2,)))])
+
+    return param
+
+
+PARAMS = {
+    "Param": lambda: px.Param(jnp.arange(3.0)),
+    "Param(None)": lambda: px.Param(),
+    "LayerParam": lambda: pxnn.LayerParam(jnp.ones((2, 2))),
+    "LayerState": lambda: pxnn.LayerState(jnp.zeros((2,))),
+    "VodeParam": lambda: _frozen(pxc.VodeParam(jnp.ones((4, 3)))),
+    "VodeParam.Cache": lambda: pxc.VodeParam.Cache({"u": jnp.ones((4, 3))}),
+    "VodeParam.FixedCache": _fixed_cache,
+    "ParamDict": lambda: px.ParamDict({"a": jnp.ones((1,)), "b": None}),
+    "RKGState": lambda: RKGState(0),
+    "StaticParam": lambda: px.static({"a": 1}),
+    "FlatLayerParam": _flat_view,
+}
+
+
+@pytest.mark.parametrize("make", PARAMS.values(), ids=PARAMS.keys())
+def test_param_flatten_round_trip(make):
+    param = make()
+    _leaves, _structure = jtu.tree_flatten(param)
+
+    _param = jtu.tree_unflatten(_structure, _leaves)
+    # FlatStore views are unflattened as their original class.
+    _cls = getattr(type(param), "_view_of", type(param))
+    assert type(_param) is _cls
+    if _cls is type(param):
+        assert jtu.tree_structure(_param) == _structure
+    else:
+        assert jtu.tree_structure(_param) == jtu.tree_structure(_cls(jnp.zeros(())))
+    assert all(jnp.array_equal(_a, _b) for _a, _b in zip(jtu.tree_leaves(_param), _leaves, strict=True))
+    # Flattening with keys gives the same leaves.
+    _paths = jtu.tree_flatten_with_path(_param)[0]
+    assert [_p for _p, _ in _paths] == [_p for _p, _ in jtu.tree_flatten_with_path(param)[0]]
+    assert all(jnp.array_equal(_a, _b) for (_, _a), _b in zip(_paths, _leaves, strict=True))
+
+    # The static attributes are preserved.
+    for _name in ("frozen", "slots", "scalars", "ndim"):
+        assert getattr(_param, _name, None) == getattr(param, _name, None)
+
+    # A second flatten of a fresh, equal parameter gives the same structure.
+    assert jtu.tree_structure(make()) == _structure
+
+
+def test_model_treedef_and_trace_are_shared(batch):
+    x, _ = batch
+
+    _models = [M.build()[0] for _ in range(2)]
+    assert jtu.tree_structure(_models[0]) == jtu.tree_structure(_models[1])
+
+    forward = pxf.jit()(M.forward)
+    _y = [forward(x, None, model=_m) for _m in _models]
+
+    assert forward.n_traces == 1
+    assert jnp.allclose(_y[0], _y[1])
+    assert jtu.tree_structure(_models[0]) == jtu.tree_structure(_models[1])
@@ -0,0 +1,78 @@
+import jax
+import jax.numpy as jnp
+import optax
+import pytest
+
+import pcax as px
+import pcax.functional as pxf
+import pcax.nn as pxnn
+import pcax.predictive_coding as pxc
+import pcax.utils as pxu
+
+import pc_models as M
+
+
+def _build(policy):
+    px.RKG.seed(0)
+    model = M.Model()
+    policy.apply(model)
+    M.init(model, jnp.zeros((16, 8)))
+
+    return model
+
+
+def test_precision_training(batch):
+    x, y = batch
+    policy = px.Precision(jnp.bfloat16, jnp.bfloat16, energy_scale=128.0)
+    model = _build(policy)
+
+    optim_h = pxu.Optim(optax.sgd(0.1), precision=policy)
+    optim_w = pxu.Optim(optax.adam(1e-2), pxu.Mask(pxnn.LayerParam)(model), precision=policy)
+    train_on_batch = pxf.jit(static_argnums=0)(M.train_on_batch)
+
+    _e = [float(train_on_batch(2, x, y, model=model, optim_w=optim_w, optim_h=optim_h)) / 128 for _ in range(5)]
+
+    assert _e[-1] < _e[0]
+    assert model.layers[0].nn.weight.dtype == jnp.bfloat16
+    assert all(_m.dtype == jnp.float32 for _m in jax.tree_util.tree_leaves(optim_w.master.get()))
+
+
+def test_precision_master_resync(batch):
+    x, y = batch
+    policy = px.Precision(jnp.bfloat16, jnp.bfloat16, energy_scale=128.0)
+    model = _build(policy)
+
+    # 'optim_h' is initialised only once: the INIT pass below rewrites the vode values after it, so the master weights
+    # must be refreshed from them rather than overwrite them.
+    optim_h = pxu.Optim(optax.sgd(0.1), pxu.Mask(M.H_FILTER)(model), precision=policy)
+
+    @pxf.jit()
+    def infer(x, y, *, model, optim_h):
+        M.init(model, x, y)
+        _es = []
+        for _ in range(5):
+            with pxu.step(model, clear_params=pxc.VodeParam.Cache):
+                (e, _), g = pxf.value_and_grad(pxu.Mask(M.H_FILTER, [False, True]), has_aux=True)(M.energy)(
+                    x, model=model
+                )
+            optim_h.step(model, g["model"], True)
+            _es.append(e)
+
+        return jnp.stack(_es)
+
+    _es = infer(x, y, model=model, optim_h=optim_h)
+
+    assert bool(jnp.all(jnp.diff(_es) < 0))
+
+
+def test_infer_requires_matching_precision(batch):
+    x, y = batch
+    policy = px.Precision(jnp.bfloat16, jnp.bfloat16, energy_scale=128.0)
+    model = _build(policy)
+
+    with pytest.raises(ValueError, match="energy_scale|Precision"):
+        pxc.infer(model, (x, y), pxu.Optim(optax.sgd(0.1)), T_max=2)
+
+    _t, _e = pxc.infer(model, (x, y), pxu.Optim(optax.sgd(0.1), precision=policy), T_max=2)
+    assert int(_t) == 2
+    assert jnp.isfinite(_e)
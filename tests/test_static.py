@@ -0,0 +1,80 @@
+import jax.numpy as jnp
+import jax.tree_util as jtu
+
+import pcax as px
+import pcax.functional as pxf
+from pcax.core import _static
+
+
+def _aux(value):
+    return jtu.tree_structure(px.static(value))
+
+
+def test_static_interning():
+    # Equal values are interned to the same aux data, regardless of the order of dict items.
+    assert _aux({"a": 1, "b": [2.0, 3.0]}) == _aux({"b": [2.0, 3.0], "a": 1})
+    assert _static.StaticParam._aux_data(px.static({"a": 1, "b": 2})) is _static.StaticParam._aux_data(
+        px.static({"b": 2, "a": 1})
+    )
+    assert _aux(0.5) == _aux(1 / 2)
+    assert _aux(0.0) == _aux(-0.0)
+
+    # Equal values of different types are not.
+    assert _aux(1) != _aux(1.0)
+    assert _aux(True) != _aux(1)
+    assert _aux([1, 2]) != _aux((1, 2))
+    assert _aux({"a": 1}) != _aux({"a": 2})
+
+
+def test_static_aux_eq_consistent_with_hash(monkeypatch):
+    monkeypatch.setattr(_static, "_interned", {})
+    monkeypatch.setattr(_static, "_MAX_INTERNED", 1)
+
+    _a = px.static({"a": 1, "b": 2.0})
+    _a_aux = _static.StaticParam._aux_data(_a)
+    _static._intern((("x", 0),))  # evicts '_a_aux'
+
+    _b = px.static({"b": 2.0, "a": 1})
+    _b_aux = _static.StaticParam._aux_data(_b)
+
+    # The evicted aux data is not shared, but it is still equal (with the same hash) to the new one.
+    assert _a_aux is not _b_aux
+    assert _a_aux == _b_aux and hash(_a_aux) == hash(_b_aux)
+    assert jtu.tree_structure(_a) == jtu.tree_structure(_b)
+
+
+def test_static_aux_not_interned():
+    # Values that can only be compared by value, but are not hashable, are not interned.
+    class _Unhashable:
+        __hash__ = None
+
+        def __eq__(self, other):
+            return isinstance(other, _Unhashable)
+
+    _a, _b = px.static(_Unhashable()), px.static(_Unhashable())
+    assert _static.StaticParam._aux_data(_a) == _static.StaticParam._aux_data(_b)
+    assert _static.StaticParam._aux_data(_a) is not _static.StaticParam._aux_data(_b)
+
+
+class _Scale(px.Module):
+    def __init__(self, config):
+        super().__init__()
+        self.config = px.static(config)
+        self.w = px.Param(jnp.ones((3,)))
+
+    def __call__(self):
+        return self.w.get() * self.config.get()["scale"]
+
+
+def test_static_jit_cache_hit():
+    @pxf.jit()
+    def f(*, model):
+        return model()
+
+    _config = {"scale": 2.0, "name": "a"}
+    f(model=_Scale(_config))
+    f(model=_Scale({"name": "a", "scale": 4.0 / 2.0}))
+    assert f.n_traces == 1
+
+    f(model=_Scale({"name": "a", "scale": 3.0}))
+    assert f.n_traces == 2
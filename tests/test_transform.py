@@ -0,0 +1,164 @@
+import jax
+import jax.numpy as jnp
+import pytest
+
+import pcax as px
+import pcax.functional as pxf
+import pcax.predictive_coding as pxc
+import pcax.utils as pxu
+from pcax.functional._transform import _BaseTransform
+
+import pc_models as M
+
+
+def _energy(x, *, model):
+    return M.energy(x, model=model)[0]
+
+
+def test_remat_grads(batch):
+    x, _ = batch
+    model, _, _ = M.build()
+    M.init(model, x)
+
+    with pxu.step(model, clear_params=pxc.VodeParam.Cache):
+        _e, _g = pxf.value_and_grad(pxu.Mask(M.H_FILTER, [False, True]))(_energy)(x, model=model)
+    with pxu.step(model, clear_params=pxc.VodeParam.Cache):
+        _e_remat, _g_remat = pxf.value_and_grad(pxu.Mask(M.H_FILTER, [False, True]))(pxf.remat()(_energy))(
+            x, model=model
+        )
+
+    assert float(_e_remat) == pytest.approx(float(_e))
+    for _a, _b in zip(jax.tree_util.tree_leaves(_g), jax.tree_util.tree_leaves(_g_remat)):
+        assert jnp.allclose(_a, _b)
+
+
+def test_fori_loop(batch):
+    x, y = batch
+
+    def _step(i, x, *, model, optim_h):
+        with pxu.step(model, clear_params=pxc.VodeParam.Cache):
+            _, g = pxf.value_and_grad(pxu.Mask(M.H_FILTER, [False, True]))(_energy)(x, model=model)
+        optim_h.step(model, g["model"], True)
+
+        return (x,)
+
+    @pxf.jit()
+    def infer(T, x, y, *, model, optim_h):
+        M.init(model, x, y)
+        optim_h.init(pxu.Mask(M.H_FILTER)(model))
+        pxf.fori_loop(_step)(0, T, x, model=model, optim_h=optim_h)
+        optim_h.clear()
+
+    _h = []
+    model, _, optim_h = M.build()
+    for _T in (2, 4):
+        infer(_T, x, y, model=model, optim_h=optim_h)
+        _h.append(model.vodes[0].h.get())
+
+    # The number of iterations is dynamic.
+    assert infer.n_traces == 1
+
+    model, _, optim_h = M.build()
+    pxf.jit(static_argnums=0)(_manual)(4, x, y, model=model, optim_h=optim_h)
+    assert jnp.allclose(_h[1], model.vodes[0].h.get(), atol=1e-6)
+    assert not jnp.allclose(_h[0], _h[1])
+
+
+def _manual(T, x, y, *, model, optim_h):
+    M.init(model, x, y)
+    optim_h.init(pxu.Mask(M.H_FILTER)(model))
+    for _ in range(T):
+        with pxu.step(model, clear_params=pxc.VodeParam.Cache):
+            _, g = pxf.value_and_grad(pxu.Mask(M.H_FILTER, [False, True]))(_energy)(x, model=model)
+        optim_h.step(model, g["model"], True)
+    optim_h.clear()
+
+
+def _quadratic(*, w):
+    return (w.get() ** 2 * jnp.arange(1.0, 4.0)).sum()
+
+
+def test_jvp_and_hvp():
+    w = px.Param(jnp.array([1.0, -2.0, 0.5]))
+    v = {"w": px.Param(jnp.array([1.0, 1.0, 1.0]))}
+
+    _g = pxf.grad({"w": True})(_quadratic)(w=w)
+    (_e, _e_dot) = pxf.jvp({"w": True})(_quadratic)(v, w=w)
+
+    assert float(_e) == pytest.approx(float(_quadratic(w=w)))
+    assert float(_e_dot) == pytest.approx(float(_g["w"].get().sum()))
+
+    _g_hvp, _hvp = pxf.hvp({"w": True})(_quadratic)(v, w=w)
+    assert jnp.allclose(_g_hvp["w"].get(), _g["w"].get())
+    assert jnp.allclose(_hvp["w"].get(), 2 * jnp.arange(1.0, 4.0))
+
+
+def test_vmap_axis_size():
+    @pxf.vmap({"p": None}, in_axes=(), out_axes=0, axis_size=3)
+    def f(*, p):
+        return p.get() + 1
+
+    p = px.Param(jnp.zeros((2,)))
+    assert f(p=p).shape == (3, 2)
+
+
+def test_vmap_rkg():
+    def _normal(x):
+        return jax.random.normal(px.RKG(), ())
+
+    x = jnp.zeros((4,))
+
+    px.RKG.seed(0)
+    _folded = pxf.vmap(in_axes=(0,), out_axes=0)(_normal)(x)
+    assert len(set(_folded.tolist())) == 4
+
+    # The global key is not advanced if no random number is generated.
+    px.RKG.seed(0)
+    pxf.vmap(in_axes=(0,), out_axes=0)(lambda x: x)(x)
+    assert jnp.array_equal(px.RKG.key.get(), jax.random.PRNGKey(0))
+
+    # 'split_rkg' reproduces the keys of 'RKGState.split', as in previous versions.
+    px.RKG.seed(0)
+    _split = pxf.vmap(in_axes=(0,), out_axes=0, split_rkg=True)(_normal)(x)
+    _keys = jax.random.split(jax.random.PRNGKey(0), 5)
+    assert jnp.allclose(_split, jax.vmap(lambda k: jax.random.normal(jax.random.split(k, 2)[1], ()))(_keys[1:]))
+    assert jnp.array_equal(px.RKG.key.get(), _keys[0])
+    assert not jnp.allclose(_split, _folded)
+
+
+def _sum_sq(*, params):
+    return sum((_p.get() ** 2).sum() for _p in params.values())
+
+
+def _large(p):
+    return p.get().shape[0] > 2
+
+
+def test_masks_cache(batch):
+    x, _ = batch
+    model, _, _ = M.build()
+    M.init(model, x)
+    _BaseTransform._masks_cache.clear()
+
+    # Equal masks built at every call share the same processed mask.
+    for _ in range(2):
+        with pxu.step(model, clear_params=pxc.VodeParam.Cache):
+            pxf.value_and_grad(pxu.Mask(M.H_FILTER, [False, True]))(_energy)(x, model=model)
+    assert len(_BaseTransform._masks_cache) == 2  # value_and_grad and vmap
+
+    # Functions are keyed by identity.
+    params = {"a": px.Param(jnp.ones((3,))), "b": px.Param(jnp.ones((1,)))}
+    pxf.grad(pxu.Mask(_large, [False, True]))(_sum_sq)(params=params)
+    pxf.grad(pxu.Mask(lambda p: p.get().shape[0] > 2, [False, True]))(_sum_sq)(params=params)
+    assert len(_BaseTransform._masks_cache) == 4
+
+
+def test_masks_cache_shape_dependent_mask():
+    _grad = pxf.grad(pxu.Mask(_large, [False, True]))(_sum_sq)
+
+    _g = _grad(params={"a": px.Param(jnp.ones((3,))), "b": px.Param(jnp.ones((1,)))})
+    assert _g["params"]["a"] is not None and _g["params"]["b"] is None
+
+    # Same structure, but different shapes: the mask is evaluated again.
+    _g = _grad(params={"a": px.Param(jnp.ones((1,))), "b": px.Param(jnp.ones((3,)))})
+    assert _g["params"]["a"] is None and _g["params"]["b"] is not None
@@ -0,0 +1,78 @@
+import gc
+
+import jax.numpy as jnp
+import jax.tree_util as jtu
+
+import pcax as px
+from pcax.core import _tree
+
+
+class _Shared(px.Module):
+    def __init__(self, shared: bool):
+        super().__init__()
+        self.a = px.Param(jnp.zeros((2,)))
+        self.b = self.a if shared else px.Param(jnp.ones((2,)))
+        self.c = px.Param(jnp.full((2,), 2.0))
+
+
+def _refs(tree):
+    return [
+        _i
+        for _i, _x in enumerate(jtu.tree_leaves(tree, is_leaf=_tree._is_param))
+        if isinstance(_x, _tree._BaseParamRef)
+    ]
+
+
+def _plan(plan_cls, tree):
+    _leaves, _structure = jtu.tree_flatten(tree, is_leaf=_tree._is_param)
+
+    return plan_cls.get(_leaves, _structure)
+
+
+def test_ref_plan_is_reused():
+    model = _Shared(shared=True)
+
+    _tree_a = px.tree_ref(model)
+    _plan_a, _unplan_a = _plan(_tree._RefPlan, model), _plan(_tree._UnrefPlan, _tree_a)
+    _tree_b = px.tree_ref(model)
+
+    assert _plan(_tree._RefPlan, model) is _plan_a
+    assert _plan(_tree._UnrefPlan, _tree_b) is _unplan_a
+    # The references are created once and shared across calls.
+    assert _refs(_tree_a) == _refs(_tree_b) == [2]
+    assert jtu.tree_leaves(_tree_a, is_leaf=_tree._is_param)[2] is jtu.tree_leaves(_tree_b, is_leaf=_tree._is_param)[2]
+
+    _model = px.tree_unref(_tree_b)
+    assert _model.a is _model.b is model.a
+
+    # Replacing a parameter changes the plan.
+    model.b = px.Param(jnp.ones((2,)))
+    assert _plan(_tree._RefPlan, model) is not _plan_a
+    assert _refs(px.tree_ref(model)) == []
+
+
+def test_ref_plan_recycled_ids():
+    # Models with the same structure, but different parameters (possibly allocated at recycled addresses once the
+    # previous models are garbage collected), must not use a stale plan: references only depend on which parameters
+    # are shared within each model.
+    _unplans = set()
+    for _i in range(32):
+        model = _Shared(shared=_i % 2 == 0)
+
+        _reffed = px.tree_ref(model)
+        _unplans.add(id(_plan(_tree._UnrefPlan, _reffed)))
+        assert _refs(_reffed) == ([2] if _i % 2 == 0 else [])
+
+        _model = px.tree_unref(_reffed)
+        assert (_model.a is _model.b) == (_i % 2 == 0)
+        assert _model.a is model.a and _model.b is model.b and _model.c is model.c
+        assert jnp.array_equal(_model.b.get(), jnp.zeros((2,)) if _i % 2 == 0 else jnp.ones((2,)))
+
+        del model, _model, _reffed
+        gc.collect()
+
+    # Unreffing does not depend on the identity of the parameters, so one plan per sharing pattern is used...
+    assert len(_unplans) == 2
+    # ...and the plan caches remain bounded.
+    assert len(_tree._RefPlan._plans) <= _tree._RefPlan._MAX_PLANS
+    assert len(_tree._UnrefPlan._plans) <= _tree._UnrefPlan._MAX_PLANS
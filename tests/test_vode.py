@@ -0,0 +1,141 @@
+import re
+
+import jax
+import jax.numpy as jnp
+import jax.tree_util as jtu
+import pytest
+
+import pcax.functional as pxf
+import pcax.predictive_coding as pxc
+import pcax.utils as pxu
+
+import pc_models as M
+
+
+# FixedCache ###########################################################################################################
+
+
+def test_fixed_cache_slots():
+    vode = pxc.Vode((3,), cache_slots=("z",))
+
+    assert isinstance(vode.cache, pxc.VodeParam.FixedCache)
+    assert set(vode.cache.slots) == {"u", "z"}
+    assert vode.cache.scalars == ("E",)
+
+    with pytest.raises(KeyError):
+        vode.cache["foo"] = jnp.zeros((3,))
+
+
+def test_fixed_cache_clear_keeps_structure():
+    cache = pxc.VodeParam.FixedCache(("u",), ("E",), ndim=1)
+    cache["u"] = jnp.ones((2, 3))
+    assert "u" in cache
+    assert cache["E"].shape == (2,)
+
+    _structure = jtu.tree_structure(cache)
+    cache.set(None)
+
+    assert jtu.tree_structure(cache) == _structure
+    assert "u" not in cache
+    assert jnp.array_equal(cache["u"], jnp.zeros((2, 3)))
+
+    # Slots set in a different trace are only known through their validity flags.
+    cache["u"] = jnp.ones((2, 3))
+    cache.__dict__.pop("_known")
+    assert jnp.array_equal(cache.select("u", jnp.full((2, 3), 2.0)), jnp.ones((2, 3)))
+    cache.set(None)
+    cache.__dict__.pop("_known", None)
+    assert jnp.array_equal(cache.select("u", jnp.full((2, 3), 2.0)), jnp.full((2, 3), 2.0))
+
+
+def test_fixed_cache_training(batch):
+    x, y = batch
+    train_on_batch = pxf.jit(static_argnums=0)(M.train_on_batch)
+
+    model, optim_w, optim_h = M.build()
+    _ref = [float(train_on_batch(2, x, y, model=model, optim_w=optim_w, optim_h=optim_h)) for _ in range(3)]
+
+    train_on_batch = pxf.jit(static_argnums=0)(M.train_on_batch)
+    model, optim_w, optim_h = M.build(cache_slots=())
+    _structure = jtu.tree_structure(model)
+    _e = [float(train_on_batch(2, x, y, model=model, optim_w=optim_w, optim_h=optim_h)) for _ in range(3)]
+
+    assert _e == pytest.approx(_ref, rel=1e-5)
+    assert jtu.tree_structure(model) == _structure
+    assert train_on_batch.n_traces == 1
+
+
+def test_fixed_cache_across_transformations():
+    def noise(vode, key, value, rkg):
+        return value + jax.random.normal(rkg(), value.shape)
+
+    vode = pxc.Vode((3,), ruleset={".*": ("z -> u:noise",)}, tforms={"noise": noise}, cache_slots=())
+    assert "u:noise" in vode.cache.slots
+
+    @pxf.vmap(pxu.Mask(M.VODES, (None, 0)), in_axes=(0,), out_axes=0)
+    def forward(x, *, model):
+        return model(x, output="z")
+
+    @pxf.vmap(pxu.Mask(M.VODES, (None, 0)), in_axes=(0,), out_axes=0)
+    def read(x, *, model):
+        return model(None, output="z")
+
+    # The transformed output is cached by the first call and read back (not resampled) by the second one.
+    _a = forward(jnp.ones((2, 3)), model=vode)
+    assert jnp.allclose(_a, read(jnp.ones((2, 3)), model=vode))
+
+
+# Dispatch #############################################################################################################
+
+
+def _regex_lookup(rules, op, status, key):
+    """Reference implementation of the rules lookup, matching the regular expressions at every call."""
+    _r = ()
+    for _pattern, _rules in rules.items():
+        if re.match(_pattern, status) is None:
+            continue
+        for _rule in _rules:
+            if op == "<-" and (_m := re.match("(.*(?<!\\s))\\s*<-\\s*(.*)", _rule)) and re.match(key, _m.group(2)):
+                _r += ((tuple(_t.strip() for _t in _m.group(1).split(",")), _m.group(2), _m.group(2).split(":")[0]),)
+            elif op == "->" and (_m := re.match("(.*?)\\s*->\\s*(.*)", _rule)) and re.fullmatch(key, _m.group(1)):
+                _r += (_m.groups(),)
+
+    return _r
+
+
+def test_dispatch_lookup():
+    rules = {
+        pxc.STATUS.INIT: ("h, u <- u",),
+        ".*": ("u <- u:a", "z -> u:b", "e -> h"),
+        "x.*": ("h <- u:c",),
+    }
+    ruleset = pxc.Ruleset(rules)
+
+    for _status in (pxc.STATUS.INIT, "", "x", "xyz"):
+        for _op, _key in (("<-", "u"), ("->", "z"), ("->", "e"), ("->", "u")):
+            assert ruleset.lookup(_op, _status, _key) == _regex_lookup(rules, _op, _status, _key)
+            # Cached lookups return the same result.
+            assert ruleset.lookup(_op, _status, _key) == _regex_lookup(rules, _op, _status, _key)
+
+
+def test_dispatch_shared_across_equal_rules():
+    _a = pxc.Ruleset({".*": ("u <- u",)})
+    _b = pxc.Ruleset({".*": ("u <- u",)})
+    _c = pxc.Ruleset({".*": ("h <- u",)})
+
+    assert _a.dispatch.get() is _b.dispatch.get()
+    assert _a.dispatch.get() != _c.dispatch.get()
+
+    # Cached lookups are not part of the identity of a dispatch table.
+    _a.lookup("<-", "", "u")
+    assert _a.dispatch.get() == _b.dispatch.get()
+    assert jtu.tree_structure(_a) == jtu.tree_structure(_b)
+
+
+def test_dispatch_replaced_rules():
+    ruleset = pxc.Ruleset({".*": ("u <- u",)})
+    assert ruleset.lookup("<-", "", "u")
+
+    ruleset.rules = pxc.Ruleset({".*": ("h <- x",)}).rules
+    assert ruleset.lookup("<-", "", "u") == ()
+    assert ruleset.lookup("<-", "", "x") == ((("h",), "x", "x"),)